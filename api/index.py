@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import sys
@@ -22,6 +22,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 @app.get("/api")
@@ -36,78 +37,92 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
-# Import routes from backend
+# Import routes from backend (the same pipeline as the FastAPI app)
 try:
-    from scraper import scrape_wikipedia
-    from quiz_generator import generate_quiz_from_content
-    from pydantic import BaseModel
-    from typing import List, Optional, Dict, Any
+    from scraper import canonical_article_key
+    from schemas import QuizRequest, QuizResponse, QuizHistoryResponse
+    from pipeline import QuizPipeline, ArticleUnavailable, quiz_record_to_response
+    from quiz_store import create_quiz_store, encode_history_cursor, decode_history_cursor
+    from metrics import ServerTimingMiddleware, PROMETHEUS_CONTENT_TYPE, render_metrics
+    from typing import List, Optional
     
-    class QuizRequest(BaseModel):
-        url: str
+    # Stage timings of each request in a Server-Timing header
+    app.add_middleware(ServerTimingMiddleware)
     
-    class QuizResponse(BaseModel):
-        id: Optional[int] = None
-        title: str
-        url: str
-        summary: str
-        key_entities: Dict[str, Any]
-        quiz: List[Dict[str, Any]]
-        related_topics: List[str]
-        created_at: Optional[str] = None
+    # Quizzes persist across invocations of a warm container (sqlite under
+    # /tmp by default) or across all of them (QUIZ_STORE=db)
+    pipeline = QuizPipeline(create_quiz_store())
+    quiz_store = pipeline.store
     
     @app.post("/api/generate-quiz", response_model=QuizResponse)
     async def generate_quiz(request: QuizRequest):
         """Generate a quiz from a Wikipedia URL"""
+        key = canonical_article_key(request.url)
+        if not key:
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid URL. Please provide a Wikipedia article URL."
+            )
+        
         try:
-            # Validate URL
-            if not request.url.startswith("https://en.wikipedia.org/wiki/"):
-                raise HTTPException(
-                    status_code=400,
-                    detail="Invalid URL. Please provide a valid English Wikipedia article URL."
-                )
-            
-            # Scrape Wikipedia article
-            article_data = scrape_wikipedia(request.url)
-            
-            if not article_data:
-                raise HTTPException(
-                    status_code=404,
-                    detail="Could not scrape the Wikipedia article. Please check the URL."
+            if request.preview:
+                quiz_record = await pipeline.preview(request.url, key, request.store_raw_html)
+            else:
+                quiz_record = await pipeline.run(
+                    request.url, key,
+                    force_regenerate=request.force_regenerate,
+                    store_raw_html=request.store_raw_html
                 )
-            
-            # Generate quiz using LLM
-            quiz_data = generate_quiz_from_content(
-                title=article_data["title"],
-                content=article_data["content"],
-                sections=article_data["sections"]
-            )
-            
-            response = QuizResponse(
-                title=article_data["title"],
-                url=request.url,
-                summary=quiz_data.get("summary", ""),
-                key_entities=quiz_data.get("key_entities", {}),
-                quiz=quiz_data.get("quiz", []),
-                related_topics=quiz_data.get("related_topics", [])
-            )
-            
-            return response
-            
-        except HTTPException:
-            raise
+            return quiz_record_to_response(quiz_record)
+        except ArticleUnavailable as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error generating quiz: {str(e)}")
     
-    @app.get("/api/history")
-    async def get_history():
-        """Get quiz history - returns empty for serverless"""
-        return []
+    @app.get("/api/history", response_model=List[QuizHistoryResponse])
+    async def get_history(response: Response, limit: int = Query(50, ge=1, le=200),
+                          cursor: Optional[str] = None):
+        """Get quiz history, newest first; next page cursor in X-Next-Cursor"""
+        before = None
+        if cursor:
+            try:
+                before = decode_history_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        rows = await quiz_store.history(limit + 1, before)
+        if len(rows) > limit:
+            rows = rows[:limit]
+            response.headers["X-Next-Cursor"] = encode_history_cursor(rows[-1].created_at, rows[-1].id)
+        return [
+            QuizHistoryResponse(
+                id=row.id,
+                url=row.url,
+                title=row.title,
+                created_at=row.created_at,
+                quiz_count=row.quiz_count or 0
+            )
+            for row in rows
+        ]
     
-    @app.get("/api/quiz/{quiz_id}")
+    @app.get("/api/quiz/{quiz_id}", response_model=QuizResponse)
     async def get_quiz(quiz_id: int):
-        """Get a specific quiz by ID - not available in serverless mode"""
-        raise HTTPException(status_code=404, detail="Quiz history not available in serverless mode")
+        """Get a specific quiz by ID"""
+        quiz = await quiz_store.get(quiz_id)
+        if not quiz:
+            raise HTTPException(status_code=404, detail="Quiz not found")
+        return quiz_record_to_response(quiz)
+    
+    @app.get("/api/metrics")
+    async def get_metrics():
+        """Stage metrics of this instance in the Prometheus text format"""
+        return Response(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+    
+    @app.delete("/api/quiz/{quiz_id}")
+    async def delete_quiz(quiz_id: int):
+        """Delete a quiz by ID"""
+        if not await quiz_store.delete(quiz_id):
+            raise HTTPException(status_code=404, detail="Quiz not found")
+        return {"message": "Quiz deleted successfully"}
 
 except ImportError as e:
     print(f"Warning: Could not import backend modules: {e}")
@@ -0,0 +1,435 @@
+"""
+Bulk quiz generation for lists of articles.
+
+A batch and its items are stored in the quiz_batches / quiz_batch_items
+tables, and items are only marked done once their quiz has been written, so
+an interrupted run can be resumed and picks up where it stopped.
+
+Run from the command line with:
+    python batch.py curriculum.txt            # one URL or title per line
+    python batch.py --resume 3
+"""
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from sqlalchemy import func, select, update
+
+from scraper import canonicalize_wikipedia_url, canonical_article_key
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+# Article fetches per second and in flight, LLM calls in flight, and how many
+# finished articles are written per transaction
+BATCH_SCRAPE_RATE = float(os.getenv("BATCH_SCRAPE_RATE", "5"))
+BATCH_SCRAPE_CONCURRENCY = int(os.getenv("BATCH_SCRAPE_CONCURRENCY", "4"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "2"))
+BATCH_WRITE_SIZE = int(os.getenv("BATCH_WRITE_SIZE", "20"))
+
+# Item statuses
+PENDING = "pending"
+CACHED = "cached"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Batch statuses; "incomplete" and "failed" batches can be resumed
+BATCH_RUNNING = "running"
+BATCH_COMPLETED = "completed"
+BATCH_INCOMPLETE = "incomplete"
+BATCH_FAILED = "failed"
+
+
+def article_url_from_input(value: str) -> Optional[str]:
+    """
+    Canonical article URL for a batch item given as a URL or an English title
+
+    Args:
+        value: Wikipedia URL, or article title such as "Alan Turing"
+
+    Returns:
+        Canonical URL, or None if the value is not usable
+    """
+    value = value.strip()
+    if not value:
+        return None
+    if "://" in value:
+        return canonicalize_wikipedia_url(value)
+    return canonicalize_wikipedia_url(f"https://en.wikipedia.org/wiki/{quote(value)}")
+
+
+class RateLimiter:
+    """
+    Spaces calls at least 1/rate seconds apart (rate <= 0 disables it)
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next = 0.0
+
+    async def acquire(self):
+        now = asyncio.get_running_loop().time()
+        wait = self._next - now
+        self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class BatchRunner:
+    """
+    Runs batches: one cache query for the whole batch, rate-limited
+    concurrent scraping of the misses, bounded LLM parallelism and grouped
+    writes.
+
+    The pipeline stages are passed in so the runner shares the app's scrape
+    cache and generation thread pool:
+        scrape_many(targets, refresh) -> {key: scraped data or None} for
+            (key, url) pairs; refresh (force_regenerate) bypasses caches
+        generate(scraped, force_regenerate) -> generate_quiz_from_content result
+        record_fields(scraped, quiz_data, resolved_key) -> QuizRecord columns
+    """
+
+    def __init__(self, session_factory, batch_model, item_model, quiz_model,
+                 scrape_many: Callable[[List[Tuple[str, str]], bool], Awaitable[Dict[str, Optional[Dict]]]],
+                 generate: Callable[[Dict, bool], Awaitable[Dict]],
+                 record_fields: Callable[[Dict, Dict, str], Dict[str, Any]],
+                 scrape_chunk_size: int = 1,
+                 scrape_rate: float = BATCH_SCRAPE_RATE,
+                 scrape_concurrency: int = BATCH_SCRAPE_CONCURRENCY,
+                 llm_concurrency: int = BATCH_LLM_CONCURRENCY,
+                 write_size: int = BATCH_WRITE_SIZE):
+        self.session_factory = session_factory
+        self.batch_model = batch_model
+        self.item_model = item_model
+        self.quiz_model = quiz_model
+        self.scrape_many = scrape_many
+        self.generate = generate
+        self.record_fields = record_fields
+        self.scrape_chunk_size = scrape_chunk_size
+        self.scrape_rate = scrape_rate
+        self.scrape_concurrency = scrape_concurrency
+        self.llm_concurrency = llm_concurrency
+        self.write_size = write_size
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    async def create(self, inputs: List[str], force_regenerate: bool = False):
+        """
+        Store a new batch; inputs that are not article URLs or titles fail at once
+
+        Returns:
+            The batch row
+        """
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            batch = self.batch_model(
+                status=BATCH_INCOMPLETE,
+                force_regenerate=force_regenerate,
+                total=len(inputs),
+                created_at=now,
+                updated_at=now
+            )
+            db.add(batch)
+            await db.flush()
+            items = []
+            for position, value in enumerate(inputs):
+                url = article_url_from_input(value)
+                items.append(self.item_model(
+                    batch_id=batch.id,
+                    position=position,
+                    input=value,
+                    url=url,
+                    canonical_key=canonical_article_key(url) if url else None,
+                    status=PENDING if url else FAILED,
+                    error=None if url else "Not a Wikipedia article URL or title",
+                    updated_at=now
+                ))
+            db.add_all(items)
+            await db.commit()
+            await db.refresh(batch)
+        return batch
+
+    def start(self, batch_id: int) -> asyncio.Task:
+        """
+        Run a batch in the background (no-op if it is already running here)
+        """
+        task = self._tasks.get(batch_id)
+        if task is None or task.done():
+            task = asyncio.create_task(self.run(batch_id))
+            self._tasks[batch_id] = task
+            task.add_done_callback(lambda _: self._tasks.pop(batch_id, None))
+        return task
+
+    def is_running(self, batch_id: int) -> bool:
+        return batch_id in self._tasks
+
+    async def get(self, batch_id: int):
+        """
+        Batch row, its items in input order and item counts by status
+
+        Returns:
+            (batch, items, counts) or None if the batch does not exist
+        """
+        async with self.session_factory() as db:
+            batch = await db.get(self.batch_model, batch_id)
+            if batch is None:
+                return None
+            items = (await db.execute(select(self.item_model).where(
+                self.item_model.batch_id == batch_id
+            ).order_by(self.item_model.position))).scalars().all()
+        counts = {status: 0 for status in (PENDING, CACHED, SUCCEEDED, FAILED)}
+        for item in items:
+            counts[item.status] = counts.get(item.status, 0) + 1
+        return batch, items, counts
+
+    async def _set_status(self, batch_id: int, status: str):
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            await db.execute(update(self.batch_model).where(self.batch_model.id == batch_id).values(
+                status=status,
+                updated_at=now,
+                finished_at=now if status == BATCH_COMPLETED else None
+            ))
+            await db.commit()
+
+    async def run(self, batch_id: int):
+        """
+        Process the batch's pending items (also resumes an interrupted batch)
+        """
+        async with self.session_factory() as db:
+            batch = await db.get(self.batch_model, batch_id)
+            if batch is None:
+                return
+            force_regenerate = batch.force_regenerate
+            pending = (await db.execute(select(
+                self.item_model.id, self.item_model.canonical_key, self.item_model.url
+            ).where(
+                self.item_model.batch_id == batch_id,
+                self.item_model.status == PENDING
+            ).order_by(self.item_model.position))).all()
+
+        await self._set_status(batch_id, BATCH_RUNNING)
+
+        # Duplicate inputs for the same article share one generation
+        item_ids: Dict[str, List[int]] = {}
+        urls: Dict[str, str] = {}
+        for item_id, key, url in pending:
+            item_ids.setdefault(key, []).append(item_id)
+            urls.setdefault(key, url)
+
+        state = _RunState(batch_id, force_regenerate, item_ids, self.scrape_rate,
+                          self.scrape_concurrency, self.llm_concurrency)
+        try:
+            if not force_regenerate and urls:
+                # One query for every stored quiz in the batch
+                async with self.session_factory() as db:
+                    stored = dict((await db.execute(select(
+                        self.quiz_model.canonical_key, self.quiz_model.id
+                    ).where(
+                        self.quiz_model.canonical_key.in_(list(urls)),
+                        self.quiz_model.is_fallback.is_(False)
+                    ))).all())
+                for key, quiz_id in stored.items():
+                    await self._record(state, {"key": key, "quiz_id": quiz_id})
+                    del urls[key]
+
+            targets = list(urls.items())
+            chunks = [targets[i:i + self.scrape_chunk_size]
+                      for i in range(0, len(targets), self.scrape_chunk_size)]
+            await asyncio.gather(*(self._process_chunk(state, chunk) for chunk in chunks))
+            await self._flush(state)
+        except Exception as e:
+            # Unfinished items stay pending for a resume
+            print(f"Error running batch {batch_id}: {e}")
+            await self._set_status(batch_id, BATCH_FAILED)
+            raise
+
+        async with self.session_factory() as db:
+            remaining = (await db.execute(select(func.count()).select_from(self.item_model).where(
+                self.item_model.batch_id == batch_id,
+                self.item_model.status == PENDING
+            ))).scalar()
+        await self._set_status(batch_id, BATCH_INCOMPLETE if remaining else BATCH_COMPLETED)
+
+    async def _process_chunk(self, state: "_RunState", chunk: List[Tuple[str, str]]):
+        async with state.scrape_slots:
+            await state.limiter.acquire()
+            try:
+                scraped = await self.scrape_many(chunk, state.force_regenerate)
+            except Exception as e:
+                print(f"Error scraping batch chunk: {e}")
+                scraped = {}
+
+        await asyncio.gather(*(
+            self._process_article(state, key, scraped.get(key)) for key, _ in chunk
+        ))
+
+    async def _process_article(self, state: "_RunState", key: str, scraped: Optional[Dict]):
+        if not scraped:
+            await self._record(state, {
+                "key": key, "error": "Failed to scrape Wikipedia article. Please check the URL."
+            })
+            return
+
+        # Redirects (e.g. Turing -> Alan_Turing) only resolve once fetched
+        resolved_key = canonical_article_key(scraped["canonical_url"]) or key
+        if resolved_key != key and not state.force_regenerate:
+            async with self.session_factory() as db:
+                quiz_id = (await db.execute(select(self.quiz_model.id).where(
+                    self.quiz_model.canonical_key == resolved_key,
+                    self.quiz_model.is_fallback.is_(False)
+                ))).scalar()
+            if quiz_id is not None:
+                await self._record(state, {"key": key, "quiz_id": quiz_id})
+                return
+
+        try:
+            async with state.llm_slots:
+                quiz_data = await self.generate(scraped, state.force_regenerate)
+        except Exception as e:
+            await self._record(state, {"key": key, "error": f"Error generating quiz: {e}"})
+            return
+        if quiz_data.get("is_fallback"):
+            # The LLM was unavailable; leave the article pending for a resume
+            await self._record(state, {
+                "key": key, "pending": True, "error": "LLM generation failed, retry by resuming the batch"
+            })
+            return
+        await self._record(state, {
+            "key": key,
+            "resolved_key": resolved_key,
+            "fields": self.record_fields(scraped, quiz_data, resolved_key)
+        })
+
+    async def _record(self, state: "_RunState", result: Dict[str, Any]):
+        """
+        Buffer an article's outcome: {"key", and "resolved_key" + "fields"
+        (quiz to write), "quiz_id" (stored quiz reused), or "error" (with
+        "pending" if the article should be retried on resume)}
+        """
+        state.buffer.append(result)
+        if len(state.buffer) >= self.write_size:
+            await self._flush(state)
+
+    async def _flush(self, state: "_RunState"):
+        """
+        Write buffered quizzes in one transaction and mark their items done
+        """
+        async with state.write_lock:
+            results, state.buffer = state.buffer, []
+            if not results:
+                return
+            now = datetime.utcnow()
+            async with self.session_factory() as db:
+                records = {}
+                for result in results:
+                    if result.get("fields") and result["resolved_key"] not in state.written:
+                        records.setdefault(result["resolved_key"], result["fields"])
+
+                if records:
+                    existing = (await db.execute(select(self.quiz_model).where(
+                        self.quiz_model.canonical_key.in_(list(records))
+                    ))).scalars().all()
+                    quizzes = {quiz.canonical_key: quiz for quiz in existing}
+                    new_quizzes = []
+                    for resolved_key, fields in records.items():
+                        quiz = quizzes.get(resolved_key)
+                        if quiz is None:
+                            quiz = self.quiz_model(**fields)
+                            new_quizzes.append(quiz)
+                            quizzes[resolved_key] = quiz
+                        elif state.force_regenerate or quiz.is_fallback:
+                            # Keep the stored URL (it may be an older spelling)
+                            for field, value in fields.items():
+                                if field != "url":
+                                    setattr(quiz, field, value)
+                    db.add_all(new_quizzes)
+                    await db.flush()
+                    state.written.update({key: quizzes[key].id for key in records})
+
+                item_updates = []
+                for result in results:
+                    if result.get("fields"):
+                        status, quiz_id = SUCCEEDED, state.written[result["resolved_key"]]
+                    elif result.get("quiz_id") is not None:
+                        status, quiz_id = CACHED, result["quiz_id"]
+                    elif result.get("pending"):
+                        status, quiz_id = PENDING, None
+                    else:
+                        status, quiz_id = FAILED, None
+                    item_updates.extend(
+                        {"id": item_id, "status": status, "quiz_id": quiz_id,
+                         "error": result.get("error"), "updated_at": now}
+                        for item_id in state.item_ids.get(result["key"], [])
+                    )
+                if item_updates:
+                    await db.execute(update(self.item_model), item_updates)
+                await db.execute(update(self.batch_model).where(
+                    self.batch_model.id == state.batch_id
+                ).values(updated_at=now))
+                await db.commit()
+
+
+class _RunState:
+    """
+    Per-run concurrency limits, write buffer and written quiz ids
+    """
+
+    def __init__(self, batch_id: int, force_regenerate: bool, item_ids: Dict[str, List[int]],
+                 scrape_rate: float = BATCH_SCRAPE_RATE,
+                 scrape_concurrency: int = BATCH_SCRAPE_CONCURRENCY,
+                 llm_concurrency: int = BATCH_LLM_CONCURRENCY):
+        self.batch_id = batch_id
+        self.force_regenerate = force_regenerate
+        self.item_ids = item_ids
+        self.limiter = RateLimiter(scrape_rate)
+        self.scrape_slots = asyncio.Semaphore(scrape_concurrency)
+        self.llm_slots = asyncio.Semaphore(llm_concurrency)
+        self.write_lock = asyncio.Lock()
+        self.buffer: List[Dict[str, Any]] = []
+        self.written: Dict[str, int] = {}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", nargs="?", help="File with one article URL or title per line ('-' for stdin)")
+    parser.add_argument("--resume", type=int, metavar="BATCH_ID", help="Resume an interrupted batch")
+    parser.add_argument("--force", action="store_true", help="Regenerate quizzes that are already stored")
+    args = parser.parse_args()
+    if not args.file and args.resume is None:
+        parser.error("give a file of articles or --resume BATCH_ID")
+
+    # The app module sets up the shared caches and pools
+    import main as app
+    if app.AUTO_MIGRATE:
+        app.prepare_database()
+
+    async def run():
+        if args.resume is not None:
+            batch_id = args.resume
+        else:
+            source = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+            with source:
+                inputs = [line.strip() for line in source if line.strip() and not line.startswith("#")]
+            batch_id = (await app.batch_runner.create(inputs, args.force)).id
+            print(f"Batch {batch_id}: {len(inputs)} articles")
+        await app.batch_runner.run(batch_id)
+        found = await app.batch_runner.get(batch_id)
+        if found is None:
+            print(f"Batch {batch_id} not found")
+            return
+        batch, items, counts = found
+        for item in items:
+            detail = f"quiz {item.quiz_id}" if item.quiz_id else (item.error or "")
+            print(f"{item.status:<10} {item.input}  {detail}")
+        print(f"Batch {batch_id} {batch.status}: " + ", ".join(f"{n} {s}" for s, n in counts.items()))
+
+    try:
+        asyncio.run(run())
+    finally:
+        app.generation_executor.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,155 @@
+"""
+Benchmark: single-prompt vs map-reduce (chunked) quiz generation.
+
+The Gemini client is replaced by a fake chat model whose latency grows with
+the prompt (input tokens / --input-rate) and the response (output tokens /
+--output-rate), like a real model. It answers with as many questions as the
+prompt asks for, each about one of the sections in the prompt.
+
+Quizzes for synthetic articles of increasing size are generated three ways:
+
+- truncated: one prompt within LLM_CONTENT_TOKEN_BUDGET (no chunking)
+- whole: one prompt with the whole article
+- chunked: the article split into up to LLM_MAX_CHUNKS parts, one call per
+  part in parallel, merged locally
+
+Usage:
+    python benchmarks/bench_chunked_generation.py --input-rate 20000 --output-rate 800
+"""
+import argparse
+import functools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import content_selection
+import quiz_generator
+from llm_limiter import AdaptiveConcurrencyLimit, LLMRateLimiter, estimate_tokens
+from scraper import parse_article_html
+from wiki_stub_server import build_article_html
+
+# (sections, paragraphs per section, words per paragraph)
+ARTICLE_SIZES = [
+    ("medium", 12, 4, 90),
+    ("long", 25, 6, 100),
+    ("featured", 45, 8, 110),
+]
+DIFFICULTIES = ["easy", "medium", "easy", "medium", "hard"]
+SECTION_LABEL = re.compile(r"^== (.+) ==$", re.MULTILINE)
+QUESTION_COUNT = re.compile(r"Generate exactly (\d+)")
+PART = re.compile(r"part (\d+) of")
+
+
+class FakeLatencyLLM(BaseChatModel):
+    """
+    Chat model answering with the requested number of questions after a
+    delay proportional to prompt and response size
+    """
+
+    input_rate: float = 20000
+    output_rate: float = 800
+    calls: int = 0
+    prompt_tokens: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-latency"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        prompt = messages[-1].content
+        count = int(QUESTION_COUNT.search(prompt).group(1))
+        sections = SECTION_LABEL.findall(prompt) or ["Lead"]
+        part = PART.search(prompt)
+        offset = int(part.group(1)) if part else 0
+        questions = []
+        for index in range(count):
+            section = sections[index % len(sections)]
+            questions.append(
+                f'{{"question": "Question {index} about {section}?", '
+                f'"options": ["{section}", "B", "C", "D"], "answer": "{section}", '
+                f'"difficulty": "{DIFFICULTIES[(index + offset) % len(DIFFICULTIES)]}", '
+                f'"explanation": "See {section}."}}'
+            )
+        response = (
+            '{"summary": "Benchmark.", "key_entities": {"people": [], "organizations": [], '
+            '"locations": []}, "quiz": [' + ', '.join(questions) + '], "related_topics": []}'
+        )
+        with _counter_lock:
+            self.calls += 1
+            self.prompt_tokens += estimate_tokens(prompt)
+        time.sleep(estimate_tokens(prompt) / self.input_rate + estimate_tokens(response) / self.output_rate)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=response))])
+
+
+_counter_lock = threading.Lock()
+
+
+def run_mode(title, scraped, mode, args):
+    llm = FakeLatencyLLM(input_rate=args.input_rate, output_rate=args.output_rate)
+    quiz_generator.llm = llm
+    if mode == "truncated":
+        quiz_generator.chunk_passages = lambda passages: [passages]
+        quiz_generator.select_content = content_selection.select_content
+    elif mode == "whole":
+        quiz_generator.chunk_passages = lambda passages: [passages]
+        quiz_generator.select_content = functools.partial(
+            content_selection.select_content, token_budget=10 ** 9
+        )
+    else:
+        quiz_generator.chunk_passages = functools.partial(
+            content_selection.chunk_passages, max_chunks=args.chunks
+        )
+        quiz_generator.select_content = content_selection.select_content
+
+    started = time.perf_counter()
+    quiz = quiz_generator.generate_quiz_from_content(
+        title=title, content=scraped["content"], sections=scraped["sections"],
+        use_cache=False, passages=scraped["passages"]
+    )
+    elapsed = time.perf_counter() - started
+
+    mix = Counter(question["difficulty"] for question in quiz["quiz"])
+    asked_about = {question["answer"] for question in quiz["quiz"]}
+    return (f"{mode:<10}{elapsed:>8.2f}{llm.calls:>7}{llm.prompt_tokens:>12}{len(quiz['quiz']):>11}"
+            f"{len(asked_about):>10}   {mix['easy']}/{mix['medium']}/{mix['hard']}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input-rate", type=float, default=20000, help="Fake LLM prompt tokens per second")
+    parser.add_argument("--output-rate", type=float, default=800, help="Fake LLM response tokens per second")
+    parser.add_argument("--chunks", type=int, default=content_selection.LLM_MAX_CHUNKS, help="Max chunks")
+    args = parser.parse_args()
+
+    # No request budgets: only the latency of the calls is measured
+    quiz_generator.llm_limiter = LLMRateLimiter(
+        rpm=0, tpm=0, concurrency=AdaptiveConcurrencyLimit(minimum=args.chunks, maximum=args.chunks)
+    )
+
+    for name, sections, paragraphs, words in ARTICLE_SIZES:
+        title = f"Benchmark {name}"
+        scraped = parse_article_html(
+            build_article_html(title, sections=sections, paragraphs=paragraphs, words=words),
+            f"https://en.wikipedia.org/wiki/Benchmark_{name}"
+        )
+        print(f"\n{name}: {len({passage['section'] for passage in scraped['passages']})} sections, "
+              f"{estimate_tokens(scraped['content'])} tokens")
+        print(f"{'mode':<10}{'wall s':>8}{'calls':>7}{'prompt tok':>12}{'questions':>11}"
+              f"{'sections':>10}   easy/medium/hard")
+        for mode in ("truncated", "whole", "chunked"):
+            print(run_mode(title, scraped, mode, args))
+
+
+if __name__ == "__main__":
+    main_cli()
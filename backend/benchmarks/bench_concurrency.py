@@ -0,0 +1,135 @@
+"""
+Load benchmark: read-endpoint latency while quizzes are being generated.
+
+Scraping and the LLM call are replaced by sleeps of configurable length so the
+benchmark runs offline. N generations are started concurrently and the read
+endpoints (/api/history and /api/quiz/{id}) are polled in the meantime.
+
+Usage:
+    python benchmarks/bench_concurrency.py --generations 8 --reads 200
+    python benchmarks/bench_concurrency.py --inline   # old behaviour, for comparison
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Use a throwaway database so the benchmark never touches wiki_quiz.db
+_db_dir = tempfile.mkdtemp(prefix="wiki-quiz-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+import httpx
+
+import main
+import pipeline
+
+# The ASGI transport does not send lifespan events, so create the tables here
+main.prepare_database()
+
+
+def percentile(samples, pct):
+    """
+    Nearest-rank percentile of a list of samples
+    """
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def install_fakes(scrape_delay: float, llm_delay: float):
+    """
+    Replace the network-bound pipeline stages with blocking sleeps
+    """
+    def fake_scrape(url):
+        time.sleep(scrape_delay)
+        return {
+            "title": url.rsplit('/', 1)[-1],
+            "canonical_url": url,
+            "content": "Benchmark content.",
+            "sections": ["History"],
+            "summary": "Benchmark summary.",
+            "raw_html": ""
+        }
+
+    def fake_generate(title, content, sections, **kwargs):
+        time.sleep(llm_delay)
+        return {
+            "summary": f"Summary of {title}",
+            "key_entities": {"people": [], "organizations": [], "locations": []},
+            "quiz": [{
+                "question": f"What is {title}?",
+                "options": [title, "B", "C", "D"],
+                "answer": title,
+                "difficulty": "easy",
+                "explanation": "Benchmark."
+            }],
+            "related_topics": []
+        }
+
+    main.scrape_wikipedia = fake_scrape
+    pipeline.generate_quiz_from_content = fake_generate
+
+
+async def run(args):
+    if args.inline:
+        # Reproduce the previous behaviour: blocking calls on the event loop
+        async def run_inline(func, *a, **kw):
+            return func(*a, **kw)
+        main.pipeline.run_blocking = run_inline
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        seed = await client.post("/api/generate-quiz", json={"url": "https://en.wikipedia.org/wiki/Seed"})
+        seed_id = seed.json()["id"]
+
+        generations = [
+            asyncio.create_task(client.post(
+                "/api/generate-quiz",
+                json={"url": f"https://en.wikipedia.org/wiki/Article_{i}"}
+            ))
+            for i in range(args.generations)
+        ]
+        await asyncio.sleep(0)
+
+        latencies = []
+        for i in range(args.reads):
+            path = "/api/history" if i % 2 == 0 else f"/api/quiz/{seed_id}"
+            start = time.perf_counter()
+            await client.get(path)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*generations)
+        drain = time.perf_counter() - started
+
+    mode = "inline" if args.inline else f"pool({main.GENERATION_WORKERS} workers)"
+    print(f"mode:             {mode}")
+    print(f"generations:      {args.generations} in flight")
+    print(f"read requests:    {len(latencies)}")
+    print(f"read p50 (ms):    {statistics.median(latencies):.2f}")
+    print(f"read p99 (ms):    {percentile(latencies, 99):.2f}")
+    print(f"read max (ms):    {max(latencies):.2f}")
+    print(f"generation drain: {drain:.2f}s after reads finished")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--generations", type=int, default=8, help="Concurrent generate requests")
+    parser.add_argument("--reads", type=int, default=200, help="Read requests to time")
+    parser.add_argument("--scrape-delay", type=float, default=0.2, help="Simulated scrape seconds")
+    parser.add_argument("--llm-delay", type=float, default=1.0, help="Simulated LLM seconds")
+    parser.add_argument("--inline", action="store_true", help="Run generation on the event loop")
+    args = parser.parse_args()
+
+    install_fakes(args.scrape_delay, args.llm_delay)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main_cli()
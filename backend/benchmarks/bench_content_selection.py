@@ -0,0 +1,88 @@
+"""
+Benchmark: prompt tokens vs section coverage for the quiz prompt content.
+
+Synthetic articles of increasing size are parsed with the scraper, then the
+prompt content is built two ways:
+
+- truncation: the first 10,000 characters of the article text (what the
+  generator used to send)
+- selection: content_selection at LLM_CONTENT_TOKEN_BUDGET (or --budget)
+
+For each, the estimated prompt tokens and the share of the article's sections
+that reach the prompt are reported, along with the selection time.
+
+Usage:
+    python benchmarks/bench_content_selection.py --budget 2500
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from content_selection import LLM_CONTENT_TOKEN_BUDGET, select_passages, render_passages
+from llm_limiter import estimate_tokens
+from scraper import parse_article_html
+from wiki_stub_server import build_article_html
+
+TRUNCATED_CHARS = 10000
+
+# (sections, paragraphs per section, words per paragraph)
+ARTICLE_SIZES = [
+    ("stub", 2, 2, 60),
+    ("short", 6, 3, 80),
+    ("medium", 12, 4, 90),
+    ("long", 25, 6, 100),
+    ("featured", 45, 8, 110),
+]
+
+
+def truncation_coverage(passages, limit: int = TRUNCATED_CHARS):
+    """
+    Sections with at least one passage starting inside the first limit characters
+    """
+    covered = set()
+    offset = 0
+    for passage in passages:
+        if offset >= limit:
+            break
+        covered.add(passage["section"])
+        offset += len(passage["text"]) + 1
+    return covered
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=int, default=LLM_CONTENT_TOKEN_BUDGET, help="Content token budget")
+    parser.add_argument("--repeat", type=int, default=20, help="Selections timed per article")
+    args = parser.parse_args()
+
+    print(f"{'article':<10}{'sections':>9}{'tokens':>8}"
+          f"{'trunc tok':>11}{'trunc cov':>11}{'select tok':>12}{'select cov':>12}{'select ms':>11}")
+    for name, sections, paragraphs, words in ARTICLE_SIZES:
+        title = f"Benchmark {name}"
+        scraped = parse_article_html(
+            build_article_html(title, sections=sections, paragraphs=paragraphs, words=words),
+            f"https://en.wikipedia.org/wiki/Benchmark_{name}"
+        )
+        passages = scraped["passages"]
+        all_sections = {passage["section"] for passage in passages}
+
+        truncated = scraped["content"][:TRUNCATED_CHARS]
+        truncated_covered = truncation_coverage(passages)
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            selected = select_passages(title, passages, args.budget)
+        elapsed_ms = (time.perf_counter() - started) / args.repeat * 1000
+        selected_covered = {passage["section"] for passage in selected}
+
+        print(f"{name:<10}{len(all_sections):>9}{estimate_tokens(scraped['content']):>8}"
+              f"{estimate_tokens(truncated):>11}{len(truncated_covered) / len(all_sections):>11.0%}"
+              f"{estimate_tokens(render_passages(selected)):>12}"
+              f"{len(selected_covered) / len(all_sections):>12.0%}{elapsed_ms:>11.2f}")
+
+
+if __name__ == "__main__":
+    main_cli()
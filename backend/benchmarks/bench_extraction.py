@@ -0,0 +1,108 @@
+"""
+Parity check and parse-throughput benchmark for the extraction engines.
+
+Pages are built from sample_data/*.json (title, sections, summary and the
+quiz explanations as paragraphs) and from the synthetic generator at several
+sizes. Every engine must produce the same title, paragraphs and headings as
+the BeautifulSoup reference; throughput is then measured per engine.
+
+Usage:
+    python benchmarks/bench_extraction.py --repeat 5
+"""
+import argparse
+import glob
+import html
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from extractors import EXTRACTORS, extract_with_beautifulsoup
+from wiki_stub_server import build_article_html
+
+SAMPLE_DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'sample_data')
+
+COMPARED_FIELDS = ("title", "canonical_href", "paragraphs", "paragraph_sections", "headings", "links")
+
+
+def page_from_sample(sample: dict) -> str:
+    """
+    Article page in Wikipedia markup built from a sample_data record
+    """
+    title = html.escape(sample["title"])
+    explanations = [q["explanation"] for q in sample.get("quiz", [])]
+    parts = [f"<p>{html.escape(sample['summary'])}<sup class=\"reference\">[1]</sup></p>",
+             "<table class=\"infobox\"><tr><td><p>Infobox paragraph</p></td></tr></table>"]
+    for index, section in enumerate(sample.get("sections", [])):
+        parts.append(f"<h2 id=\"s{index}\"><span class=\"mw-headline\">{html.escape(section)}</span>"
+                     f"<span class=\"mw-editsection\">[edit]</span></h2>")
+        if index < len(explanations):
+            parts.append(f"<p>{html.escape(explanations[index])}<br>"
+                         f"<style>.x{{color:red}}</style>&amp; more.</p>")
+    parts.append("<h2><span class=\"mw-headline\">References</span></h2>"
+                 "<div class=\"reflist\"><p>Ref</p></div>")
+    return (f"<html><head><link rel=\"canonical\" href=\"{html.escape(sample['url'])}\"></head><body>"
+            f"<h1 id=\"firstHeading\">{title}</h1><div id=\"mw-content-text\">"
+            + ''.join(parts) + "</div></body></html>")
+
+
+def load_pages():
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(SAMPLE_DATA_DIR, '*.json'))):
+        with open(path, encoding='utf-8') as f:
+            pages[os.path.basename(path)] = page_from_sample(json.load(f))
+    for name, sections, paragraphs in (("stub", 1, 2), ("medium", 10, 5), ("long", 40, 8), ("featured", 80, 12)):
+        pages[f"synthetic-{name}"] = build_article_html(f"Synthetic {name}", sections, paragraphs)
+    return pages
+
+
+def available_engines():
+    engines = {}
+    for name, extractor in EXTRACTORS.items():
+        try:
+            extractor("<div id=\"mw-content-text\"><p>x</p></div>")
+        except ImportError:
+            print(f"skipping {name}: not installed")
+            continue
+        engines[name] = extractor
+    return engines
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_pages()
+    engines = available_engines()
+
+    failures = 0
+    for page_name, page in pages.items():
+        reference = extract_with_beautifulsoup(page)
+        for engine_name, extractor in engines.items():
+            result = extractor(page)
+            for field in COMPARED_FIELDS:
+                if result[field] != reference[field]:
+                    failures += 1
+                    print(f"MISMATCH {engine_name} {page_name} {field}:\n"
+                          f"  expected {reference[field]!r}\n  got      {result[field]!r}")
+    print(f"parity: {len(pages)} pages x {len(engines)} engines, {failures} mismatches")
+
+    print(f"\n{'page':<34}{'size KB':>9}" + ''.join(f"{name + ' MB/s':>14}" for name in engines))
+    for page_name, page in pages.items():
+        row = f"{page_name:<34}{len(page) / 1024:>9.1f}"
+        for extractor in engines.values():
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                extractor(page)
+            elapsed = (time.perf_counter() - started) / args.repeat
+            row += f"{len(page) / elapsed / 1e6:>14.2f}"
+        print(row)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main_cli()
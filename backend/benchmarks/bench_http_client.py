@@ -0,0 +1,74 @@
+"""
+Benchmark: connection reuse and conditional requests for Wikipedia fetches.
+
+Runs scrape_wikipedia against a local stand-in server, first with a fresh
+connection per request (the previous bare requests.get behaviour), then with
+the shared pooled session, then again as a refresh so every fetch is
+revalidated with If-None-Match and answered with 304.
+
+Usage:
+    python benchmarks/bench_http_client.py --articles 50 --threads 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import requests
+
+import http_client
+import scraper
+from wiki_stub_server import WikiStubServer
+
+
+def run_pass(urls, threads):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(scraper.scrape_wikipedia, urls))
+    assert all(results), "scrape failed"
+    return time.perf_counter() - started
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    urls = [f"https://en.wikipedia.org/wiki/Article_{i}" for i in range(args.articles)]
+
+    with WikiStubServer() as stub:
+        # Baseline: a new session (and connection) for every fetch
+        original_get_session = http_client.get_session
+
+        def fresh_session():
+            session = requests.Session()
+            stub.install(session)
+            return session
+
+        scraper.get_session = fresh_session
+        elapsed = run_pass(urls, args.threads)
+        print(f"fresh connection: {elapsed:.2f}s, {stub.connections} connections, {stub.requests} requests")
+        http_client.article_validators = http_client.ValidatorCache()
+        scraper.article_validators = http_client.article_validators
+
+        # Shared keep-alive pool
+        scraper.get_session = original_get_session
+        stub.install(http_client.get_session(), pool_maxsize=http_client.WIKI_HTTP_POOL_SIZE)
+        stub.connections = stub.requests = stub.bytes_sent = 0
+        elapsed = run_pass(urls, args.threads)
+        print(f"pooled session:   {elapsed:.2f}s, {stub.connections} connections, "
+              f"{stub.requests} requests, {stub.bytes_sent} bytes")
+
+        # Refresh: every article is revalidated and answered with 304
+        stub.connections = stub.requests = stub.bytes_sent = 0
+        elapsed = run_pass(urls, args.threads)
+        print(f"revalidation:     {elapsed:.2f}s, {stub.connections} connections, "
+              f"{stub.not_modified} not modified, {stub.bytes_sent} bytes")
+
+
+if __name__ == "__main__":
+    main_cli()
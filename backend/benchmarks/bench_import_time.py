@@ -0,0 +1,88 @@
+"""
+Benchmark: cold-start import cost of each entry point.
+
+Every entry point is imported in a fresh interpreter under
+`python -X importtime`, as a serverless cold start would. The median total
+import time over --repeat runs is reported with the packages that cost the
+most (self time of their modules, summed per top-level package).
+
+Entry points:
+    main   backend/main.py (uvicorn app, python batch.py)
+    index  api/index.py (Vercel function)
+
+Usage:
+    python benchmarks/bench_import_time.py --repeat 5 --top 8
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+API_DIR = os.path.abspath(os.path.join(BACKEND_DIR, '..', 'api'))
+
+ENTRY_POINTS = {
+    "main": BACKEND_DIR,
+    "index": API_DIR,
+}
+
+
+def import_profile(module: str, cwd: str, env: dict):
+    """
+    Import module in a fresh interpreter
+
+    Returns:
+        (cumulative microseconds of the module, {top-level package: self microseconds})
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    total = 0
+    packages = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        packages[name.split(".")[0]] += int(self_us)
+        if name == module:
+            total = int(cumulative_us)
+    return total, packages
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per entry point")
+    parser.add_argument("--top", type=int, default=8, help="Most expensive packages to list")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    # Never touch wiki_quiz.db; importing must not need network or credentials
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='wiki-quiz-bench-'), 'bench.db')}"
+    env.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+    for module, cwd in ENTRY_POINTS.items():
+        totals = []
+        packages = defaultdict(list)
+        for _ in range(args.repeat):
+            total, by_package = import_profile(module, cwd, env)
+            totals.append(total)
+            for package, self_us in by_package.items():
+                packages[package].append(self_us)
+
+        print(f"\n{module}: median import {statistics.median(totals) / 1000:.0f} ms "
+              f"(min {min(totals) / 1000:.0f}, max {max(totals) / 1000:.0f})")
+        ranked = sorted(packages.items(), key=lambda item: -statistics.median(item[1]))
+        for package, samples in ranked[:args.top]:
+            print(f"  {package:<28}{statistics.median(samples) / 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main_cli()
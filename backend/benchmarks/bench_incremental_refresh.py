@@ -0,0 +1,122 @@
+"""
+Benchmark: LLM spend of regenerating a stored quiz after an article edit.
+
+A quiz is generated for a synthetic article, then the article is edited
+(a share of its sections rewritten, with a new revision id) and the quiz is
+regenerated with force_regenerate, as a periodic refresh job would:
+
+- full: every regeneration starts from scratch (INCREMENTAL_REFRESH=false)
+- incremental: questions about unchanged sections are kept and only the
+  changed sections are sent to the LLM
+
+The Gemini client is replaced by fake_llm.FakeQuizLLM, which answers each
+prompt with the requested number of questions, each quoting a fact of one of
+the sections in the prompt, after a delay proportional to the prompt and
+response size.
+
+Usage:
+    python benchmarks/bench_incremental_refresh.py --sections 12 --input-rate 20000 --output-rate 800
+"""
+import argparse
+import asyncio
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+import pipeline
+import quiz_generator
+from fake_llm import YEAR, FakeQuizLLM
+from llm_limiter import AdaptiveConcurrencyLimit, LLMRateLimiter, estimate_tokens
+from quiz_store import MemoryQuizStore
+from scraper import canonical_article_key, parse_article_html
+from wiki_stub_server import build_article_html
+
+# Share of the sections edited between generation and refresh
+CHANGE_SHARES = [0.0, "one", 0.25, 0.5, 1.0]
+
+
+def edit_article(scraped, share):
+    """
+    Copy of a scraped article with a share of its sections rewritten and a
+    new revision id
+    """
+    edited = copy.deepcopy(scraped)
+    sections = list(dict.fromkeys(passage["section"] for passage in edited["passages"]))
+    if share == "one":
+        changed = set(sections[1:2])
+    else:
+        changed = set(sections[:round(len(sections) * share)])
+    for passage in edited["passages"]:
+        if passage["section"] in changed:
+            # Same length, other facts
+            passage["text"] = "Revised " + YEAR.sub(lambda match: str(int(match.group(1)) + 1), passage["text"])
+    edited["content"] = "\n".join(passage["text"] for passage in edited["passages"])
+    if changed:
+        edited["revision_id"] += 1
+    return edited, len(changed), len(sections)
+
+
+async def refresh(scraped, edited, incremental, args):
+    """
+    Generate the quiz for scraped, then regenerate it for edited
+
+    Returns:
+        (fake LLM of the refresh, seconds, questions kept, questions after)
+    """
+    store = MemoryQuizStore()
+    current = {"article": scraped}
+    quiz_pipeline = pipeline.QuizPipeline(store, scrape=lambda key, url, refresh: current["article"])
+    url = scraped["canonical_url"]
+    key = canonical_article_key(url)
+
+    quiz_generator.llm = FakeQuizLLM(input_rate=args.input_rate, output_rate=args.output_rate)
+    first = await quiz_pipeline.run(url, key)
+    before = {question["question"] for question in first.quiz}
+
+    pipeline.INCREMENTAL_REFRESH = incremental
+    llm = quiz_generator.llm = FakeQuizLLM(input_rate=args.input_rate, output_rate=args.output_rate)
+    current["article"] = edited
+    started = time.perf_counter()
+    refreshed = await quiz_pipeline.run(url, key, force_regenerate=True)
+    elapsed = time.perf_counter() - started
+    kept = sum(question["question"] in before for question in refreshed.quiz)
+    return llm, elapsed, kept, len(refreshed.quiz)
+
+
+async def run(args):
+    # No request budgets: only the calls themselves are measured
+    quiz_generator.llm_limiter = LLMRateLimiter(
+        rpm=0, tpm=0, concurrency=AdaptiveConcurrencyLimit(minimum=4, maximum=4)
+    )
+    title = "Benchmark refresh"
+    scraped = parse_article_html(
+        build_article_html(title, sections=args.sections, paragraphs=args.paragraphs, words=args.words),
+        "https://en.wikipedia.org/wiki/Benchmark_refresh"
+    )
+    print(f"{args.sections} sections, {estimate_tokens(scraped['content'])} tokens\n")
+    print(f"{'changed':<12}{'mode':<13}{'calls':>6}{'prompt tok':>12}{'output tok':>12}"
+          f"{'wall s':>8}{'kept':>6}{'questions':>11}")
+    for share in CHANGE_SHARES:
+        edited, changed, total = edit_article(scraped, share)
+        for mode in ("full", "incremental"):
+            llm, elapsed, kept, questions = await refresh(scraped, edited, mode == "incremental", args)
+            print(f"{f'{changed}/{total}':<12}{mode:<13}{llm.calls:>6}{llm.prompt_tokens:>12}"
+                  f"{llm.output_tokens:>12}{elapsed:>8.2f}{kept:>6}{questions:>11}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=12, help="Sections of the article")
+    parser.add_argument("--paragraphs", type=int, default=4, help="Paragraphs per section")
+    parser.add_argument("--words", type=int, default=50, help="Words per paragraph")
+    parser.add_argument("--input-rate", type=float, default=20000, help="Fake LLM prompt tokens per second")
+    parser.add_argument("--output-rate", type=float, default=800, help="Fake LLM response tokens per second")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,111 @@
+"""
+Benchmark: LLM calls and questions saved by repairing malformed responses.
+
+A quiz is generated for a synthetic article while the first LLM response is
+well-formed, has trailing commas, or is truncated (as when the model stops
+at its output limit), in two modes:
+
+- fallback: any response json.loads cannot parse is thrown away and the
+  local fallback quiz is stored, to be regenerated later by a full call
+  (the behaviour before the repair parser)
+- repair: the response is repaired (see json_stream.repair_json), every
+  complete question is kept, and a short quiz is topped up with a call for
+  the missing questions only
+
+The Gemini client is replaced by fake_llm.FakeQuizLLM. Also reports the
+time repair_json takes on the defective responses.
+
+Usage:
+    python benchmarks/bench_json_repair.py --sections 8 --output-rate 800
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+import quiz_generator
+from fake_llm import FakeQuizLLM
+from json_stream import repair_json
+from langchain_core.messages import HumanMessage
+from llm_limiter import AdaptiveConcurrencyLimit, LLMRateLimiter
+from scraper import parse_article_html
+from wiki_stub_server import build_article_html
+
+DEFECTS = ["", "trailing_commas", "truncated"]
+
+
+def generate(scraped, defect, repair, args):
+    """
+    Generate the quiz of an article with a defective first response
+
+    Returns:
+        (fake LLM, seconds, quiz)
+    """
+    quiz_generator.repair_json = repair_json if repair else (lambda text: None)
+    quiz_generator.MIN_QUIZ_QUESTIONS = 8 if repair else 0
+    llm = quiz_generator.llm = FakeQuizLLM(
+        latency=args.latency, input_rate=args.input_rate, output_rate=args.output_rate, defect=defect
+    )
+    started = time.perf_counter()
+    quiz = quiz_generator.generate_quiz_from_content(
+        scraped["title"], scraped["content"], scraped["sections"], use_cache=False,
+        passages=scraped["passages"], links=scraped["links"]
+    )
+    return llm, time.perf_counter() - started, quiz
+
+
+def repair_timings(scraped, repeat):
+    """
+    Median milliseconds of repair_json on each kind of defective response
+    """
+    prompt = f"Generate exactly 10 questions about {scraped['title']}.\n\n{scraped['content']}"
+    timings = {}
+    for defect in DEFECTS[1:]:
+        llm = FakeQuizLLM(input_rate=float("inf"), output_rate=float("inf"), defect=defect)
+        response = llm.invoke([HumanMessage(content=prompt)]).content
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            repair_json(response)
+            samples.append(time.perf_counter() - started)
+        timings[defect] = (len(response), statistics.median(samples) * 1000)
+    return timings
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=8, help="Sections of the article")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake LLM seconds per call")
+    parser.add_argument("--input-rate", type=float, default=20000, help="Fake LLM prompt tokens per second")
+    parser.add_argument("--output-rate", type=float, default=800, help="Fake LLM response tokens per second")
+    parser.add_argument("--repeat", type=int, default=200, help="repair_json runs per response")
+    args = parser.parse_args()
+
+    # No request budgets: only the calls themselves are measured
+    quiz_generator.llm_limiter = LLMRateLimiter(
+        rpm=0, tpm=0, concurrency=AdaptiveConcurrencyLimit(minimum=4, maximum=4)
+    )
+    scraped = parse_article_html(
+        build_article_html("Benchmark repair", sections=args.sections),
+        "https://en.wikipedia.org/wiki/Benchmark_repair"
+    )
+    print(f"{'response':<17}{'mode':<10}{'calls':>6}{'output tok':>12}{'wall s':>8}"
+          f"{'LLM questions':>15}{'fallback':>10}")
+    for defect in DEFECTS:
+        for mode in ("fallback", "repair"):
+            llm, elapsed, quiz = generate(scraped, defect, mode == "repair", args)
+            fallback = bool(quiz.get("is_fallback"))
+            print(f"{defect or 'well-formed':<17}{mode:<10}{llm.calls:>6}{llm.output_tokens:>12}"
+                  f"{elapsed:>8.2f}{0 if fallback else len(quiz['quiz']):>15}{'yes' if fallback else 'no':>10}")
+
+    print(f"\n{'response':<17}{'chars':>8}{'repair ms':>11}")
+    for defect, (chars, elapsed) in repair_timings(scraped, args.repeat).items():
+        print(f"{defect:<17}{chars:>8}{elapsed:>11.3f}")
+
+
+if __name__ == "__main__":
+    main_cli()
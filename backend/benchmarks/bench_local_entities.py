@@ -0,0 +1,106 @@
+"""
+Benchmark: LLM output tokens and latency saved by making the summary, key
+entities and related topics locally (LOCAL_ENTITIES, see entities.py).
+
+Quizzes are generated for articles of growing size, built from encyclopedic
+sentences with links, in both modes:
+
+- llm: the prompt asks the LLM for every field (LOCAL_ENTITIES=false)
+- local: the prompt asks for the questions only, and the other fields are
+  extracted from the article while the LLM call runs
+
+The Gemini client is replaced by fake_llm.FakeQuizLLM, whose delay is
+proportional to the prompt and response tokens, and which only writes the
+fields a prompt asks for.
+
+Usage:
+    python benchmarks/bench_local_entities.py --output-rate 800 --repeat 3
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+import quiz_generator
+from bench_local_questions import PLACES, PEOPLE, ORGANIZATIONS, build_article
+from fake_llm import FakeQuizLLM
+from llm_limiter import AdaptiveConcurrencyLimit, LLMRateLimiter
+from scraper import parse_article_html
+
+# Sections of the generated articles
+SIZES = [4, 16, 64]
+LINKED_NAMES = PEOPLE + PLACES + ORGANIZATIONS
+
+
+def link_names(page: str) -> str:
+    """
+    The page with the first mention of each name in a paragraph linked, as
+    Wikipedia does
+    """
+    def link_paragraph(match):
+        paragraph = match.group(0)
+        for name in LINKED_NAMES:
+            paragraph = paragraph.replace(name, f"<a href=\"/wiki/{name.replace(' ', '_')}\">{name}</a>", 1)
+        return paragraph
+    return re.sub(r"<p>.*?</p>", link_paragraph, page)
+
+
+def generate(scraped, local, args):
+    """
+    Generate the quiz of an article in one mode
+
+    Returns:
+        (fake LLM, median seconds, quiz)
+    """
+    quiz_generator.LOCAL_ENTITIES = local
+    timings = []
+    for _ in range(args.repeat):
+        llm = quiz_generator.llm = FakeQuizLLM(
+            latency=args.latency, input_rate=args.input_rate, output_rate=args.output_rate
+        )
+        started = time.perf_counter()
+        quiz = quiz_generator.generate_quiz_from_content(
+            scraped["title"], scraped["content"], scraped["sections"], use_cache=False,
+            passages=scraped["passages"], links=scraped["links"]
+        )
+        timings.append(time.perf_counter() - started)
+    return llm, statistics.median(timings), quiz
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Generations per article and mode")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake LLM seconds per call")
+    parser.add_argument("--input-rate", type=float, default=20000, help="Fake LLM prompt tokens per second")
+    parser.add_argument("--output-rate", type=float, default=800, help="Fake LLM response tokens per second")
+    args = parser.parse_args()
+
+    # No request budgets: only the calls themselves are measured
+    quiz_generator.llm_limiter = LLMRateLimiter(
+        rpm=0, tpm=0, concurrency=AdaptiveConcurrencyLimit(minimum=8, maximum=8)
+    )
+    print(f"{'article':<14}{'mode':<7}{'calls':>6}{'prompt tok':>12}{'output tok':>12}"
+          f"{'wall s':>8}{'entities':>10}{'topics':>8}{'questions':>11}")
+    for sections in SIZES:
+        page = link_names(build_article("History of computing", sections))
+        scraped = parse_article_html(page, "https://en.wikipedia.org/wiki/History_of_computing")
+        results = {}
+        for mode in ("llm", "local"):
+            llm, elapsed, quiz = generate(scraped, mode == "local", args)
+            results[mode] = (llm.output_tokens, elapsed)
+            entities = sum(len(names) for names in quiz["key_entities"].values())
+            print(f"{f'{sections} sections':<14}{mode:<7}{llm.calls:>6}{llm.prompt_tokens:>12}"
+                  f"{llm.output_tokens:>12}{elapsed:>8.2f}{entities:>10}{len(quiz['related_topics']):>8}"
+                  f"{len(quiz['quiz']):>11}")
+        tokens_saved = 1 - results["local"][0] / results["llm"][0]
+        time_saved = 1 - results["local"][1] / results["llm"][1]
+        print(f"{'':<14}saved {tokens_saved:.0%} of output tokens, {time_saved:.0%} of wall time\n")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,104 @@
+"""
+Benchmark: throughput of the local question engine (local_questions.py).
+
+Quizzes are generated without the LLM for articles of growing size, built
+from encyclopedic sentences (people, places, organisations, years and
+numbers, so every kind of question has material), and for the sample_data
+articles. Reports the time per quiz, articles and characters per second, and
+how many questions were produced.
+
+Usage:
+    python benchmarks/bench_local_questions.py --repeat 20
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_extraction import load_pages
+from local_questions import generate_local_quiz
+from quiz_generator import validate_quiz_question
+from scraper import parse_article_html
+
+# Sections of the generated articles
+SIZES = [4, 16, 64, 256]
+
+PEOPLE = ["Ada Lovelace", "Charles Babbage", "John von Neumann", "Grace Hopper", "Claude Shannon",
+          "Alonzo Church", "Kurt Gödel", "Max Newman", "Joan Clarke", "Dilly Knox"]
+PLACES = ["Cambridge", "Princeton", "Manchester", "Bletchley Park", "London", "Paris",
+          "New York", "Berlin", "Vienna", "Edinburgh"]
+ORGANIZATIONS = ["Royal Society", "National Physical Laboratory", "Bell Labs", "Institute for Advanced Study",
+                 "Government Code and Cypher School", "University of Manchester", "Admiralty", "IBM"]
+TEMPLATES = [
+    "{person} moved to {place} in {year} to work with the {organization}.",
+    "In {year}, the {organization} published a report by {person} of {number} pages.",
+    "{person} was elected a fellow of the {organization} in {year}.",
+    "The laboratory in {place} employed {number} staff by {year}, among them {person}.",
+    "A memorial to {person} was unveiled in {place} in {year} by the {organization}.",
+    "The {organization} funded {number} machines built in {place} between {year} and {year2}.",
+]
+
+
+def build_article(title: str, sections: int, seed: int = 0) -> str:
+    """
+    Article page with sections of encyclopedic sentences
+    """
+    rng = random.Random(f"{title}:{sections}:{seed}")
+
+    def paragraph():
+        sentences = []
+        for _ in range(4):
+            year = rng.randint(1900, 2000)
+            sentences.append(rng.choice(TEMPLATES).format(
+                person=rng.choice(PEOPLE), place=rng.choice(PLACES),
+                organization=rng.choice(ORGANIZATIONS), year=year, year2=year + rng.randint(1, 9),
+                number=f"{rng.randint(2, 5000):,}"
+            ))
+        return f"<p>{' '.join(sentences)}</p>"
+
+    body = [paragraph(), paragraph()]
+    for index in range(sections):
+        body.append(f"<h2><span class=\"mw-headline\">Period {index + 1}</span></h2>")
+        body.extend(paragraph() for _ in range(3))
+    path_title = title.replace(' ', '_')
+    return (f"<html><head><link rel=\"canonical\" href=\"https://en.wikipedia.org/wiki/{path_title}\"></head>"
+            f"<body><h1 id=\"firstHeading\">{title}</h1><div id=\"mw-content-text\">"
+            + "".join(body) + "</div></body></html>")
+
+
+def measure(scraped, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        quiz = generate_local_quiz(scraped["title"], scraped["content"], scraped["sections"],
+                                   scraped["passages"])
+        timings.append(time.perf_counter() - started)
+    assert all(validate_quiz_question(question) for question in quiz["quiz"])
+    return statistics.median(timings), quiz
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="Quizzes generated per article")
+    args = parser.parse_args()
+
+    articles = {name: page for name, page in load_pages().items() if name.endswith(".json")}
+    for sections in SIZES:
+        articles[f"{sections} sections"] = build_article("History of computing", sections)
+
+    print(f"{'article':<30}{'chars':>10}{'ms/quiz':>10}{'quizzes/s':>11}{'Mchars/s':>10}{'questions':>11}")
+    for name, page in articles.items():
+        scraped = parse_article_html(page, "https://en.wikipedia.org/wiki/History_of_computing")
+        elapsed, quiz = measure(scraped, args.repeat)
+        chars = len(scraped["content"])
+        kinds = len({question["difficulty"] for question in quiz["quiz"]})
+        print(f"{name:<30}{chars:>10}{elapsed * 1000:>10.2f}{1 / elapsed:>11.0f}{chars / elapsed / 1e6:>10.2f}"
+              f"{len(quiz['quiz']):>7} ({kinds} difficulties)")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,152 @@
+"""
+Benchmark: quiz generation bursts against a throttling LLM provider.
+
+The Gemini client is replaced by a fake chat model that enforces a provider
+quota (requests per sliding window and concurrent requests) and raises
+ResourceExhausted, as google.api_core does for HTTP 429, when it is exceeded.
+A burst of generations is run on a thread pool, once with the old behaviour
+(no client-side limits, no retries) and once through llm_limiter.
+
+The quota window is shortened (default 6s) so the run takes seconds; the
+limiter's per-minute budget is scaled to match.
+
+Usage:
+    python benchmarks/bench_rate_limit.py --requests 30 --quota 10 --window 6
+"""
+import argparse
+import collections
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import quiz_generator
+from llm_limiter import AdaptiveConcurrencyLimit, LLMRateLimiter
+
+RESPONSE = """{"summary": "Benchmark.", "key_entities": {"people": [], "organizations": [], "locations": []},
+"quiz": [{"question": "Q?", "options": ["A", "B", "C", "D"], "answer": "A", "difficulty": "easy",
+"explanation": "Benchmark."}], "related_topics": []}"""
+
+
+class ResourceExhausted(Exception):
+    """
+    Same name as google.api_core.exceptions.ResourceExhausted (HTTP 429)
+    """
+    code = 429
+
+
+class ProviderQuota:
+    """
+    Sliding-window request quota plus a cap on concurrent requests
+    """
+
+    def __init__(self, requests_per_window: int, window: float, max_concurrent: int):
+        self.requests_per_window = requests_per_window
+        self.window = window
+        self.max_concurrent = max_concurrent
+        self.accepted = collections.deque()
+        self.in_flight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            now = time.monotonic()
+            while self.accepted and now - self.accepted[0] > self.window:
+                self.accepted.popleft()
+            if len(self.accepted) >= self.requests_per_window or self.in_flight >= self.max_concurrent:
+                self.rejected += 1
+                raise ResourceExhausted("429 Resource has been exhausted (e.g. check quota).")
+            self.accepted.append(now)
+            self.in_flight += 1
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+class FakeThrottlingLLM(BaseChatModel):
+    """
+    Chat model that answers after a fixed latency unless the quota rejects it
+    """
+
+    quota: Any
+    latency: float = 0.5
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-throttling"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.quota.enter()
+        try:
+            time.sleep(self.latency)
+        finally:
+            self.quota.leave()
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=RESPONSE))])
+
+
+def run_burst(args, limiter: LLMRateLimiter, label: str):
+    quota = ProviderQuota(args.quota, args.window, args.provider_concurrency)
+    quiz_generator.llm = FakeThrottlingLLM(quota=quota, latency=args.latency)
+    quiz_generator.llm_limiter = limiter
+
+    def generate(index):
+        return quiz_generator.generate_quiz_from_content(
+            title=f"{label} article {index}", content="Benchmark content.",
+            sections=["History"], use_cache=False
+        )
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(generate, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    fallbacks = sum(1 for result in results if result.get("is_fallback"))
+    print(f"{label}")
+    print(f"  quizzes:           {len(results) - fallbacks}/{len(results)}")
+    print(f"  fallback quizzes:  {fallbacks}")
+    print(f"  provider 429s:     {quota.rejected}")
+    print(f"  wall time (s):     {elapsed:.2f}")
+    print(f"  limiter:           {limiter.stats()}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=30, help="Generations in the burst")
+    parser.add_argument("--threads", type=int, default=8, help="Generation threads")
+    parser.add_argument("--quota", type=int, default=10, help="Provider requests per window")
+    parser.add_argument("--window", type=float, default=6.0, help="Provider quota window (s)")
+    parser.add_argument("--provider-concurrency", type=int, default=4, help="Provider concurrent request cap")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake LLM latency (s)")
+    args = parser.parse_args()
+
+    unlimited = LLMRateLimiter(
+        rpm=0, tpm=0, max_retries=0,
+        concurrency=AdaptiveConcurrencyLimit(minimum=args.threads, maximum=args.threads)
+    )
+    run_burst(args, unlimited, "no client-side limits")
+
+    # Leave the window from the first run behind so both start with a full quota
+    time.sleep(args.window)
+
+    scaled_rpm = int(args.quota * 60 / args.window)
+    limited = LLMRateLimiter(
+        rpm=scaled_rpm, tpm=0, max_retries=6, retry_base=args.window / 10, retry_max=args.window,
+        concurrency=AdaptiveConcurrencyLimit(minimum=1, maximum=args.provider_concurrency,
+                                             latency_target=args.latency * 4)
+    )
+    run_burst(args, limited, f"llm_limiter ({scaled_rpm} RPM)")
+
+
+if __name__ == "__main__":
+    main_cli()
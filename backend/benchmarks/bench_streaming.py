@@ -0,0 +1,209 @@
+"""
+Benchmark: time to first question, blocking vs streaming generation.
+
+The Gemini client is replaced by a fake chat model that emits a canned quiz
+response a few characters at a time at a configurable token rate, and
+scraping by a sleep, so the benchmark runs offline. The blocking path
+(POST /api/generate-quiz) delivers its first question with the complete
+response; the streaming path (POST /api/generate-quiz/stream) as soon as the
+first question's JSON object has been generated.
+
+The app is driven directly over ASGI so the arrival time of every response
+chunk can be recorded.
+
+Usage:
+    python benchmarks/bench_streaming.py --runs 5 --tokens-per-second 250
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Iterator, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Use a throwaway database so the benchmark never touches wiki_quiz.db
+_db_dir = tempfile.mkdtemp(prefix="wiki-quiz-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+import main
+import quiz_generator
+
+# The ASGI transport does not send lifespan events, so create the tables here
+main.prepare_database()
+
+# Roughly four characters per token
+CHARS_PER_TOKEN = 4
+
+
+def canned_response(questions: int = 10) -> str:
+    """
+    Quiz JSON in the shape QUIZ_GENERATION_PROMPT asks for, in a code fence
+    """
+    difficulties = ["easy", "medium", "hard"]
+    data = {
+        "summary": "A benchmark article used to measure streaming latency. " * 3,
+        "key_entities": {
+            "people": ["Alan Turing", "Alonzo Church"],
+            "organizations": ["University of Cambridge"],
+            "locations": ["Bletchley Park"]
+        },
+        "quiz": [
+            {
+                "question": f"Benchmark question number {i + 1} about the article content?",
+                "options": [f"Option {letter} for question {i + 1}" for letter in "ABCD"],
+                "answer": f"Option A for question {i + 1}",
+                "difficulty": difficulties[i % 3],
+                "explanation": "The article states this in the section used for the benchmark."
+            }
+            for i in range(questions)
+        ],
+        "related_topics": ["Computability", "Cryptanalysis", "Turing machine"]
+    }
+    return "```json\n" + json.dumps(data, indent=2) + "\n```"
+
+
+class FakeStreamingLLM(BaseChatModel):
+    """
+    Chat model that returns a fixed response at a fixed token rate
+    """
+
+    response: str
+    tokens_per_second: float = 250.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    def _pieces(self) -> List[str]:
+        return [self.response[i:i + CHARS_PER_TOKEN]
+                for i in range(0, len(self.response), CHARS_PER_TOKEN)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(len(self._pieces()) / self.tokens_per_second)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        start = time.perf_counter()
+        for index, piece in enumerate(self._pieces(), 1):
+            # Pace against the schedule so sleep overhead doesn't accumulate
+            time.sleep(max(0.0, start + index / self.tokens_per_second - time.perf_counter()))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+
+def install_fakes(scrape_delay: float):
+    """
+    Replace scraping with a blocking sleep
+    """
+    def fake_scrape(url):
+        time.sleep(scrape_delay)
+        return {
+            "title": url.rsplit('/', 1)[-1],
+            "canonical_url": url,
+            "content": "Benchmark content.",
+            "sections": ["History"],
+            "summary": "Benchmark summary.",
+            "raw_html": ""
+        }
+
+    main.scrape_wikipedia = fake_scrape
+
+
+async def timed_post(path: str, payload: dict) -> List[tuple]:
+    """
+    POST to the app over ASGI, returning (seconds since start, body chunk) pairs
+    """
+    body = json.dumps(payload).encode("utf-8")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80)
+    }
+    received = False
+    finished = asyncio.Event()
+    chunks = []
+    start = time.perf_counter()
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            chunks.append((time.perf_counter() - start, message.get("body", b"")))
+            if not message.get("more_body"):
+                finished.set()
+
+    await main.app(scope, receive, send)
+    return chunks
+
+
+def first_question_at(chunks: List[tuple]) -> Optional[float]:
+    for elapsed, chunk in chunks:
+        if b"event: question" in chunk:
+            return elapsed
+    return None
+
+
+async def run(args):
+    results = {"blocking": {"first": [], "total": []}, "streaming": {"first": [], "total": []}}
+    for run_index in range(args.runs):
+        # Distinct articles so neither the quiz table nor the LLM cache answers
+        chunks = await timed_post("/api/generate-quiz", {
+            "url": f"https://en.wikipedia.org/wiki/Blocking_{run_index}"
+        })
+        total = chunks[-1][0]
+        assert json.loads(b"".join(c for _, c in chunks))["quiz"], "blocking run produced no quiz"
+        # The whole response arrives at once, so the first question does too
+        results["blocking"]["first"].append(total)
+        results["blocking"]["total"].append(total)
+
+        chunks = await timed_post("/api/generate-quiz/stream", {
+            "url": f"https://en.wikipedia.org/wiki/Streaming_{run_index}"
+        })
+        first = first_question_at(chunks)
+        assert first is not None, "streaming run produced no question event"
+        results["streaming"]["first"].append(first)
+        results["streaming"]["total"].append(chunks[-1][0])
+
+    tokens = len(args.response) / CHARS_PER_TOKEN
+    print(f"runs:                 {args.runs}")
+    print(f"fake LLM:             {tokens:.0f} tokens at {args.tokens_per_second:.0f} tokens/s")
+    print(f"scrape delay:         {args.scrape_delay:.2f}s")
+    print(f"{'mode':<12} {'first question p50 (s)':>24} {'complete p50 (s)':>18}")
+    for mode, samples in results.items():
+        print(f"{mode:<12} {statistics.median(samples['first']):>24.3f} "
+              f"{statistics.median(samples['total']):>18.3f}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Generations per mode")
+    parser.add_argument("--tokens-per-second", type=float, default=250, help="Fake LLM output rate")
+    parser.add_argument("--questions", type=int, default=10, help="Questions in the fake response")
+    parser.add_argument("--scrape-delay", type=float, default=0.2, help="Simulated scrape seconds")
+    args = parser.parse_args()
+
+    args.response = canned_response(args.questions)
+    quiz_generator.llm = FakeStreamingLLM(response=args.response, tokens_per_second=args.tokens_per_second)
+    install_fakes(args.scrape_delay)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main_cli()
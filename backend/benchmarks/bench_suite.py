@@ -0,0 +1,425 @@
+"""
+Benchmark suite: throughput, latency percentiles and peak memory of every
+stage of quiz generation, offline, with stored baselines to catch
+regressions.
+
+Stages:
+
+- scrape: scrape_wikipedia over article pages of several sizes (stub to
+  featured), replayed by the local Wikipedia stand-in. Pages recorded with
+  --record into fixtures/html/ are replayed next to the synthetic ones.
+- generate: generate_quiz_from_content for the same articles, against
+  fake_llm.FakeQuizLLM with a configurable latency (chunked generation
+  kicks in for the long ones)
+- local_generate: generate_local_quiz (no LLM) for the same articles
+- extract_json: extract_json_from_response on plain, fenced,
+  prose-wrapped and malformed (trailing commas, truncated) quiz responses
+- api_generate / api_cached / api_history: the FastAPI endpoints under
+  --concurrency concurrent requests (new articles, stored quizzes and the
+  history list), with the stage breakdown of their Server-Timing headers
+
+Each stage reports operations, throughput, p50/p99 latency (best of
+--repeat runs) and the peak of traced memory (a separate run under
+tracemalloc, so tracing does not skew the timings). --save-baseline stores
+the results in baselines/<name>.json; later runs with the same options are
+compared with it and exit with status 1 if a stage got slower, lost
+throughput or needs more memory beyond --tolerance. Baselines depend on the
+machine: record one per machine (or CI runner) you compare on.
+
+Usage:
+    python benchmarks/bench_suite.py --save-baseline
+    python benchmarks/bench_suite.py --concurrency 16 --llm-latency 0.2
+    python benchmarks/bench_suite.py --stages scrape,extract_json --iterations 50
+    python benchmarks/bench_suite.py --record https://en.wikipedia.org/wiki/Alan_Turing
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Use a throwaway database so the benchmark never touches wiki_quiz.db
+_db_dir = tempfile.mkdtemp(prefix="wiki-quiz-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+import httpx
+from langchain_core.messages import HumanMessage
+
+import http_client
+import main
+import quiz_generator
+import scraper
+from fake_llm import FakeQuizLLM
+from llm_limiter import AdaptiveConcurrencyLimit, LLMRateLimiter
+from local_questions import generate_local_quiz
+from wiki_stub_server import FIXTURES_DIR, WIKIPEDIA_ORIGIN, WikiStubServer, build_article_html
+
+# The ASGI transport does not send lifespan events, so create the tables here
+main.prepare_database()
+
+HTML_FIXTURES_DIR = os.path.join(FIXTURES_DIR, 'html')
+BASELINES_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+
+# Synthetic article sizes: sections, paragraphs per section, words per paragraph
+ARTICLE_SIZES = {
+    "stub": dict(sections=1, paragraphs=2, words=40),
+    "short": dict(sections=4, paragraphs=3, words=60),
+    "medium": dict(sections=8, paragraphs=4, words=80),
+    "long": dict(sections=16, paragraphs=5, words=100),
+    "featured": dict(sections=32, paragraphs=6, words=120),
+}
+STAGES = ["scrape", "generate", "local_generate", "extract_json", "api_generate", "api_cached", "api_history"]
+SERVER_TIMING = re.compile(r'([a-z_]+);dur=([\d.]+)')
+# Latency changes below this many milliseconds are noise, not regressions
+MIN_LATENCY_DELTA_MS = 1.0
+
+
+def percentile(samples, pct):
+    """
+    Nearest-rank percentile of a list of samples
+    """
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def fixture_name(title: str) -> str:
+    return re.sub(r'[^A-Za-z0-9]+', '_', title).strip('_').lower()
+
+
+def recorded_pages():
+    """
+    {title: HTML} of the pages recorded into fixtures/html/
+    """
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(HTML_FIXTURES_DIR, '*.html'))):
+        with open(path, encoding='utf-8') as f:
+            page = f.read()
+        title = re.search(r'<title>(.*?) - Wikipedia</title>', page)
+        pages[title.group(1) if title else os.path.basename(path)[:-5]] = page
+    return pages
+
+
+def record_pages(urls):
+    """
+    Save live article pages into fixtures/html/ for later replay
+    """
+    os.makedirs(HTML_FIXTURES_DIR, exist_ok=True)
+    for url in urls:
+        response = http_client.get_session().get(url, timeout=http_client.WIKI_HTTP_TIMEOUT)
+        response.raise_for_status()
+        path = os.path.join(HTML_FIXTURES_DIR, fixture_name(scraper.extract_article_title_from_url(url)) + '.html')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(response.text)
+        print(f"recorded {url} -> {os.path.relpath(path)} ({len(response.content)} bytes)")
+
+
+class Articles:
+    """
+    Pages served by the stub: recorded fixtures by title, synthetic articles
+    of a given size for "Fixture <size> ..." titles
+    """
+
+    def __init__(self):
+        self.recorded = recorded_pages()
+
+    def titles(self):
+        return [f"Fixture {size}" for size in ARTICLE_SIZES] + list(self.recorded)
+
+    def __call__(self, title: str) -> str:
+        if title in self.recorded:
+            return self.recorded[title]
+        size = title.split()[1] if title.startswith("Fixture ") else "medium"
+        return build_article_html(title, **ARTICLE_SIZES.get(size, ARTICLE_SIZES["medium"]))
+
+
+def article_url(title: str) -> str:
+    return f"{WIKIPEDIA_ORIGIN}/wiki/{title.replace(' ', '_')}"
+
+
+class Suite:
+    """
+    Runs the stages; each run_<stage>(round) performs the stage's operations
+    once and returns their latencies in seconds
+    """
+
+    def __init__(self, args, articles: Articles):
+        self.args = args
+        self.articles = articles
+        self.scraped = {}
+        self.responses = []
+        self.quiz_urls = []
+        self.server_timings = {}
+
+    def fresh_scrape(self, url):
+        # No revalidation: every scrape downloads and parses the page
+        scraper.article_validators = http_client.ValidatorCache(max_entries=0)
+        return scraper.scrape_wikipedia(url)
+
+    async def run_scrape(self, round_index):
+        latencies = []
+        for _ in range(self.args.iterations):
+            for title in self.articles.titles():
+                started = time.perf_counter()
+                result = self.fresh_scrape(article_url(title))
+                latencies.append(time.perf_counter() - started)
+                self.scraped[title] = result
+        return latencies
+
+    async def prepare(self, name):
+        """
+        Inputs a stage needs from an earlier one, produced outside its timing
+        """
+        if name in ("generate", "local_generate", "extract_json") and not self.scraped:
+            await self.run_scrape(0)
+        if name == "extract_json":
+            self.quiz_responses()
+        if name == "api_cached" and not self.quiz_urls:
+            await self.run_api_generate(0)
+
+    async def run_generate(self, round_index):
+        latencies = []
+        for _ in range(max(1, self.args.iterations // 5)):
+            for scraped in self.scraped.values():
+                started = time.perf_counter()
+                quiz_generator.generate_quiz_from_content(
+                    scraped["title"], scraped["content"], scraped["sections"],
+                    use_cache=False, passages=scraped.get("passages")
+                )
+                latencies.append(time.perf_counter() - started)
+        return latencies
+
+    async def run_local_generate(self, round_index):
+        latencies = []
+        for _ in range(self.args.iterations):
+            for scraped in self.scraped.values():
+                started = time.perf_counter()
+                generate_local_quiz(scraped["title"], scraped["content"], scraped["sections"],
+                                    scraped.get("passages"))
+                latencies.append(time.perf_counter() - started)
+        return latencies
+
+    def quiz_responses(self):
+        """
+        Fake LLM responses for every article, plain, fenced, with prose
+        around the fence, and malformed ones that need repairing
+        """
+        if not self.responses:
+            llm = FakeQuizLLM(input_rate=float("inf"), output_rate=float("inf"))
+            for scraped in self.scraped.values():
+                prompt = f"Generate exactly 10 questions about {scraped['title']}.\n\n{scraped['content']}"
+                plain = llm.invoke([HumanMessage(content=prompt)]).content
+                self.responses += [
+                    plain,
+                    f"```json\n{plain}\n```",
+                    f"Here is the quiz you asked for:\n```json\n{plain}\n```\nLet me know if you need more."
+                ]
+                for defect in ("trailing_commas", "truncated"):
+                    defective = FakeQuizLLM(input_rate=float("inf"), output_rate=float("inf"), defect=defect)
+                    self.responses.append(defective.invoke([HumanMessage(content=prompt)]).content)
+        return self.responses
+
+    async def run_extract_json(self, round_index):
+        latencies = []
+        responses = self.quiz_responses()
+        for _ in range(self.args.iterations * 10):
+            for response in responses:
+                started = time.perf_counter()
+                quiz_generator.extract_json_from_response(response)
+                latencies.append(time.perf_counter() - started)
+        return latencies
+
+    async def drive(self, requests):
+        """
+        Send (method, path, body) requests to the app, at most --concurrency
+        at a time
+        """
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+            async def send(method, path, body):
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.request(method, path, json=body)
+                    elapsed = time.perf_counter() - started
+                response.raise_for_status()
+                for name, duration in SERVER_TIMING.findall(response.headers.get("server-timing", "")):
+                    self.server_timings.setdefault(name, []).append(float(duration) / 1000)
+                return elapsed, response
+
+            results = await asyncio.gather(*(send(*request) for request in requests))
+        return results
+
+    async def run_api_generate(self, round_index):
+        # New articles each round, so nothing is stored or cached yet
+        urls = [article_url(f"Fixture medium {round_index} {index}") for index in range(self.args.requests)]
+        results = await self.drive([("POST", "/api/generate-quiz", {"url": url}) for url in urls])
+        self.quiz_urls = urls
+        return [elapsed for elapsed, _ in results]
+
+    async def run_api_cached(self, round_index):
+        results = await self.drive([("POST", "/api/generate-quiz", {"url": url}) for url in self.quiz_urls])
+        return [elapsed for elapsed, _ in results]
+
+    async def run_api_history(self, round_index):
+        results = await self.drive([("GET", "/api/history", None)] * self.args.requests)
+        return [elapsed for elapsed, _ in results]
+
+
+async def measure(suite: Suite, name: str, repeat: int):
+    """
+    Best of repeat timed runs (the least disturbed by the rest of the
+    machine), then a traced run for the memory peak
+    """
+    run_stage = getattr(suite, f"run_{name}")
+    await suite.prepare(name)
+    suite.server_timings = {}
+    runs = []
+    for round_index in range(repeat):
+        started = time.perf_counter()
+        latencies = await run_stage(round_index)
+        runs.append((latencies, time.perf_counter() - started))
+    server_timings = suite.server_timings
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        await run_stage(repeat)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "operations": len(runs[0][0]),
+        "throughput": max(len(latencies) / wall for latencies, wall in runs),
+        "p50_ms": min(percentile(latencies, 50) for latencies, _ in runs) * 1000,
+        "p99_ms": min(percentile(latencies, 99) for latencies, _ in runs) * 1000,
+        "peak_mib": peak / 2 ** 20,
+    }, server_timings
+
+
+def settings(args):
+    """
+    Options the results depend on; only runs with the same ones are compared
+    """
+    return {field: getattr(args, field) for field in (
+        "iterations", "repeat", "requests", "concurrency", "llm_latency", "input_rate", "output_rate"
+    )}
+
+
+def regressions(results, baseline, tolerance):
+    """
+    Human-readable list of what got worse than the baseline
+    """
+    found = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        # A p99 over a few dozen requests is close to their maximum: it gets
+        # twice the tolerance
+        for field, allowed in (("p50_ms", tolerance), ("p99_ms", 2 * tolerance)):
+            if (result[field] > expected[field] * (1 + allowed)
+                    and result[field] - expected[field] > MIN_LATENCY_DELTA_MS):
+                found.append(f"{name} {field}: {result[field]:.2f} (baseline {expected[field]:.2f})")
+        if result["throughput"] < expected["throughput"] / (1 + tolerance):
+            found.append(f"{name} throughput: {result['throughput']:.1f}/s (baseline {expected['throughput']:.1f}/s)")
+        if result["peak_mib"] > expected["peak_mib"] * (1 + tolerance) and result["peak_mib"] - expected["peak_mib"] > 1:
+            found.append(f"{name} peak_mib: {result['peak_mib']:.1f} (baseline {expected['peak_mib']:.1f})")
+    return found
+
+
+async def run(args):
+    # Only the fake LLM's own latency is measured, not request budgets
+    quiz_generator.llm_limiter = LLMRateLimiter(
+        rpm=0, tpm=0, concurrency=AdaptiveConcurrencyLimit(minimum=args.concurrency, maximum=args.concurrency)
+    )
+    quiz_generator.llm = FakeQuizLLM(latency=args.llm_latency, input_rate=args.input_rate,
+                                     output_rate=args.output_rate)
+    articles = Articles()
+    suite = Suite(args, articles)
+    stages = args.stages.split(",") if args.stages else STAGES
+
+    results = {}
+    with WikiStubServer(articles) as stub:
+        stub.install(http_client.get_session(), pool_maxsize=http_client.WIKI_HTTP_POOL_SIZE)
+        print(f"{len(articles.titles())} articles ({len(articles.recorded)} recorded), "
+              f"concurrency {args.concurrency}, LLM latency {args.llm_latency * 1000:.0f} ms\n")
+        print(f"{'stage':<15}{'ops':>7}{'ops/s':>11}{'p50 ms':>10}{'p99 ms':>10}{'peak MiB':>10}")
+        for name in stages:
+            result, server_timings = await measure(suite, name, args.repeat)
+            results[name] = result
+            print(f"{name:<15}{result['operations']:>7}{result['throughput']:>11.1f}{result['p50_ms']:>10.2f}"
+                  f"{result['p99_ms']:>10.2f}{result['peak_mib']:>10.1f}")
+            breakdown = ", ".join(
+                f"{stage_name} {percentile(durations, 50) * 1000:.1f}"
+                for stage_name, durations in server_timings.items() if stage_name != "total"
+            )
+            if breakdown:
+                print(f"{'':<15}server p50 ms: {breakdown}")
+
+    baseline_path = os.path.join(BASELINES_DIR, f"{args.baseline}.json")
+    stored = {"settings": settings(args), "stages": {}}
+    if os.path.exists(baseline_path):
+        with open(baseline_path, encoding='utf-8') as f:
+            stored = json.load(f)
+    if args.save_baseline:
+        if stored["settings"] != settings(args):
+            stored = {"settings": settings(args), "stages": {}}
+        stored["stages"].update({name: {field: round(value, 3) for field, value in result.items()}
+                                 for name, result in results.items()})
+        os.makedirs(BASELINES_DIR, exist_ok=True)
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nbaseline saved to {os.path.relpath(baseline_path)}")
+        return 0
+    if not stored["stages"]:
+        print(f"\nno baseline at {os.path.relpath(baseline_path)} (run with --save-baseline)")
+        return 0
+    if stored["settings"] != settings(args):
+        print(f"\nnot compared: {os.path.relpath(baseline_path)} was recorded with {stored['settings']}")
+        return 0
+    found = regressions(results, stored["stages"], args.tolerance)
+    if found:
+        print(f"\nregressions beyond {args.tolerance:.0%} of {os.path.relpath(baseline_path)}:")
+        for line in found:
+            print(f"  {line}")
+        return 1
+    print(f"\nwithin {args.tolerance:.0%} of {os.path.relpath(baseline_path)}")
+    return 0
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", help=f"Comma-separated subset of {','.join(STAGES)}")
+    parser.add_argument("--iterations", type=int, default=10, help="Passes over the articles per stage")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (the best one counts)")
+    parser.add_argument("--requests", type=int, default=32, help="HTTP requests per API stage")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent HTTP requests and LLM calls")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Fake LLM seconds per call")
+    parser.add_argument("--input-rate", type=float, default=1000000, help="Fake LLM prompt tokens per second")
+    parser.add_argument("--output-rate", type=float, default=100000, help="Fake LLM response tokens per second")
+    parser.add_argument("--baseline", default="default", help="Baseline name under benchmarks/baselines/")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed relative regression")
+    parser.add_argument("--record", nargs="+", metavar="URL", help="Save live article pages as fixtures and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        record_pages(args.record)
+        return
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main_cli()
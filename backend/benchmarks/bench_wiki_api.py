@@ -0,0 +1,54 @@
+"""
+Benchmark: rendered-HTML scraping vs. MediaWiki API extracts.
+
+Fetches the same synthetic articles through both scraper backends from the
+local stand-in server and reports requests, bytes transferred and time.
+
+Usage:
+    python benchmarks/bench_wiki_api.py --articles 20 --sections 20
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import http_client
+import scraper
+from wiki_stub_server import ApiFixtureRoute, WikiStubServer, build_article_html
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=20)
+    parser.add_argument("--sections", type=int, default=20)
+    parser.add_argument("--paragraphs", type=int, default=6)
+    args = parser.parse_args()
+
+    size = {"sections": args.sections, "paragraphs": args.paragraphs}
+    urls = [f"https://en.wikipedia.org/wiki/Article_{i}" for i in range(args.articles)]
+
+    with WikiStubServer(page_builder=lambda title: build_article_html(title, **size)) as stub:
+        stub.routes["/w/api.php"] = ApiFixtureRoute(**size)
+        stub.install(http_client.get_session())
+
+        for backend, batched in (("html", False), ("api", False), ("api", True)):
+            scraper.SCRAPER_BACKEND = backend
+            http_client.article_validators = scraper.article_validators = http_client.ValidatorCache()
+            stub.requests = stub.bytes_sent = 0
+            started = time.perf_counter()
+            if batched:
+                results = list(scraper.scrape_wikipedia_batch(urls).values())
+            else:
+                results = [scraper.scrape_wikipedia(url) for url in urls]
+            elapsed = time.perf_counter() - started
+            assert all(results), "scrape failed"
+            label = f"{backend}{' (batch)' if batched else ''}"
+            print(f"{label:<12} {elapsed:6.2f}s  {stub.requests:4d} requests  "
+                  f"{stub.bytes_sent / 1024:9.1f} KB  "
+                  f"{sum(len(r['content']) for r in results) / len(results):8.0f} content chars/article")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,146 @@
+"""
+Deterministic stand-in for the Gemini chat model used by the offline
+benchmarks.
+
+Answers every quiz prompt (full article, chunk, changed sections or top-up)
+with the requested number of questions, spread over the sections of the
+prompt and each quoting a fact of its section (a year, or the last word of a
+paragraph), so answers can be traced back to the article; a top-up prompt
+gets questions on facts its listed questions do not cover. Prompts that ask
+for them also get a summary, key entities and related topics of a typical
+size, drawn from the prompt's words. The delay is a fixed latency plus time
+proportional to the prompt and response tokens. The first responses can be
+made defective (truncated, or with trailing commas) to exercise the repair
+of malformed JSON.
+"""
+import json
+import re
+import threading
+import time
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from llm_limiter import estimate_tokens
+
+DIFFICULTIES = ["easy", "medium", "easy", "medium", "hard"]
+QUESTION_COUNT = re.compile(r"Generate exactly (\d+)")
+SECTION_LABEL = re.compile(r"^== (.+) ==$")
+YEAR = re.compile(r"\b(1[89]\d\d|20\d\d)\b")
+WORD = re.compile(r"[A-Za-z0-9]+")
+# Questions a top-up prompt lists as already in the quiz
+EXISTING_QUESTION = re.compile(r"^- .*\?$", re.MULTILINE)
+NAME = re.compile(r"\b[A-Z][a-z]+(?: [A-Z][a-z]+)*")
+# Entries per key entity list and related topics, as Gemini typically returns
+ENTITY_COUNT = 6
+# Share of a truncated response that is kept
+TRUNCATED_SHARE = 0.6
+
+_counter_lock = threading.Lock()
+
+
+def prompt_facts(prompt: str):
+    """
+    {section: [(opening words, answer), ...]} for the paragraphs of a prompt
+    """
+    facts = {}
+    section = "the introduction"
+    for line in prompt.splitlines():
+        label = SECTION_LABEL.match(line)
+        if label:
+            section = label.group(1)
+            continue
+        words = WORD.findall(line)
+        if len(words) < 8 or EXISTING_QUESTION.match(line):
+            continue
+        year = YEAR.search(line)
+        facts.setdefault(section, []).append((" ".join(words[:6]), year.group(1) if year else words[-1]))
+    return facts or {"the introduction": [("The article", "Benchmark")]}
+
+
+def article_fields(prompt: str, facts) -> str:
+    """
+    JSON members for the summary, key entities and related topics the
+    prompt asks for
+    """
+    content = prompt.split("Article Content", 1)[-1]
+    names = list(dict.fromkeys(NAME.findall(content))) or ["Benchmark"]
+
+    def pick(offset):
+        return [names[(offset + index * 3) % len(names)] for index in range(ENTITY_COUNT)]
+
+    members = []
+    if '"summary"' in prompt:
+        openings = [opening for section_facts in facts.values() for opening, _ in section_facts]
+        members.append('"summary": ' + json.dumps(". ".join(openings[:6]) + "."))
+    if '"key_entities"' in prompt:
+        members.append('"key_entities": ' + json.dumps({
+            "people": pick(0), "organizations": pick(1), "locations": pick(2)
+        }))
+    if '"related_topics"' in prompt:
+        members.append('"related_topics": ' + json.dumps([f"{name} (topic)" for name in pick(0)]))
+    return "".join(member + ", " for member in members)
+
+
+class FakeQuizLLM(BaseChatModel):
+    """
+    Chat model answering quiz prompts after a simulated delay
+
+    Attributes:
+        latency: Fixed seconds per call (network and queueing)
+        input_rate: Prompt tokens processed per second
+        output_rate: Response tokens produced per second
+        fenced: Wrap the JSON in a ```json block, as Gemini often does
+        defect: "truncated" (cut off at TRUNCATED_SHARE of its length) or
+            "trailing_commas" (after the last item of every array), applied
+            to the first defective_calls responses
+    """
+
+    latency: float = 0.0
+    input_rate: float = 20000
+    output_rate: float = 800
+    fenced: bool = False
+    defect: str = ""
+    defective_calls: int = 1
+    calls: int = 0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-quiz"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        prompt = messages[-1].content
+        count = QUESTION_COUNT.search(prompt)
+        count = int(count.group(1)) if count else 10
+        facts = prompt_facts(prompt)
+        # Facts not asked about by the existing questions
+        offset = len(EXISTING_QUESTION.findall(prompt))
+        questions = []
+        for index in range(offset, offset + count):
+            section = list(facts)[index % len(facts)]
+            opening, answer = facts[section][index // len(facts) % len(facts[section])]
+            questions.append(
+                f'{{"question": "In {section}, what completes: {opening}?", '
+                f'"options": ["{answer}", "Option B", "Option C", "Option D"], "answer": "{answer}", '
+                f'"difficulty": "{DIFFICULTIES[index % len(DIFFICULTIES)]}", '
+                f'"explanation": "{opening} ... {answer}."}}'
+            )
+        response = '{' + article_fields(prompt, facts) + '"quiz": [' + ', '.join(questions) + ']}'
+        if self.fenced:
+            response = f"```json\n{response}\n```"
+        with _counter_lock:
+            if self.defect and self.calls < self.defective_calls:
+                if self.defect == "truncated":
+                    response = response[:int(len(response) * TRUNCATED_SHARE)]
+                else:
+                    response = response.replace('"]', '",]').replace('}]', '},]')
+            self.calls += 1
+            self.prompt_tokens += estimate_tokens(prompt)
+            self.output_tokens += estimate_tokens(response)
+        time.sleep(self.latency + estimate_tokens(prompt) / self.input_rate
+                   + estimate_tokens(response) / self.output_rate)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=response))])
@@ -0,0 +1,297 @@
+"""
+Local stand-in for en.wikipedia.org used by the offline benchmarks.
+
+Serves synthetic article pages in Wikipedia's markup over HTTP/1.1 with
+keep-alive, ETag/Last-Modified validators and 304 responses, and counts the
+TCP connections it accepts so connection reuse can be measured.
+"""
+import glob
+import hashlib
+import json
+import os
+import random
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from requests.adapters import HTTPAdapter
+
+WIKIPEDIA_ORIGIN = "https://en.wikipedia.org"
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+WORDS = (
+    "algorithm computation theory machine university war government research "
+    "mathematics logic cipher intelligence engineer science history society "
+    "museum council empire river province century treaty school language "
+    "experiment physics chemistry biology economy council parliament king"
+).split()
+
+
+def build_article_structure(title: str, sections: int = 8, paragraphs: int = 4,
+                            words: int = 80, seed: int = 0) -> List[Tuple[Optional[str], List[str]]]:
+    """
+    Deterministic article text as (section heading, paragraphs) pairs; the
+    lead section has no heading
+    """
+    rng = random.Random(f"{title}:{seed}")
+
+    def paragraph():
+        text = ' '.join(rng.choice(WORDS) for _ in range(words))
+        return f"{text.capitalize()} {title} in {1900 + rng.randint(0, 120)}. Alan Turing visited Cambridge."
+
+    structure = [(None, [paragraph() for _ in range(paragraphs)])]
+    for index in range(sections):
+        heading = f"Section {index + 1} {rng.choice(WORDS).capitalize()}"
+        structure.append((heading, [paragraph() for _ in range(paragraphs)]))
+    return structure
+
+
+def build_article_html(title: str, sections: int = 8, paragraphs: int = 4,
+                       words: int = 80, seed: int = 0) -> str:
+    """
+    Deterministic article page in the same markup Wikipedia serves
+    """
+    path_title = title.replace(' ', '_')
+    revision = 1000 + zlib.crc32(f"{title}:{seed}".encode("utf-8")) % 1000000
+
+    def paragraph_html(index, text):
+        text = text.replace("Alan Turing visited Cambridge.",
+                            "<a href=\"/wiki/Alan_Turing\">Alan Turing</a> visited "
+                            "<a href=\"/wiki/Cambridge\">Cambridge</a>.")
+        return f"<p>{text}<sup class=\"reference\"><a href=\"#cite\">[{index}]</a></sup></p>\n"
+
+    body = ["<table class=\"infobox\"><tr><td>Infobox data</td></tr></table>\n"]
+    for heading, texts in build_article_structure(title, sections, paragraphs, words, seed):
+        if heading:
+            anchor = heading.replace(' ', '_')
+            body.append(f"<div class=\"mw-heading mw-heading2\"><h2><span class=\"mw-headline\" "
+                        f"id=\"{anchor}\">{heading}</span></h2></div>\n")
+        body.extend(paragraph_html(index, text) for index, text in enumerate(texts, 1))
+    for heading in ("See also", "References"):
+        body.append(f"<h2><span class=\"mw-headline\">{heading}</span></h2>\n")
+    body.append("<div class=\"reflist\"><ol><li>Reference text</li></ol></div>\n")
+    body.append("<div class=\"navbox\"><a href=\"/wiki/Other\">Navbox link</a></div>\n")
+
+    return (
+        "<!DOCTYPE html><html><head>"
+        f"<title>{title} - Wikipedia</title>"
+        f"<script>RLCONF={{\"wgPageName\":\"{path_title}\",\"wgRevisionId\":{revision}}};</script>"
+        f"<link rel=\"canonical\" href=\"{WIKIPEDIA_ORIGIN}/wiki/{path_title}\">"
+        "</head><body><div id=\"content\">"
+        f"<h1 id=\"firstHeading\" class=\"firstHeading\"><span>{title}</span></h1>"
+        "<div id=\"bodyContent\"><div id=\"mw-content-text\"><div class=\"mw-parser-output\">\n"
+        + ''.join(body) +
+        "</div></div></div></div>"
+        "<div id=\"footer\"><ul><li>Footer</li></ul></div>"
+        "</body></html>"
+    )
+
+
+def build_article_extract(title: str, sections: int = 8, paragraphs: int = 4,
+                          words: int = 80, seed: int = 0) -> str:
+    """
+    The same article as build_article_html, as a TextExtracts plain-text extract
+    """
+    lines = []
+    for heading, texts in build_article_structure(title, sections, paragraphs, words, seed):
+        if heading:
+            lines.append(f"\n== {heading} ==")
+        lines.extend(texts)
+    lines.append("\n== See also ==\nOther")
+    return '\n'.join(lines)
+
+
+class ApiFixtureRoute:
+    """
+    /w/api.php stand-in for action=query&prop=extracts.
+
+    Pages come from recorded responses in fixtures/api/*.json; other titles
+    get a synthetic extract. Like TextExtracts, only one full extract is
+    returned per response and the rest follow through excontinue.
+    """
+
+    def __init__(self, fixtures_dir: str = FIXTURES_DIR, **article_size):
+        self.article_size = article_size
+        self.pages: Dict[str, Dict] = {}
+        self.redirects: Dict[str, str] = {}
+        self.generated: Dict[str, Dict] = {}
+        for path in sorted(glob.glob(os.path.join(fixtures_dir, 'api', '*.json'))):
+            with open(path, encoding='utf-8') as f:
+                query = json.load(f)["query"]
+            for page in query["pages"]:
+                self.pages[page["title"]] = page
+            for redirect in query.get("redirects", []):
+                self.redirects[redirect["from"]] = redirect["to"]
+
+    def _page(self, title: str) -> Dict:
+        if title in self.pages:
+            return dict(self.pages[title])
+        if title not in self.generated:
+            self.generated[title] = self._synthetic_page(title)
+        return dict(self.generated[title])
+
+    def _synthetic_page(self, title: str) -> Dict:
+        seed = self.article_size.get("seed", 0)
+        revision = 1000 + zlib.crc32(f"{title}:{seed}".encode("utf-8")) % 1000000
+        return {
+            "pageid": revision, "ns": 0, "title": title,
+            "extract": build_article_extract(title, **self.article_size),
+            "revisions": [{"revid": revision}], "lastrevid": revision,
+            "canonicalurl": f"{WIKIPEDIA_ORIGIN}/wiki/{title.replace(' ', '_')}"
+        }
+
+    def __call__(self, query_string: str) -> Tuple[int, str, bytes]:
+        params = parse_qs(query_string)
+        requested = params.get("titles", [""])[0].split("|")
+        offset = int(params.get("excontinue", ["0"])[0])
+
+        normalized, redirects, titles = [], [], []
+        for title in requested:
+            resolved = title.replace('_', ' ')
+            resolved = resolved[:1].upper() + resolved[1:]
+            if resolved != title:
+                normalized.append({"fromencoded": False, "from": title, "to": resolved})
+            if resolved in self.redirects:
+                redirects.append({"from": resolved, "to": self.redirects[resolved]})
+                resolved = self.redirects[resolved]
+            if resolved not in titles:
+                titles.append(resolved)
+
+        pages = []
+        for index, title in enumerate(titles):
+            page = self._page(title)
+            if index != offset:
+                page.pop("extract")
+            pages.append(page)
+
+        data = {"query": {"normalized": normalized, "redirects": redirects, "pages": pages}}
+        if offset + 1 < len(titles):
+            data["continue"] = {"excontinue": offset + 1, "continue": "||revisions|info"}
+        else:
+            data["batchcomplete"] = True
+        return 200, "application/json; charset=utf-8", json.dumps(data).encode("utf-8")
+
+
+class WikiStubServer:
+    """
+    Threaded HTTP/1.1 server answering /wiki/<Title> with generated pages.
+
+    Extra routes can be registered as path -> handler(query) returning
+    (status, content_type, body bytes); /w/api.php is served by
+    ApiFixtureRoute.
+    """
+
+    LAST_MODIFIED = "Mon, 01 Jan 2024 00:00:00 GMT"
+
+    def __init__(self, page_builder: Callable[[str], str] = build_article_html):
+        self.page_builder = page_builder
+        self.routes: Dict[str, Callable[[str], Tuple[int, str, bytes]]] = {
+            "/w/api.php": ApiFixtureRoute()
+        }
+        self.connections = 0
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _count(self, field: str, amount: int = 1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                stub._count("connections")
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, content_type: str, body: bytes, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                stub._count("bytes_sent", len(body))
+
+            def do_GET(self):
+                stub._count("requests")
+                parts = urlsplit(self.path)
+                if parts.path in stub.routes:
+                    status, content_type, body = stub.routes[parts.path](parts.query)
+                    self._send(status, content_type, body)
+                    return
+                if not parts.path.startswith("/wiki/"):
+                    self._send(404, "text/plain", b"not found")
+                    return
+
+                title = unquote(parts.path[len("/wiki/"):]).replace('_', ' ')
+                body = stub.page_builder(title).encode("utf-8")
+                etag = '"%s"' % hashlib.sha1(body).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    stub._count("not_modified")
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self._send(200, "text/html; charset=UTF-8", body, {
+                    "ETag": etag,
+                    "Last-Modified": stub.LAST_MODIFIED
+                })
+
+        return Handler
+
+    def start(self) -> "WikiStubServer":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def install(self, session, pool_maxsize: int = 10):
+        """
+        Route a requests session's en.wikipedia.org traffic to this server
+        """
+        session.mount(WIKIPEDIA_ORIGIN + "/", StubAdapter(self.base_url, pool_maxsize=pool_maxsize))
+
+
+class StubAdapter(HTTPAdapter):
+    """
+    Transport adapter that rewrites Wikipedia URLs to the local stub
+    """
+
+    def __init__(self, stub_base_url: str, **kwargs):
+        self.stub_base_url = stub_base_url
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        request.url = request.url.replace(WIKIPEDIA_ORIGIN, self.stub_base_url, 1)
+        return super().send(request, **kwargs)
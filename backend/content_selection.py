@@ -0,0 +1,290 @@
+"""
+Choose which parts of an article go into the quiz prompt.
+
+Instead of the first N characters (which, for long articles, is the lead and
+the first section or two), paragraphs are scored per section with TF-IDF and
+packed into a token budget round-robin across sections, so every section is
+represented by its most informative paragraphs before any section gets a
+second one. The prompt size is bounded by the budget whatever the article
+length. Very long articles can instead be split by section into chunks that
+are each selected within the budget and generated from separately.
+"""
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+from llm_limiter import estimate_tokens
+
+# Token budget for the article text in the quiz prompt (about 10,000
+# characters of English, the previous hard cut)
+LLM_CONTENT_TOKEN_BUDGET = int(os.getenv("LLM_CONTENT_TOKEN_BUDGET", "2500"))
+
+# Articles whose passages add up to more than LLM_CHUNKED_MIN_TOKENS are
+# split by section into up to LLM_MAX_CHUNKS parts, each generated from in a
+# separate, parallel LLM call (1 disables chunked generation)
+LLM_CHUNKED_MIN_TOKENS = int(os.getenv("LLM_CHUNKED_MIN_TOKENS", "7500"))
+LLM_MAX_CHUNKS = int(os.getenv("LLM_MAX_CHUNKS", "4"))
+
+# Passages shorter than this carry no facts worth a question (captions, stubs)
+MIN_PASSAGE_CHARS = 40
+
+# Smallest slice of the budget a section's first passage is cut down to when
+# there are more sections than budget
+MIN_SECTION_TOKENS = 60
+
+# Content without passages (older cached scrapes) is cut into chunks of
+# about this many characters at sentence boundaries
+FALLBACK_PASSAGE_CHARS = 600
+
+STOPWORDS = frozenset("""
+a about after all also an and any are as at be been before being between both
+but by can could did do does during each for from had has have he her his how
+however i if in into is it its may more most much must no not of on one only
+or other our out over she should since so some such than that the their them
+then there these they this those through to under until up upon was we were
+what when where which while who whom why will with would you your
+""".split())
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-case content words of a text (stopwords and single letters dropped)
+    """
+    return [
+        word for word in WORD_PATTERN.findall(text.lower())
+        if len(word) > 1 and word not in STOPWORDS
+    ]
+
+
+def split_into_passages(content: str, size: int = FALLBACK_PASSAGE_CHARS) -> List[Dict]:
+    """
+    Cut flat article text into sentence-aligned passages without sections
+    """
+    passages = []
+    current = ""
+    for sentence in SENTENCE_END.split(content.strip()):
+        if current and len(current) + len(sentence) > size:
+            passages.append({"section": None, "text": current})
+            current = ""
+        current = f"{current} {sentence}" if current else sentence
+    if current:
+        passages.append({"section": None, "text": current})
+    return passages
+
+
+def score_passages(title: str, passages: List[Dict]) -> List[float]:
+    """
+    TF-IDF salience of each passage.
+
+    Each passage is a document. A passage scores the sum of its terms'
+    length-normalised TF-IDF weights, with terms from the article title and
+    from its own section heading counted double, so paragraphs that are about
+    the topic of their section beat asides.
+
+    Args:
+        title: Article title
+        passages: Dictionaries with section (heading or None) and text
+
+    Returns:
+        One score per passage
+    """
+    documents = [Counter(tokenize(passage["text"])) for passage in passages]
+    document_frequency = Counter()
+    for terms in documents:
+        document_frequency.update(terms.keys())
+
+    count = len(documents)
+    title_terms = set(tokenize(title))
+    scores = []
+    for passage, terms in zip(passages, documents):
+        length = sum(terms.values())
+        if not length:
+            scores.append(0.0)
+            continue
+        boosted = title_terms | set(tokenize(passage["section"] or ""))
+        score = 0.0
+        for term, frequency in terms.items():
+            idf = math.log((count + 1) / (document_frequency[term] + 1)) + 1
+            weight = (1 + math.log(frequency)) * idf
+            score += weight * 2 if term in boosted else weight
+        # sqrt keeps long paragraphs ahead of short ones without letting them
+        # win on length alone
+        scores.append(score / math.sqrt(length))
+    return scores
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """
+    Longest prefix of whole sentences (whole words at worst) within budget
+    """
+    kept = ""
+    for sentence in SENTENCE_END.split(text):
+        candidate = f"{kept} {sentence}" if kept else sentence
+        if estimate_tokens(candidate) > budget:
+            break
+        kept = candidate
+    if kept:
+        return kept
+    words = []
+    for word in text.split():
+        if estimate_tokens(' '.join(words + [word])) > budget:
+            break
+        words.append(word)
+    return ' '.join(words)
+
+
+def section_label(section: Optional[str]) -> str:
+    return f"== {section} ==" if section else ""
+
+
+def select_passages(title: str, passages: List[Dict],
+                    token_budget: int = LLM_CONTENT_TOKEN_BUDGET) -> List[Dict]:
+    """
+    Pick the passages for the prompt within a token budget.
+
+    Sections take turns in document order; each turn adds the section's best
+    remaining passage if it fits. A section's first passage is shortened to
+    an even share of the budget left (MIN_SECTION_TOKENS at least) rather
+    than skipped, so long paragraphs early in the article do not shut later
+    sections out.
+
+    Args:
+        title: Article title
+        passages: Dictionaries with section and text, in document order
+        token_budget: Estimated tokens available for the rendered passages
+
+    Returns:
+        The selected passages, in document order
+    """
+    candidates = [
+        (index, passage) for index, passage in enumerate(passages)
+        if len(passage["text"]) >= MIN_PASSAGE_CHARS
+    ]
+    scores = score_passages(title, [passage for _, passage in candidates])
+
+    by_section: Dict[Optional[str], List] = {}
+    for (index, passage), score in zip(candidates, scores):
+        by_section.setdefault(passage["section"], []).append((score, index, passage))
+    queues = [sorted(ranked, key=lambda item: (-item[0], item[1])) for ranked in by_section.values()]
+
+    remaining = token_budget
+    selected = {}
+    represented = set()
+    while remaining > 0 and any(queues):
+        progressed = False
+        for queue in queues:
+            while queue:
+                _, index, passage = queue.pop(0)
+                section = passage["section"]
+                # Labels cost tokens once per section
+                label_cost = 0
+                if section and section not in represented:
+                    label_cost = estimate_tokens(section_label(section))
+                cost = estimate_tokens(passage["text"]) + label_cost
+                share = remaining
+                if section not in represented:
+                    # A first passage gets at most an even share of what is
+                    # left among the sections still waiting for theirs
+                    waiting = sum(1 for name in by_section if name not in represented)
+                    share = min(remaining, max(remaining // waiting, MIN_SECTION_TOKENS))
+                if cost <= share:
+                    selected[index] = passage
+                elif section not in represented:
+                    text = truncate_to_tokens(passage["text"], share - label_cost)
+                    if len(text) < MIN_PASSAGE_CHARS:
+                        continue
+                    passage = {"section": section, "text": text}
+                    cost = estimate_tokens(text) + label_cost
+                    selected[index] = passage
+                else:
+                    # Too big for what is left; a shorter one from this section may fit
+                    continue
+                represented.add(section)
+                remaining -= cost
+                progressed = True
+                break
+        if not progressed:
+            break
+
+    return [selected[index] for index in sorted(selected)]
+
+
+def render_passages(passages: List[Dict]) -> str:
+    """
+    Prompt text for selected passages, with a heading line per section
+    """
+    lines = []
+    current = object()
+    for passage in passages:
+        if passage["section"] != current:
+            current = passage["section"]
+            if current:
+                lines.append(section_label(current))
+        lines.append(passage["text"])
+    return '\n\n'.join(lines)
+
+
+def chunk_passages(passages: List[Dict], token_budget: int = LLM_CONTENT_TOKEN_BUDGET,
+                   max_chunks: int = LLM_MAX_CHUNKS,
+                   min_tokens: int = LLM_CHUNKED_MIN_TOKENS) -> List[List[Dict]]:
+    """
+    Split an article into consecutive runs of whole sections of similar size.
+
+    Short articles (min_tokens or less) stay in one chunk. Otherwise the
+    article gets one chunk per token_budget, up to max_chunks; a section is
+    never split, so a chunk may exceed the budget and is trimmed later by
+    select_passages.
+
+    Args:
+        passages: Dictionaries with section and text, in document order
+        token_budget: Prompt budget of one chunk
+        max_chunks: Upper bound on the number of chunks
+        min_tokens: Articles up to this size are not chunked
+
+    Returns:
+        Lists of passages, in document order
+    """
+    sizes = [estimate_tokens(passage["text"]) for passage in passages]
+    total = sum(sizes)
+    count = min(max_chunks, math.ceil(total / max(token_budget, 1)))
+    if total <= min_tokens or count <= 1:
+        return [passages]
+
+    # Cut before a section once the chunk so far has reached its share
+    target = total / count
+    chunks = [[]]
+    done = 0
+    previous = object()
+    for passage, size in zip(passages, sizes):
+        section = passage["section"]
+        if (section != previous and chunks[-1] and len(chunks) < count
+                and done >= target * len(chunks)):
+            chunks.append([])
+        previous = section
+        chunks[-1].append(passage)
+        done += size
+    return chunks
+
+
+def select_content(title: str, content: str, passages: Optional[List[Dict]] = None,
+                   token_budget: int = LLM_CONTENT_TOKEN_BUDGET) -> str:
+    """
+    Article text for the quiz prompt, within token_budget
+
+    Args:
+        title: Article title
+        content: Flat article text, used when passages are not available
+        passages: Section-tagged paragraphs from the scraper
+        token_budget: Estimated tokens available for the article text
+
+    Returns:
+        Selected passages rendered with section headings
+    """
+    if not passages:
+        passages = split_into_passages(content)
+    return render_passages(select_passages(title, passages, token_budget))
@@ -0,0 +1,310 @@
+"""
+Local extraction of an article's key entities, summary and related topics.
+
+Replaces the parts of the quiz response the LLM used to write besides the
+questions, so the prompt asks for questions only (output tokens are the slow
+part of a generation). Runs next to the LLM call, on CPU, in milliseconds.
+
+Candidates are the named spans of the text (runs of capitalised words) and
+the anchors of the article's links to other articles, which name the people,
+places and organisations Wikipedia editors thought worth linking. Each
+candidate is classified from:
+
+- small gazetteers: countries, continents and large cities, common given
+  names, honorifics
+- patterns: organisation words ("University", "Laboratory", acronyms),
+  place words ("River", "County"), "<place>, <known place>", people's
+  surnames used on their own later in the article
+
+Candidates without evidence are left out, and the most mentioned entities of
+each kind are kept.
+"""
+import re
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from content_selection import SENTENCE_END, STOPWORDS
+
+# Entities kept per kind, most mentioned first
+MAX_ENTITIES = 8
+MAX_RELATED_TOPICS = 7
+
+# Capitalised words, possibly joined by lower-case particles ("Duke of York")
+NAMED_SPAN_PATTERN = re.compile(
+    r"\b[A-Z][\w'’-]*(?:\s+(?:(?:of|the|de|du|da|von|van|der|la|le|and|for|in)\s+)*[A-Z][\w'’-]*)*"
+)
+MONTHS = frozenset(
+    "january february march april may june july august september october november december".split()
+)
+ACRONYM_PATTERN = re.compile(r"^[A-Z]{2,6}$")
+POSSESSIVE_PATTERN = re.compile(r"['’]s$")
+ROMAN_NUMERAL_PATTERN = re.compile(r"^[IVXLC]+$")
+
+# Sentences outside these bounds are captions or run-ons
+MIN_SENTENCE_CHARS = 40
+MAX_SENTENCE_CHARS = 300
+
+ORGANIZATION_WORDS = frozenset("""
+university college school academy institute institution laboratory laboratories labs society
+company corporation inc ltd plc group agency council committee commission party army navy
+force forces association foundation museum library bank church ministry department office
+parliament congress senate government court union league club press times post journal
+records studios service services board authority trust federation organization organisation
+""".split())
+LOCATION_WORDS = frozenset("""
+river mountain mountains lake island islands county province state city town village street
+road park bay sea ocean valley kingdom republic empire district region peninsula desert coast
+gulf strait canal square hill hills forest
+""".split())
+PERSON_TITLES = frozenset("""
+sir dame dr lord lady king queen prince princess president professor pope saint st general
+captain emperor empress duke duchess earl baron count countess admiral colonel senator
+""".split())
+PLACES = frozenset(name.lower() for name in """
+Africa|Antarctica|Asia|Europe|North America|South America|Oceania|Australia|Middle East|
+United Kingdom|UK|England|Scotland|Wales|Ireland|Northern Ireland|Britain|Great Britain|
+United States|USA|US|America|Canada|Mexico|Brazil|Argentina|Chile|Peru|Colombia|Cuba|
+France|Germany|Italy|Spain|Portugal|Netherlands|Belgium|Switzerland|Austria|Poland|Sweden|
+Norway|Denmark|Finland|Iceland|Greece|Turkey|Russia|Soviet Union|USSR|Ukraine|Hungary|
+Czech Republic|Czechoslovakia|Romania|Bulgaria|Serbia|Yugoslavia|Prussia|
+China|Japan|Korea|South Korea|North Korea|India|Pakistan|Bangladesh|Indonesia|Vietnam|
+Thailand|Philippines|Malaysia|Singapore|Iran|Iraq|Israel|Egypt|Saudi Arabia|Syria|
+Nigeria|Kenya|Ethiopia|South Africa|Morocco|Algeria|New Zealand|
+London|Paris|Berlin|Rome|Madrid|Vienna|Moscow|Amsterdam|Brussels|Prague|Warsaw|Athens|
+Dublin|Edinburgh|Manchester|Cambridge|Oxford|Birmingham|Liverpool|Glasgow|
+New York|New York City|Washington|Boston|Chicago|Los Angeles|San Francisco|Philadelphia|
+Princeton|Toronto|Sydney|Melbourne|Tokyo|Beijing|Shanghai|Hong Kong|Delhi|Mumbai|Cairo|
+California|Texas|Florida|Massachusetts|New Jersey|Virginia|Bavaria
+""".replace("\n", "").split("|"))
+GIVEN_NAMES = frozenset("""
+adam adrian alan albert alexander alfred alice alonzo andrew ann anna anne anthony arthur barbara
+benjamin bernard bill carl carlos catherine charles charlotte christopher claude daniel david
+donald dorothy edward elizabeth emily emma eric ernest frank frederick geoffrey george grace
+hannah harold harry helen henry herbert howard hugh isaac jack jacob james jane jean joan
+johann john jonathan joseph julia karl katherine kurt lawrence leonard lewis louis margaret
+maria marie mark martin mary matthew max michael nicholas niels otto patrick paul peter
+philip ralph richard robert roger rosalind ruth samuel sarah stephen susan thomas victor
+walter william wolfgang yann marvin ada blaise gottfried werner enrico erwin gordon ian
+""".split())
+
+KINDS = ("people", "organizations", "locations")
+
+
+def sentences(passages: List[Dict]) -> Iterator[Tuple[Optional[str], str]]:
+    """
+    (section, sentence) pairs of the article in reading order
+    """
+    for passage in passages:
+        for sentence in SENTENCE_END.split(passage["text"].strip()):
+            sentence = " ".join(sentence.split())
+            if MIN_SENTENCE_CHARS <= len(sentence) <= MAX_SENTENCE_CHARS:
+                yield passage["section"], sentence
+
+
+def named_spans(sentence: str) -> List[str]:
+    """
+    Named spans of a sentence. Function words are trimmed from the ends, and
+    a single word opening the sentence is skipped (it is capitalised anyway).
+    """
+    return [span for span, start in named_span_positions(sentence) if start > 0 or " " in span]
+
+
+def named_span_positions(sentence: str) -> List[Tuple[str, int]]:
+    """
+    (span, offset) of each named span of a sentence, sentence openers included
+    """
+    spans = []
+    for match in NAMED_SPAN_PATTERN.finditer(sentence):
+        text = match.group(0)
+        if " " not in text and "'" not in text and "’" not in text:
+            # Single word, the common case
+            if text.lower() not in STOPWORDS and text.lower() not in MONTHS and not text.isdigit():
+                spans.append((text, match.start()))
+            continue
+        words = text.split()
+        start = match.start()
+        # "Max Newman's Computing Machine Laboratory": a name and what it owns
+        for index in range(1, len(words) - 1):
+            if POSSESSIVE_PATTERN.search(words[index]):
+                spans.extend(trimmed_span(words[:index + 1], start, sentence))
+                start += len(" ".join(words[:index + 1])) + 1
+                words = words[index + 1:]
+                break
+        spans.extend(trimmed_span(words, start, sentence))
+    return spans
+
+
+def trimmed_span(words: List[str], start: int, sentence: str) -> List[Tuple[str, int]]:
+    """
+    A run of capitalised words without function words and months at its ends
+    (and without the capitalised opener of a sentence), as [(span, offset)]
+    """
+    while words and (words[0].lower() in STOPWORDS or words[0].lower() in MONTHS):
+        start += len(words[0]) + 1
+        words = words[1:]
+    while words and (words[-1].lower() in STOPWORDS or words[-1].lower() in MONTHS):
+        words = words[:-1]
+    # "Born in Maida Vale": the capitalised sentence opener is no name
+    if start == 0 and len(words) > 2 and words[1].islower():
+        start += len(words[0]) + 1
+        words = words[1:]
+        while words and words[0].islower():
+            start += len(words[0]) + 1
+            words = words[1:]
+    if words:
+        words = words[:-1] + [POSSESSIVE_PATTERN.sub("", words[-1]).rstrip("'’-")]
+    if not words or not words[-1] or words[0].isdigit():
+        return []
+    return [(" ".join(words), start)]
+
+
+def link_name(link: Dict[str, str]) -> str:
+    """
+    Name of a linked entity: the target title if it spells the anchor out
+    ("Cambridge" -> "University of Cambridge"), else the anchor
+    """
+    text, target = link["text"].strip(), link["target"].strip()
+    if "(" not in target and set(text.lower().split()) <= set(target.lower().split()):
+        return target
+    return text
+
+
+def name_words(name: str) -> Set[str]:
+    """
+    Lower-case words of a name without punctuation or possessives
+    """
+    return {POSSESSIVE_PATTERN.sub("", word.lower().strip(".,;:")) for word in name.split()}
+
+
+def classify(name: str, surnames: Counter, followers: Dict[str, Counter]) -> Optional[str]:
+    """
+    Kind of a candidate entity, or None without evidence
+    """
+    words = name.split()
+    lowered = [POSSESSIVE_PATTERN.sub("", word.lower().strip(".,;:")) for word in words]
+    if len(words) == 1 and ACRONYM_PATTERN.match(name) and not ROMAN_NUMERAL_PATTERN.match(name):
+        return "locations" if name.lower() in PLACES else "organizations"
+    # "Alonzo Church", "Gordon Brown": a given name and a surname
+    if len(words) == 2 and lowered[0] in GIVEN_NAMES and words[1][:1].isupper():
+        return "people"
+    if set(lowered) & ORGANIZATION_WORDS:
+        return "organizations"
+    if name.lower() in PLACES or set(lowered) & LOCATION_WORDS:
+        return "locations"
+    if lowered[0] in PERSON_TITLES and len(words) > 1:
+        return "people"
+    if 2 <= len(words) <= 4 and all(word[:1].isupper() for word in words):
+        if lowered[0] in GIVEN_NAMES or surnames[words[-1]] > 0:
+            return "people"
+    # "Maida Vale, London": followed by a known place
+    if any(place.lower() in PLACES for place in followers.get(name, ())):
+        return "locations"
+    return None
+
+
+def extract_entities(title: str, passages: List[Dict], links: Optional[List[Dict]] = None,
+                     limit: int = MAX_ENTITIES) -> Dict[str, List[str]]:
+    """
+    Key people, organizations and locations of an article
+
+    Args:
+        title: Article title
+        passages: Section-tagged paragraphs from the scraper
+        links: Article links of the text ({"text", "target"}), if known
+        limit: Entities kept per kind
+
+    Returns:
+        {"people": [...], "organizations": [...], "locations": [...]}, most
+        mentioned first
+    """
+    mentions: Counter = Counter()
+    # Words used alone that end a longer span: surnames ("Turing")
+    single_words: Counter = Counter()
+    followers: Dict[str, Counter] = {}
+    for _, sentence in sentences(passages):
+        positions = named_span_positions(sentence)
+        for index, (span, start) in enumerate(positions):
+            if " " in span:
+                mentions[span] += 1
+            elif start > 0:
+                single_words[span] += 1
+                mentions[span] += 1
+            end = start + len(span)
+            if index + 1 < len(positions) and sentence[end:positions[index + 1][1]] == ", ":
+                followers.setdefault(span, Counter())[positions[index + 1][0]] += 1
+
+    # Linked names count as mentioned even if the text spells them otherwise
+    for link in links or []:
+        if link["text"][:1].isupper():
+            mentions[link_name(link)] += 2
+
+    surnames: Counter = Counter()
+    for span in mentions:
+        words = span.split()
+        if 2 <= len(words) <= 4 and single_words[words[-1]]:
+            surnames[words[-1]] += single_words[words[-1]]
+
+    entities: Dict[str, Counter] = {kind: Counter() for kind in KINDS}
+    for name, count in mentions.items():
+        kind = classify(name, surnames, followers)
+        if kind:
+            entities[kind][name] += count
+    # The article's own subject comes first
+    title_kind = classify(title, surnames, followers)
+    if title_kind:
+        entities[title_kind][title] = max(mentions.values(), default=0) + 1
+
+    # Shorter spellings ("Turing", "Alan Turing") are mentions of the longest
+    # name containing them ("Alan Mathison Turing")
+    named = [(name, kind, name_words(name)) for kind in KINDS for name in entities[kind]]
+    counts = dict(mentions)
+    if title_kind:
+        counts[title] = entities[title_kind][title]
+    for name, count in sorted(counts.items(), key=lambda entry: len(entry[0].split())):
+        words = name_words(name)
+        longer = [(other, kind) for other, kind, other_words in named if words < other_words]
+        if not longer:
+            continue
+        other, kind = max(longer, key=lambda entry: entities[entry[1]][entry[0]])
+        entities[kind][other] += count
+        for kind in KINDS:
+            entities[kind].pop(name, None)
+
+    return {kind: [name for name, _ in entities[kind].most_common(limit)] for kind in KINDS}
+
+
+def lead_summary(title: str, passages: List[Dict], sentences_count: int = 3) -> str:
+    """
+    The first sentences of the lead, which Wikipedia writes as a summary
+    """
+    lead = [sentence for section, sentence in sentences(passages) if not section][:sentences_count]
+    if not lead:
+        lead = [sentence for _, sentence in sentences(passages)][:sentences_count]
+    return " ".join(lead) or f"An article about {title}"
+
+
+def related_topics(title: str, links: Optional[List[Dict]], sections: List[str],
+                   limit: int = MAX_RELATED_TOPICS) -> List[str]:
+    """
+    The articles linked most often from the text (section titles if the
+    scrape has no links)
+    """
+    targets = Counter(
+        link["target"] for link in links or []
+        if link["target"].lower() != title.lower() and "(" not in link["target"]
+    )
+    topics = [target for target, _ in targets.most_common(limit)]
+    return topics or sections[:5]
+
+
+def local_article_fields(title: str, passages: List[Dict], sections: List[str],
+                         links: Optional[List[Dict]] = None) -> Dict:
+    """
+    summary, key_entities and related_topics of the quiz response, computed
+    locally
+    """
+    return {
+        "summary": lead_summary(title, passages),
+        "key_entities": extract_entities(title, passages, links),
+        "related_topics": related_topics(title, links, sections)
+    }
@@ -0,0 +1,324 @@
+import os
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional
+from urllib.parse import unquote
+
+# Elements stripped from the article body before paragraphs are read
+REMOVED_TAGS = {'table', 'sup', 'span', 'div'}
+REMOVED_CLASSES = {'infobox', 'reference', 'reflist', 'navbox'}
+
+# HTML elements that never have a closing tag
+VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+    'meta', 'param', 'source', 'track', 'wbr'
+}
+
+# Extraction engine used by scrape_wikipedia: stream | lxml | bs4
+SCRAPER_ENGINE = os.getenv("SCRAPER_ENGINE", "stream")
+
+
+def article_link_target(href: Optional[str]) -> Optional[str]:
+    """
+    Title of the article a link points at, or None for links that are not
+    to an article (other namespaces, red links, external sites)
+    """
+    if not href or not href.startswith('/wiki/'):
+        return None
+    target = unquote(href[len('/wiki/'):].split('#')[0]).replace('_', ' ').strip()
+    if not target or ':' in target:
+        return None
+    return target
+
+
+def extract_with_beautifulsoup(html: str) -> Optional[Dict]:
+    """
+    Reference extractor: builds the full BeautifulSoup tree
+
+    Args:
+        html: Article page HTML
+
+    Returns:
+        Dictionary with title, canonical_href, paragraphs (stripped text of
+        every <p>, empty ones included), paragraph_sections (heading each
+        paragraph falls under, None in the lead), headings (text of each
+        h2/h3 mw-headline, in document order) and raw_html; None without a body
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+
+    title_element = soup.find('h1', {'id': 'firstHeading'})
+    canonical_element = soup.find('link', {'rel': 'canonical'})
+
+    content_div = soup.find('div', {'id': 'mw-content-text'})
+    if not content_div:
+        return None
+
+    for element in content_div.find_all(list(REMOVED_TAGS), class_=list(REMOVED_CLASSES)):
+        element.decompose()
+
+    headings = []
+    for heading in soup.find_all(['h2', 'h3']):
+        headline = heading.find('span', {'class': 'mw-headline'})
+        if headline:
+            headings.append(headline.get_text().strip())
+
+    paragraphs = []
+    paragraph_sections = []
+    links = []
+    section = None
+    for element in content_div.find_all(['p', 'h2', 'h3']):
+        if element.name == 'p':
+            paragraphs.append(element.get_text().strip())
+            paragraph_sections.append(section)
+            for anchor in element.find_all('a'):
+                target = article_link_target(anchor.get('href'))
+                if target and anchor.get_text().strip():
+                    links.append({"text": anchor.get_text().strip(), "target": target})
+        else:
+            headline = element.find('span', {'class': 'mw-headline'})
+            if headline:
+                section = headline.get_text().strip()
+
+    return {
+        "title": title_element.text.strip() if title_element else None,
+        "canonical_href": canonical_element.get('href') if canonical_element else None,
+        "paragraphs": paragraphs,
+        "paragraph_sections": paragraph_sections,
+        "headings": headings,
+        "links": links,
+        "raw_html": str(soup)[:50000]
+    }
+
+
+class ArticleEventHandler:
+    """
+    Single-pass article extraction from start/end/data events.
+
+    Collects the same fields as extract_with_beautifulsoup without building
+    a tree: every element is pushed on a stack with the role it plays (title,
+    content body, removed block, paragraph, heading, headline) and text is
+    routed to whichever collectors are open.
+    """
+
+    def __init__(self):
+        self.stack: List[tuple] = []
+        self.title_parts: Optional[List[str]] = None
+        self.title: Optional[str] = None
+        self.canonical_href: Optional[str] = None
+        self.found_content = False
+        self.content_open = False
+        self.skip_depth = 0
+        self.script_depth = 0
+        self.paragraph_parts: Optional[List[str]] = None
+        self.paragraphs: List[str] = []
+        self.paragraph_sections: List[Optional[str]] = []
+        self.heading_open = False
+        self.heading_has_headline = False
+        self.headline_parts: Optional[List[str]] = None
+        self.headings: List[str] = []
+        self.link_target: Optional[str] = None
+        self.link_parts: Optional[List[str]] = None
+        self.links: List[Dict[str, str]] = []
+
+    def start(self, tag: str, attrs: Dict[str, Optional[str]]):
+        role = None
+        classes = set((attrs.get('class') or '').split())
+
+        if tag == 'link' and self.canonical_href is None:
+            if 'canonical' in (attrs.get('rel') or '').split():
+                self.canonical_href = attrs.get('href')
+        elif tag == 'h1' and self.title is None and self.title_parts is None \
+                and attrs.get('id') == 'firstHeading':
+            self.title_parts = []
+            role = 'title'
+        elif tag == 'div' and not self.found_content and attrs.get('id') == 'mw-content-text':
+            self.found_content = True
+            self.content_open = True
+            role = 'content'
+        elif self.content_open and tag in REMOVED_TAGS and classes & REMOVED_CLASSES:
+            self.skip_depth += 1
+            role = 'skip'
+        elif tag in ('script', 'style'):
+            self.script_depth += 1
+            role = 'script'
+        elif tag == 'p' and self.content_open and not self.skip_depth \
+                and self.paragraph_parts is None:
+            self.paragraph_parts = []
+            role = 'p'
+        elif tag in ('h2', 'h3') and not self.skip_depth and not self.heading_open:
+            self.heading_open = True
+            self.heading_has_headline = False
+            role = 'heading'
+        elif tag == 'span' and self.heading_open and not self.heading_has_headline \
+                and 'mw-headline' in classes:
+            self.heading_has_headline = True
+            self.headline_parts = []
+            role = 'headline'
+        elif tag == 'a' and self.paragraph_parts is not None and not self.skip_depth \
+                and self.link_parts is None:
+            self.link_target = article_link_target(attrs.get('href'))
+            if self.link_target:
+                self.link_parts = []
+                role = 'link'
+
+        if tag not in VOID_TAGS:
+            self.stack.append((tag, role))
+
+    def end(self, tag: str):
+        # Pop up to the matching open element; stray end tags are ignored
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index][0] == tag:
+                break
+        else:
+            return
+        while len(self.stack) > index:
+            _, role = self.stack.pop()
+            if role:
+                self._close(role)
+
+    def _close(self, role: str):
+        if role == 'title':
+            self.title = ''.join(self.title_parts).strip()
+            self.title_parts = None
+        elif role == 'content':
+            self.content_open = False
+        elif role == 'skip':
+            self.skip_depth -= 1
+        elif role == 'script':
+            self.script_depth -= 1
+        elif role == 'p':
+            self.paragraphs.append(''.join(self.paragraph_parts).strip())
+            self.paragraph_sections.append(self.headings[-1] if self.headings else None)
+            self.paragraph_parts = None
+        elif role == 'heading':
+            self.heading_open = False
+        elif role == 'headline':
+            self.headings.append(''.join(self.headline_parts).strip())
+            self.headline_parts = None
+        elif role == 'link':
+            text = ''.join(self.link_parts).strip()
+            if text:
+                self.links.append({"text": text, "target": self.link_target})
+            self.link_parts = None
+
+    def data(self, text: str):
+        if self.script_depth:
+            return
+        if self.title_parts is not None:
+            self.title_parts.append(text)
+        if self.paragraph_parts is not None and not self.skip_depth:
+            self.paragraph_parts.append(text)
+        if self.headline_parts is not None:
+            self.headline_parts.append(text)
+        if self.link_parts is not None and not self.skip_depth:
+            self.link_parts.append(text)
+
+    def close(self):
+        # Flush elements left open by truncated markup
+        while self.stack:
+            _, role = self.stack.pop()
+            if role:
+                self._close(role)
+
+
+class _HTMLParserDriver(HTMLParser):
+    """
+    Feeds html.parser events into an ArticleEventHandler
+    """
+
+    def __init__(self, handler: ArticleEventHandler):
+        super().__init__(convert_charrefs=True)
+        self.handler = handler
+
+    def handle_starttag(self, tag, attrs):
+        self.handler.start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handler.start(tag, dict(attrs))
+        if tag not in VOID_TAGS:
+            self.handler.end(tag)
+
+    def handle_endtag(self, tag):
+        self.handler.end(tag)
+
+    def handle_data(self, data):
+        self.handler.data(data)
+
+
+def _handler_result(handler: ArticleEventHandler, html: str) -> Optional[Dict]:
+    if not handler.found_content:
+        return None
+    return {
+        "title": handler.title,
+        "canonical_href": handler.canonical_href,
+        "paragraphs": handler.paragraphs,
+        "paragraph_sections": handler.paragraph_sections,
+        "headings": handler.headings,
+        "links": handler.links,
+        "raw_html": html[:50000]
+    }
+
+
+def extract_streaming(html: str) -> Optional[Dict]:
+    """
+    Single-pass extractor on the standard library html.parser
+
+    Same output as extract_with_beautifulsoup, except raw_html is the
+    original page rather than the page with removed blocks stripped.
+    """
+    handler = ArticleEventHandler()
+    parser = _HTMLParserDriver(handler)
+    parser.feed(html)
+    parser.close()
+    handler.close()
+    return _handler_result(handler, html)
+
+
+def extract_with_lxml(html: str) -> Optional[Dict]:
+    """
+    Single-pass extractor on lxml's C parser (requires lxml)
+    """
+    from lxml import etree
+
+    class Target:
+        def __init__(self):
+            self.handler = ArticleEventHandler()
+
+        def start(self, tag, attrs):
+            self.handler.start(tag, dict(attrs))
+
+        def end(self, tag):
+            self.handler.end(tag)
+
+        def data(self, text):
+            self.handler.data(text)
+
+        def close(self):
+            self.handler.close()
+            return self.handler
+
+    parser = etree.HTMLParser(target=Target())
+    handler = etree.fromstring(html, parser)
+    return _handler_result(handler, html)
+
+
+EXTRACTORS: Dict[str, Callable[[str], Optional[Dict]]] = {
+    "stream": extract_streaming,
+    "lxml": extract_with_lxml,
+    "bs4": extract_with_beautifulsoup
+}
+
+
+def get_extractor(name: str = None) -> Callable[[str], Optional[Dict]]:
+    """
+    Look up an extraction engine by name (defaults to SCRAPER_ENGINE)
+    """
+    name = (name or SCRAPER_ENGINE).lower()
+    if name == "lxml":
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            print("lxml is not installed, using the stream extractor")
+            name = "stream"
+    return EXTRACTORS.get(name, extract_streaming)
@@ -0,0 +1,102 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Connection pool for Wikipedia fetches. One session is shared by every
+# scrape so TCP+TLS connections are kept alive and reused between articles.
+WIKI_HTTP_POOL_SIZE = int(os.getenv("WIKI_HTTP_POOL_SIZE", "10"))
+WIKI_HTTP_TIMEOUT = float(os.getenv("WIKI_HTTP_TIMEOUT", "10"))
+WIKI_VALIDATOR_CACHE_SIZE = int(os.getenv("WIKI_VALIDATOR_CACHE_SIZE", "256"))
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Shared keep-alive session for Wikipedia requests (created on first use)
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=WIKI_HTTP_POOL_SIZE
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({'User-Agent': USER_AGENT})
+                _session = session
+    return _session
+
+
+class ValidatorCache:
+    """
+    ETag / Last-Modified validators per article, with the scrape result they
+    belong to, so a 304 Not Modified can reuse the previous parse.
+
+    Bounded LRU; safe to use from the generation thread pool.
+    """
+
+    def __init__(self, max_entries: int = WIKI_VALIDATOR_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.not_modified = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def store(self, key: str, response: requests.Response, result: Dict):
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        with self._lock:
+            self._entries[key] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "result": result
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def conditional_headers(self, key: str) -> Dict[str, str]:
+        """
+        If-None-Match / If-Modified-Since headers for a known article
+        """
+        entry = self.get(key)
+        headers = {}
+        if entry:
+            if entry["etag"]:
+                headers['If-None-Match'] = entry["etag"]
+            if entry["last_modified"]:
+                headers['If-Modified-Since'] = entry["last_modified"]
+        return headers
+
+    def record_not_modified(self):
+        """
+        Count a 304 answered from a stored result (called from scraper threads)
+        """
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "not_modified": self.not_modified}
+
+
+article_validators = ValidatorCache()
@@ -0,0 +1,292 @@
+import asyncio
+import os
+import random
+import socket
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List
+
+from sqlalchemy import func, select, update
+
+# Background generation: JOB_WORKERS coroutines per process drain the
+# generation_jobs table (0 disables the workers, e.g. for API-only processes).
+# Failed jobs are retried JOB_MAX_ATTEMPTS times in total with exponential
+# backoff; running jobs whose worker died are requeued after the lease expires.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "5"))
+JOB_RETRY_BACKOFF_MAX = float(os.getenv("JOB_RETRY_BACKOFF_MAX", "300"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "600"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+
+class PermanentJobError(Exception):
+    """
+    Raised by a job handler for failures that retrying cannot fix
+    """
+
+
+def retry_delay(attempts: int, base: float = JOB_RETRY_BACKOFF,
+                cap: float = JOB_RETRY_BACKOFF_MAX) -> float:
+    """
+    Exponential backoff with jitter before the next attempt
+
+    Args:
+        attempts: Attempts made so far (1 after the first failure)
+        base: Delay after the first failure
+        cap: Upper bound on the delay
+
+    Returns:
+        Seconds to wait
+    """
+    return min(cap, base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+
+class JobQueue:
+    """
+    Persistent queue of generation jobs in the generation_jobs table.
+
+    Works without an external broker: workers claim the oldest due job with a
+    conditional UPDATE, so several processes can share one table. Changes made
+    in this process wake local waiters immediately; other processes' changes
+    are seen on the next poll.
+    """
+
+    def __init__(self, session_factory, model, max_attempts: int = JOB_MAX_ATTEMPTS,
+                 lease_seconds: int = JOB_LEASE_SECONDS):
+        self.session_factory = session_factory
+        self.model = model
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._changed = asyncio.Event()
+        self._enqueue_lock = asyncio.Lock()
+        self.enqueued = 0
+        self.coalesced = 0
+        self.retried = 0
+        self.requeued = 0
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_update(self, timeout: float):
+        """
+        Sleep until a job changes in this process, or timeout seconds pass
+        """
+        changed = self._changed
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def enqueue(self, canonical_key: str, url: str, force_regenerate: bool = False,
+                      store_raw_html: bool = False):
+        """
+        Queue a generation, or return the active job for the same article
+
+        Args:
+            canonical_key: Canonical article key
+            url: Article URL as requested
+            force_regenerate: Regenerate even if a quiz is stored
+            store_raw_html: Store the article HTML with the quiz
+
+        Returns:
+            The job row
+        """
+        # Serialises the check-then-insert within this process
+        async with self._enqueue_lock, self.session_factory() as db:
+            result = await db.execute(select(self.model).where(
+                self.model.canonical_key == canonical_key,
+                self.model.status.in_(ACTIVE_STATUSES)
+            ).order_by(self.model.id).limit(1))
+            job = result.scalars().first()
+            if job is not None:
+                self.coalesced += 1
+                return job
+
+            now = datetime.utcnow()
+            job = self.model(
+                canonical_key=canonical_key,
+                url=url,
+                force_regenerate=force_regenerate,
+                store_raw_html=store_raw_html,
+                status=QUEUED,
+                attempts=0,
+                max_attempts=self.max_attempts,
+                run_after=now,
+                created_at=now,
+                updated_at=now
+            )
+            db.add(job)
+            await db.commit()
+            await db.refresh(job)
+        self.enqueued += 1
+        self._notify()
+        return job
+
+    async def get(self, job_id: int):
+        async with self.session_factory() as db:
+            return await db.get(self.model, job_id)
+
+    async def claim(self):
+        """
+        Take the oldest due job, marking it running under this worker
+
+        Returns:
+            The claimed job, or None if nothing is due
+        """
+        async with self.session_factory() as db:
+            now = datetime.utcnow()
+            # Jobs running longer than the lease belong to a crashed worker; requeue them
+            expired = await db.execute(update(self.model).where(
+                self.model.status == RUNNING,
+                self.model.locked_at < now - timedelta(seconds=self.lease_seconds)
+            ).values(status=QUEUED, locked_by=None, updated_at=now))
+            if expired.rowcount:
+                self.requeued += expired.rowcount
+
+            result = await db.execute(select(self.model.id).where(
+                self.model.status == QUEUED,
+                self.model.run_after <= now
+            ).order_by(self.model.run_after, self.model.id).limit(1))
+            job_id = result.scalar()
+            if job_id is None:
+                await db.commit()
+                return None
+
+            # Another worker may claim the same row first; only one UPDATE matches
+            claimed = await db.execute(update(self.model).where(
+                self.model.id == job_id,
+                self.model.status == QUEUED
+            ).values(
+                status=RUNNING,
+                attempts=self.model.attempts + 1,
+                locked_by=self.owner,
+                locked_at=now,
+                updated_at=now
+            ))
+            await db.commit()
+            if claimed.rowcount != 1:
+                return None
+            job = await db.get(self.model, job_id, populate_existing=True)
+        self._notify()
+        return job
+
+    async def _finish(self, job_id: int, **values):
+        async with self.session_factory() as db:
+            await db.execute(update(self.model).where(self.model.id == job_id).values(
+                locked_by=None, updated_at=datetime.utcnow(), **values
+            ))
+            await db.commit()
+        self._notify()
+
+    async def complete(self, job, quiz_id: int):
+        await self._finish(job.id, status=SUCCEEDED, quiz_id=quiz_id, error=None,
+                           finished_at=datetime.utcnow())
+
+    async def fail(self, job, error: str, retryable: bool = True):
+        """
+        Record a failed attempt: requeue with backoff while attempts remain
+        """
+        if retryable and job.attempts < job.max_attempts:
+            self.retried += 1
+            run_after = datetime.utcnow() + timedelta(seconds=retry_delay(job.attempts))
+            await self._finish(job.id, status=QUEUED, error=error, run_after=run_after)
+        else:
+            await self._finish(job.id, status=FAILED, error=error,
+                               finished_at=datetime.utcnow())
+
+    async def stats(self) -> Dict[str, Any]:
+        """
+        Queue depth by status plus this process's counters
+        """
+        depth = {status: 0 for status in ACTIVE_STATUSES + FINISHED_STATUSES}
+        oldest_queued = None
+        try:
+            async with self.session_factory() as db:
+                rows = await db.execute(select(
+                    self.model.status, func.count()
+                ).group_by(self.model.status))
+                depth.update({status: count for status, count in rows.all()})
+                oldest_queued = (await db.execute(select(func.min(self.model.created_at)).where(
+                    self.model.status == QUEUED
+                ))).scalar()
+        except Exception as e:
+            print(f"Error reading job queue depth: {e}")
+        return {
+            "depth": depth,
+            "oldest_queued_seconds": (
+                (datetime.utcnow() - oldest_queued).total_seconds() if oldest_queued else 0
+            ),
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "retried": self.retried,
+            "requeued": self.requeued
+        }
+
+
+class JobWorkerPool:
+    """
+    Coroutines that claim jobs from a JobQueue and run them with a handler.
+
+    The handler receives the job and returns the stored quiz id; raising
+    PermanentJobError fails the job at once, any other exception is retried.
+    """
+
+    def __init__(self, queue: JobQueue, handler: Callable[[Any], Awaitable[int]],
+                 concurrency: int = JOB_WORKERS, poll_interval: float = JOB_POLL_INTERVAL):
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self.busy = 0
+
+    def start(self):
+        for index in range(self.concurrency):
+            self._tasks.append(asyncio.create_task(self._work(), name=f"quiz-job-worker-{index}"))
+
+    async def stop(self):
+        # Interrupted jobs stay running until their lease expires, then rerun
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self):
+        while True:
+            try:
+                job = await self.queue.claim()
+            except Exception as e:
+                print(f"Error claiming generation job: {e}")
+                job = None
+            if job is None:
+                await self.queue.wait_for_update(self.poll_interval)
+                continue
+
+            self.busy += 1
+            try:
+                await self._run(job)
+            finally:
+                self.busy -= 1
+
+    async def _run(self, job):
+        try:
+            quiz_id = await self.handler(job)
+        except PermanentJobError as e:
+            await self.queue.fail(job, str(e), retryable=False)
+        except Exception as e:
+            print(f"Generation job {job.id} failed (attempt {job.attempts}): {e}")
+            await self.queue.fail(job, str(e))
+        else:
+            await self.queue.complete(job, quiz_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {"workers": len(self._tasks), "busy": self.busy}
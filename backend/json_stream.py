@@ -0,0 +1,212 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Union
+
+# A string (group 1 is empty if it is cut off by the end of the text) or a
+# bracket or comma; the text between tokens is numbers, literals, colons and
+# whitespace
+JSON_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*("?)|[{}\[\],]', re.DOTALL)
+CLOSING = {'{': '}', '[': ']'}
+
+
+class JSONArrayItemStream:
+    """
+    Incremental scanner for a JSON document arriving in chunks.
+
+    Yields the objects of one array in the top-level object (e.g. "quiz"),
+    or of a top-level array, as soon as each object's closing brace arrives,
+    without waiting for the rest of the document. Text before the first
+    bracket (such as a ```json fence) is ignored; the full text is kept for
+    a final parse with json.loads.
+    """
+
+    def __init__(self, array_key: str):
+        self.array_key = array_key
+        self._chunks: List[str] = []
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._key_chars: Optional[List[str]] = None
+        self._last_key: Optional[str] = None
+        self._array_depth: Optional[int] = None
+        self._item_parts: Optional[List[str]] = None
+        self.items_seen = 0
+
+    @property
+    def text(self) -> str:
+        """
+        Everything fed so far
+        """
+        return ''.join(self._chunks)
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Consume the next chunk of the document
+
+        Args:
+            chunk: Next piece of text from the stream
+
+        Returns:
+            Array items completed by this chunk (malformed items are repaired
+            if possible, else skipped)
+        """
+        self._chunks.append(chunk)
+        completed = []
+        item_start = 0 if self._item_parts is not None else None
+        stack = self._stack
+
+        for index, char in enumerate(chunk):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._key_chars is not None:
+                        self._last_key = ''.join(self._key_chars)
+                        self._key_chars = None
+                    continue
+                if self._key_chars is not None:
+                    self._key_chars.append(char)
+                continue
+
+            if not stack and char not in '{[':
+                # Preamble or trailing text outside the document
+                continue
+
+            if char == '"':
+                self._in_string = True
+                # Only keys of the top-level object are tracked
+                self._key_chars = [] if len(stack) == 1 else None
+            elif char in '{[':
+                if (char == '{' and self._array_depth is not None
+                        and len(stack) == self._array_depth):
+                    self._item_parts = []
+                    item_start = index
+                if (char == '[' and len(stack) == 1 and self._array_depth is None
+                        and self._last_key == self.array_key):
+                    self._array_depth = 2
+                elif char == '[' and not stack:
+                    # The document is the array itself
+                    self._array_depth = 1
+                stack.append(char)
+            elif char in '}]':
+                if stack:
+                    stack.pop()
+                if self._array_depth is not None and len(stack) < self._array_depth:
+                    self._array_depth = None
+                elif (char == '}' and self._item_parts is not None
+                        and len(stack) == self._array_depth):
+                    self._item_parts.append(chunk[item_start:index + 1])
+                    item = self._parse_item(''.join(self._item_parts))
+                    if item is not None:
+                        completed.append(item)
+                    self._item_parts = None
+                    item_start = None
+
+        if self._item_parts is not None:
+            self._item_parts.append(chunk[item_start:])
+        return completed
+
+    def _parse_item(self, text: str) -> Optional[Dict[str, Any]]:
+        self.items_seen += 1
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError:
+            # E.g. a trailing comma in the item's options
+            item = repair_json(text)
+        return item if isinstance(item, dict) else None
+
+
+def repair_json(text: str) -> Union[Dict[str, Any], List[Dict[str, Any]], None]:
+    """
+    Parse the first JSON object or array of a text despite the defects of
+    LLM output: text around it, trailing commas, missing commas between
+    array items or object members and a truncated end. A truncated document
+    is cut after its last complete value and its open arrays and objects are
+    closed, so every complete item of an array is kept.
+
+    Args:
+        text: Response text holding a JSON object or array
+
+    Returns:
+        The parsed object, or array of objects, or None if nothing could be
+        recovered
+    """
+    starts = sorted(start for start in (text.find('{'), text.find('[')) if start >= 0)
+    for start in starts:
+        document = _repair_from(text, start)
+        # A bracket in the prose before an object (e.g. "[1]") is not the document
+        if isinstance(document, dict) or (
+                document and all(isinstance(item, dict) for item in document)):
+            return document
+    return None
+
+
+def _repair_from(text: str, start: int) -> Union[Dict[str, Any], List[Any], None]:
+    parts: List[str] = []
+    stack: List[str] = []
+    # Where the document can be cut and closed: (len(parts), open brackets)
+    cut = None
+    # Index in parts of a comma not yet followed by a value
+    comma = None
+    after_value = False
+    position = start
+    for match in JSON_TOKEN.finditer(text, start):
+        token = match.group(0)
+        gap = text[position:match.start()]
+        position = match.end()
+        value = gap.strip()
+        if value.startswith(':'):
+            # Key separator, possibly followed by a number or literal
+            value = value[1:].strip()
+            after_value = False
+        if value:
+            comma = None
+            after_value = True
+        parts.append(gap)
+        if token[0] == '"':
+            if not match.group(1):
+                break  # Cut off inside a string
+            if after_value and stack:
+                # Next array item or object member
+                parts.append(',')
+            parts.append(token)
+            comma = None
+            after_value = True
+        elif token == ',':
+            cut = (len(parts), stack[:])
+            parts.append(token)
+            comma = len(parts) - 1
+            after_value = False
+        elif token in '{[':
+            if after_value and stack and stack[-1] == '[':
+                parts.append(',')
+            parts.append(token)
+            stack.append(token)
+            cut = (len(parts), stack[:])
+            comma = None
+            after_value = False
+        else:
+            if not stack or CLOSING[stack[-1]] != token:
+                return None
+            if comma is not None:
+                parts[comma] = ''
+            parts.append(token)
+            stack.pop()
+            comma = None
+            after_value = True
+            if not stack:
+                break
+            cut = (len(parts), stack[:])
+    if stack:
+        if cut is None:
+            return None
+        length, stack = cut
+        parts = parts[:length] + [CLOSING[bracket] for bracket in reversed(stack)]
+    try:
+        document = json.loads(''.join(parts))
+    except json.JSONDecodeError:
+        return None
+    return document if isinstance(document, (dict, list)) else None
@@ -0,0 +1,223 @@
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Content-addressed cache of generate_quiz_from_content results, so the same
+# article text never pays for a second LLM call: memory | sqlite | db | none
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory").lower()
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 60 * 60)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.db")
+)
+
+
+def llm_cache_key(prompt_version: str, model: str, temperature: float,
+                  title: str, content: str, sections: List[str]) -> str:
+    """
+    Hash of everything that determines the prompt sent to the LLM
+
+    Args:
+        prompt_version: Version of the prompt template
+        model: LLM model name
+        temperature: Sampling temperature
+        title: Article title
+        content: Article content, already truncated to what the prompt uses
+        sections: Section titles used in the prompt
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    material = json.dumps(
+        [prompt_version, model, temperature, title, content, sections],
+        ensure_ascii=False, separators=(',', ':')
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """
+    Base class: counters and the get/put interface shared by the backends
+    """
+
+    backend = "none"
+
+    def __init__(self, ttl: int = LLM_CACHE_TTL, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        value = None
+        try:
+            value = self._get(key)
+        except Exception as e:
+            print(f"Error reading LLM cache: {e}")
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: Dict):
+        try:
+            self._put(key, value)
+        except Exception as e:
+            print(f"Error writing LLM cache: {e}")
+
+    def _get(self, key: str) -> Optional[Dict]:
+        return None
+
+    def _put(self, key: str, value: Dict):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+class MemoryLLMCache(LLMCache):
+    """
+    Per-process LRU
+    """
+
+    backend = "memory"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(value)
+
+    def _put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+
+class SQLiteLLMCache(LLMCache):
+    """
+    Single-file SQLite store, shared by processes on the same host
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: str = LLM_CACHE_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_stored_at ON llm_cache (stored_at)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _get(self, key):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND stored_at >= ?",
+                (key, time.time() - self.ttl)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _put(self, key, value):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time())
+            )
+            conn.execute("DELETE FROM llm_cache WHERE stored_at < ?", (time.time() - self.ttl,))
+            removed = conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+            self.evictions += max(removed, 0)
+
+
+class DatabaseLLMCache(LLMCache):
+    """
+    llm_response_cache table in the application database (shared by all
+    workers and both deployments when they use the same DATABASE_URL)
+    """
+
+    backend = "db"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        from models import LLMResponseCacheEntry, SessionLocal
+        self.model = LLMResponseCacheEntry
+        self.session_factory = SessionLocal
+
+    def _get(self, key):
+        db = self.session_factory()
+        try:
+            entry = db.query(self.model).filter(self.model.key == key).first()
+            if entry is None or time.time() - entry.stored_at > self.ttl:
+                return None
+            return entry.value
+        finally:
+            db.close()
+
+    def _put(self, key, value):
+        db = self.session_factory()
+        try:
+            db.merge(self.model(key=key, value=value, stored_at=time.time()))
+            db.query(self.model).filter(self.model.stored_at < time.time() - self.ttl).delete()
+            db.commit()
+            overflow = db.query(self.model).count() - self.max_entries
+            if overflow > 0:
+                oldest = db.query(self.model.key).order_by(self.model.stored_at).limit(overflow)
+                db.query(self.model).filter(self.model.key.in_(oldest.scalar_subquery())).delete(
+                    synchronize_session=False
+                )
+                db.commit()
+                self.evictions += overflow
+        finally:
+            db.close()
+
+
+def create_llm_cache(backend: str = LLM_CACHE_BACKEND) -> LLMCache:
+    """
+    Build the configured LLM response cache
+    """
+    try:
+        if backend == "memory":
+            return MemoryLLMCache()
+        if backend == "sqlite":
+            return SQLiteLLMCache()
+        if backend == "db":
+            return DatabaseLLMCache()
+    except Exception as e:
+        print(f"Could not create {backend} LLM cache, caching disabled: {e}")
+    return LLMCache()
@@ -0,0 +1,218 @@
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Client-side limits for LLM calls, kept under the provider quota so bursts
+# queue here instead of failing with 429s. Budgets are per minute (0 disables
+# one); concurrency adapts between the min and max (AIMD): +1 per window of
+# fast successes, halved on a 429 or a call slower than LLM_LATENCY_TARGET.
+LLM_RPM = int(os.getenv("LLM_RPM", "15"))
+LLM_TPM = int(os.getenv("LLM_TPM", "1000000"))
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_LATENCY_TARGET = float(os.getenv("LLM_LATENCY_TARGET", "45"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE = float(os.getenv("LLM_RETRY_BASE", "2"))
+LLM_RETRY_MAX = float(os.getenv("LLM_RETRY_MAX", "60"))
+
+# Exception class names providers use for throttling (google.api_core raises
+# ResourceExhausted for 429)
+RATE_LIMIT_ERROR_NAMES = {"ResourceExhausted", "TooManyRequests", "RateLimitError"}
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Whether an exception from the LLM client means "slow down" (HTTP 429)
+    """
+    if type(error).__name__ in RATE_LIMIT_ERROR_NAMES:
+        return True
+    for attribute in ("code", "status_code"):
+        if getattr(error, attribute, None) == 429:
+            return True
+    message = str(error).lower()
+    return "429" in message or "rate limit" in message or "resource has been exhausted" in message
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (about four characters per token for English)
+    """
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """
+    Per-minute budget refilled continuously; acquire blocks until it fits
+    """
+
+    def __init__(self, per_minute: int, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.capacity = per_minute
+        self.fill_rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1) -> float:
+        """
+        Take amount from the bucket, waiting for it to refill if needed
+
+        Returns:
+            Seconds spent waiting
+        """
+        if self.capacity <= 0:
+            return 0.0
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.fill_rate
+            self.sleep(delay)
+            waited += delay
+
+    def drain(self):
+        """
+        Empty the bucket (the provider said we are over budget)
+        """
+        with self._lock:
+            self._refill()
+            self.tokens = 0.0
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    AIMD limit on calls in flight: additive increase on fast successes,
+    multiplicative decrease on throttling or slow calls
+    """
+
+    def __init__(self, minimum: int = LLM_MIN_CONCURRENCY, maximum: int = LLM_MAX_CONCURRENCY,
+                 latency_target: float = LLM_LATENCY_TARGET, initial: Optional[int] = None):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.latency_target = latency_target
+        # Starts wide open so parallel calls (chunked generation) are not
+        # serialised after a restart; the first 429 or slow call halves it
+        self.limit = float(initial if initial is not None else self.maximum)
+        self.in_flight = 0
+        self.decreases = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency: Optional[float] = None, throttled: bool = False):
+        """
+        Give back a slot and adjust the limit
+
+        Args:
+            latency: Duration of a successful call (None if it failed)
+            throttled: The call was rejected with a 429
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if throttled or (latency is not None and latency > self.latency_target):
+                self.limit = max(self.minimum, self.limit / 2)
+                self.decreases += 1
+            elif latency is not None:
+                # About +1 after a full window of successes at the current limit
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class LLMRateLimiter:
+    """
+    Wraps LLM calls with request and token budgets, adaptive concurrency and
+    jittered exponential retry on 429s. Blocking; calls come from the
+    generation thread pool.
+    """
+
+    def __init__(self, rpm: int = LLM_RPM, tpm: int = LLM_TPM,
+                 concurrency: Optional[AdaptiveConcurrencyLimit] = None,
+                 max_retries: int = LLM_MAX_RETRIES, retry_base: float = LLM_RETRY_BASE,
+                 retry_max: float = LLM_RETRY_MAX, sleep: Callable[[float], None] = time.sleep):
+        self.requests = TokenBucket(rpm, sleep=sleep)
+        self.tokens = TokenBucket(tpm, sleep=sleep)
+        self.concurrency = concurrency or AdaptiveConcurrencyLimit()
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+        self.retries = 0
+        self.gave_up = 0
+        self.wait_seconds = 0.0
+
+    def _count(self, field: str, amount: float = 1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def retry_delay(self, attempt: int) -> float:
+        """
+        Full-jitter backoff: uniform in [0, min(max, base * 2^attempt)]
+        """
+        return random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+
+    def call(self, func: Callable[[], Any], estimated_tokens: int = 0) -> Any:
+        """
+        Run func under the limits, retrying it when it is throttled
+
+        Args:
+            func: The LLM call
+            estimated_tokens: Prompt plus expected output tokens
+
+        Returns:
+            func's result; the last 429 is re-raised once retries run out
+        """
+        for attempt in range(self.max_retries + 1):
+            self.concurrency.acquire()
+            try:
+                waited = self.requests.acquire(1) + self.tokens.acquire(estimated_tokens)
+                self._count("wait_seconds", waited)
+                self._count("calls")
+                started = time.monotonic()
+                result = func()
+            except Exception as e:
+                throttled = is_rate_limit_error(e)
+                self.concurrency.release(throttled=throttled)
+                if not throttled:
+                    raise
+                self._count("throttled")
+                self.requests.drain()
+                if attempt == self.max_retries:
+                    self._count("gave_up")
+                    raise
+                self._count("retries")
+                self.sleep(self.retry_delay(attempt))
+                continue
+            self.concurrency.release(latency=time.monotonic() - started)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "gave_up": self.gave_up,
+            "wait_seconds": round(self.wait_seconds, 3),
+            "concurrency_limit": int(self.concurrency.limit),
+            "in_flight": self.concurrency.in_flight,
+            "concurrency_decreases": self.concurrency.decreases
+        }
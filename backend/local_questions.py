@@ -0,0 +1,317 @@
+"""
+Deterministic, CPU-only quiz generation from the scraped article.
+
+Questions are made from the article's own sentences, without the LLM:
+
+- cloze questions: a year, a number or a named span (a run of capitalised
+  words, e.g. "Bletchley Park") is blanked out of a sentence, and the
+  options are the answer and three values of the same kind from elsewhere in
+  the article (nearby years, numbers of the same magnitude, other names)
+- fact questions: which of four names the article mentions in a section,
+  the others coming from other sections
+
+Sentences are taken round-robin across sections so the quiz covers the whole
+article. The same article always gives the same quiz, in a few milliseconds
+for a long article. Used for instant previews (no LLM call) and as the quiz
+stored when the LLM fails, until it is regenerated.
+"""
+import bisect
+import re
+import zlib
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from content_selection import split_into_passages
+from entities import local_article_fields, named_spans, sentences
+
+YEAR_PATTERN = re.compile(r"\b(1[0-9]{3}|20[0-9]{2})\b")
+NUMBER_PATTERN = re.compile(r"(?<![\w.,])(\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)(?![\w,]|\.\d)")
+
+BLANK = "_____"
+# Synthetic distractors for years and numbers missing from the article
+YEAR_OFFSETS = (-3, 5, -10, 12, 2, -7)
+NUMBER_FACTORS = (2, 0.5, 3, 1.5, 10, 0.25)
+
+
+def is_title_span(span: str, title: str) -> bool:
+    """
+    Whether a span is part of the article title or contains it (a giveaway
+    answer)
+    """
+    title_words = set(title.lower().split())
+    span_words = set(span.lower().split())
+    return span_words <= title_words or title_words <= span_words
+
+
+def blank_out(sentence: str, answer: str) -> Optional[str]:
+    """
+    The sentence with the answer replaced by a blank, if it occurs once
+    """
+    pattern = re.compile(r"(?<![\w,.])" + re.escape(answer) + r"(?![\w]|[.,]\d)")
+    if len(pattern.findall(sentence)) != 1:
+        return None
+    return pattern.sub(BLANK, sentence)
+
+
+def nearest(values: List, value, limit: int = 12) -> List:
+    """
+    Up to limit entries of a sorted list closest to value, nearest first
+    """
+    index = bisect.bisect_left(values, value)
+    lower, upper = index - 1, index
+    found = []
+    while len(found) < limit and (lower >= 0 or upper < len(values)):
+        if upper >= len(values) or (lower >= 0 and value - values[lower] <= values[upper] - value):
+            found.append(values[lower])
+            lower -= 1
+        else:
+            found.append(values[upper])
+            upper += 1
+    return found
+
+
+def year_distractors(answer: str, years: List[int], sentence: str) -> List[str]:
+    """
+    The article's years closest to the answer, then offsets from it
+    """
+    value = int(answer)
+    candidates = [year for year in nearest(years, value) if year != value]
+    candidates += [value + offset for offset in YEAR_OFFSETS]
+    return pick_distinct([str(year) for year in candidates], answer, sentence)
+
+
+def format_number(value: float, like: str) -> str:
+    if "." in like:
+        return f"{value:.{len(like.split('.')[1])}f}"
+    return f"{round(value):,}" if "," in like else str(round(value))
+
+
+def parse_number(text: str) -> float:
+    return float(text.replace(",", ""))
+
+
+def number_distractors(answer: str, numbers: Dict[float, str], values: List[float],
+                       sentence: str) -> List[str]:
+    """
+    The article's numbers closest to the answer (same magnitude), then
+    multiples of it
+
+    Args:
+        numbers: Text of each number of the article, by value
+        values: Their values, sorted
+    """
+    value = parse_number(answer)
+    candidates = [
+        numbers[number] for number in nearest(values, value)
+        if 0.1 <= number / value <= 10
+    ]
+    candidates += [format_number(value * factor, answer) for factor in NUMBER_FACTORS]
+    return pick_distinct(candidates, answer, sentence)
+
+
+def span_distractors(answer: str, spans: Counter, sentence: str, exclude=()) -> List[str]:
+    """
+    Other names of the article, those with as many words as the answer first,
+    then the most frequent
+    """
+    length = len(answer.split())
+    answer_words = set(answer.lower().split())
+    candidates = sorted(
+        (span for span in spans if span not in exclude and not answer_words & set(span.lower().split())),
+        key=lambda span: (abs(len(span.split()) - length), -spans[span], span)
+    )
+    return pick_distinct(candidates, answer, sentence)
+
+
+def pick_distinct(candidates: List[str], answer: str, sentence: str, count: int = 3) -> List[str]:
+    """
+    The first candidates that differ from the answer and from each other and
+    do not appear in the sentence
+    """
+    picked = []
+    for candidate in candidates:
+        if candidate == answer or candidate in picked or candidate in sentence:
+            continue
+        picked.append(candidate)
+        if len(picked) == count:
+            break
+    return picked
+
+
+def arrange_options(answer: str, distractors: List[str], seed: str) -> List[str]:
+    """
+    Options with the answer at a position that depends only on the question
+    """
+    options = list(distractors)
+    options.insert(zlib.crc32(seed.encode("utf-8")) % (len(options) + 1), answer)
+    return options
+
+
+def section_phrase(section: Optional[str]) -> str:
+    return f'the "{section}" section' if section else "the introduction"
+
+
+class ArticleFacts:
+    """
+    One pass over the article: its years, numbers and names (the distractor
+    pools), and the candidate answers of each section as (kind, answer,
+    sentence), in reading order. Questions are only built, with their
+    distractors, for the candidates a quiz ends up using.
+    """
+
+    def __init__(self, title: str, passages: List[Dict]):
+        years = set()
+        numbers = {}
+        self.spans: Counter = Counter()
+        self.section_spans: Dict[Optional[str], Counter] = {}
+        self.candidates: Dict[Optional[str], List[Tuple[str, str, str]]] = {}
+        first_sentences: Dict[Tuple[Optional[str], str], str] = {}
+
+        title_spans: Dict[str, bool] = {}
+        for section, sentence in sentences(passages):
+            section_candidates = self.candidates.get(section)
+            if section_candidates is None:
+                section_candidates = self.candidates[section] = []
+                self.section_spans[section] = Counter()
+            for span in named_spans(sentence):
+                if span not in title_spans:
+                    title_spans[span] = is_title_span(span, title)
+                if title_spans[span]:
+                    continue
+                self.spans[span] += 1
+                self.section_spans[section][span] += 1
+                first_sentences.setdefault((section, span), sentence)
+                section_candidates.append(("name", span, sentence))
+            for year in YEAR_PATTERN.findall(sentence):
+                years.add(int(year))
+                section_candidates.append(("year", year, sentence))
+            for number in NUMBER_PATTERN.findall(sentence):
+                if YEAR_PATTERN.fullmatch(number):
+                    continue
+                value = parse_number(number)
+                numbers.setdefault(value, number)
+                if value >= 2:
+                    section_candidates.append(("number", number, sentence))
+        self.years = sorted(years)
+        self.numbers = numbers
+        self.number_values = sorted(numbers)
+
+        # Fact questions: a name only this section mentions
+        for section, counts in self.section_spans.items():
+            own = [span for span, count in counts.most_common() if self.spans[span] == count]
+            for span in own[:2]:
+                self.candidates[section].append(("fact", span, first_sentences[(section, span)]))
+
+    def question(self, kind: str, answer: str, sentence: str, section: Optional[str]) -> Optional[Dict]:
+        """
+        The question for a candidate, or None if it cannot be blanked out or
+        lacks three distractors
+        """
+        if kind == "fact":
+            text = f"Which of these does the article mention in {section_phrase(section)}?"
+            distractors = span_distractors(answer, self.spans, "", exclude=self.section_spans[section])
+            difficulty = "easy"
+        else:
+            blanked = blank_out(sentence, answer)
+            if blanked is None:
+                return None
+            if kind == "name":
+                text = f"Which name completes this statement from the article? {blanked}"
+                distractors = span_distractors(answer, self.spans, sentence)
+                count = self.spans[answer]
+                difficulty = "easy" if count >= 3 else "hard" if count == 1 else "medium"
+            elif kind == "year":
+                text = f"In which year? {blanked}"
+                distractors = year_distractors(answer, self.years, sentence)
+                difficulty = "medium"
+            else:
+                text = f"Which number completes this statement from the article? {blanked}"
+                distractors = number_distractors(answer, self.numbers, self.number_values, sentence)
+                difficulty = "hard"
+        if len(distractors) < 3:
+            return None
+        return {
+            "question": text,
+            "options": arrange_options(answer, distractors, text),
+            "answer": answer,
+            "difficulty": difficulty,
+            "explanation": f'The article states in {section_phrase(section)}: "{sentence}"',
+            "section": section
+        }
+
+
+def interleave_kinds(section_candidates: List[Tuple[str, str, str]]) -> Iterator[Tuple[str, str, str]]:
+    """
+    A section's candidates alternating between kinds of question
+    """
+    by_kind: Dict[str, List] = {}
+    for candidate in section_candidates:
+        by_kind.setdefault(candidate[0], []).append(candidate)
+    queues = [iter(queue) for queue in by_kind.values()]
+    while queues:
+        for queue in list(queues):
+            candidate = next(queue, None)
+            if candidate is None:
+                queues.remove(queue)
+            else:
+                yield candidate
+
+
+def generate_local_questions(title: str, passages: List[Dict], count: int = 10) -> List[Dict]:
+    """
+    Up to count questions about the article, round-robin across sections,
+    at most one per sentence and answer
+
+    Args:
+        title: Article title
+        passages: Section-tagged paragraphs of the article
+        count: Questions wanted
+
+    Returns:
+        Questions in the quiz format, with the section they are about
+    """
+    facts = ArticleFacts(title, passages)
+    queues = [
+        (section, interleave_kinds(section_candidates))
+        for section, section_candidates in facts.candidates.items() if section_candidates
+    ]
+    questions = []
+    used_sentences, used_answers = set(), set()
+    while queues and len(questions) < count:
+        for entry in list(queues):
+            section, queue = entry
+            for kind, answer, sentence in queue:
+                if sentence in used_sentences or answer in used_answers:
+                    continue
+                question = facts.question(kind, answer, sentence, section)
+                if question:
+                    questions.append(question)
+                    used_sentences.add(sentence)
+                    used_answers.add(answer)
+                    break
+            else:
+                queues.remove(entry)
+            if len(questions) == count:
+                break
+    return questions
+
+
+def generate_local_quiz(title: str, content: str, sections: List[str],
+                        passages: Optional[List[Dict]] = None, count: int = 10,
+                        links: Optional[List[Dict]] = None) -> Dict:
+    """
+    Quiz in the generate_quiz_from_content format, made without the LLM
+
+    Args:
+        title: Article title
+        content: Article text (split into passages if none are given)
+        sections: Section titles
+        passages: Section-tagged paragraphs from the scraper
+        count: Questions wanted
+        links: Article links of the text, for the key entities
+    """
+    passages = passages or (split_into_passages(content) if content else [])
+    return dict(
+        local_article_fields(title, passages, sections, links),
+        quiz=generate_local_questions(title, passages, count)
+    )
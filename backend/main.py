@@ -1,20 +1,80 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Callable, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import binascii
+import contextvars
+import functools
+import json
 import os
 from dotenv import load_dotenv
 
-from models import QuizRecord, SessionLocal, engine, Base
-from scraper import scrape_wikipedia
-from quiz_generator import generate_quiz_from_content
-from schemas import QuizRequest, QuizResponse, QuizHistoryResponse
-
-# Load environment variables
+# Load environment variables before the modules below read their settings
 load_dotenv()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+from models import (
+    QuizRecord, GenerationLock, GenerationJob, QuizBatch, QuizBatchItem, ScrapeCacheEntry,
+    SessionLocal, AsyncSessionLocal, async_engine, engine, Base
+)
+from scraper import (
+    scrape_wikipedia, scrape_wikipedia_batch, canonical_article_key,
+    SCRAPER_BACKEND
+)
+from quiz_generator import llm_cache, llm_limiter
+from schemas import (
+    QuizRequest, QuizResponse, QuizHistoryResponse, JobResponse, BatchRequest, BatchResponse
+)
+from http_client import article_validators
+from metrics import ServerTimingMiddleware, PROMETHEUS_CONTENT_TYPE, render_metrics, record_outcome
+from migrations import migrate_database
+from pipeline import QuizPipeline, ArticleUnavailable, RegenerationFailed, quiz_record_to_response
+from quiz_store import (
+    SQLAlchemyQuizStore, quiz_record_fields, encode_history_cursor, decode_history_cursor
+)
+from scrape_cache import ScrapeCache, MemoryScrapeTier, DatabaseScrapeTier
+from singleflight import SingleFlight, NullGenerationLock, DatabaseGenerationLock
+from jobs import JobQueue, JobWorkerPool, PermanentJobError, JOB_WORKERS, FINISHED_STATUSES
+from batch import BatchRunner, BATCH_MAX_ITEMS
+from wiki_api import API_BATCH_SIZE
+
+# Tables are created and migrated at startup, not on import. Deployments that
+# migrate as a separate step (python migrations.py) set AUTO_MIGRATE=false.
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "true").lower() == "true"
+
+# Scraping and LLM calls are blocking, so they run on a bounded thread pool
+# instead of the event loop. Read endpoints stay responsive while up to
+# GENERATION_WORKERS quizzes are being generated; further requests queue.
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", "4"))
+generation_executor = ThreadPoolExecutor(
+    max_workers=GENERATION_WORKERS,
+    thread_name_prefix="quiz-generation"
+)
+
+# Concurrent requests for the same article within this process wait for a
+# single leader. With several uvicorn workers, GENERATION_LOCK=db additionally
+# serialises generation of an article across processes through a lock row.
+generation_flight = SingleFlight()
+if os.getenv("GENERATION_LOCK", "none").lower() == "db":
+    generation_lock = DatabaseGenerationLock(AsyncSessionLocal, GenerationLock)
+else:
+    generation_lock = NullGenerationLock()
+
+# Parsed articles are cached apart from quizzes, so force_regenerate reruns
+# the LLM on the cached content instead of fetching the article again
+scrape_cache = ScrapeCache(
+    MemoryScrapeTier(),
+    DatabaseScrapeTier(SessionLocal, ScrapeCacheEntry)
+)
+
+# Generated quizzes. Always the database here: jobs and batches share the
+# quiz_records table (the serverless app picks its store with QUIZ_STORE)
+quiz_store = SQLAlchemyQuizStore(AsyncSessionLocal, QuizRecord)
+
+# Generations requested with async_job are queued in the database and run by
+# background workers (started with the app), so the request returns at once
+job_queue = JobQueue(AsyncSessionLocal, GenerationJob)
 
 app = FastAPI(
     title="Wikipedia Quiz Generator API",
@@ -29,15 +89,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Location"],
 )
 
-# Dependency to get database session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Stage timings of each request in a Server-Timing header (see metrics.py)
+app.add_middleware(ServerTimingMiddleware)
+
+def prepare_database():
+    """
+    Create missing tables and run migrations
+    """
+    migrate_database(engine, Base.metadata)
+
+@app.on_event("startup")
+async def startup():
+    if AUTO_MIGRATE:
+        await asyncio.get_running_loop().run_in_executor(None, prepare_database)
+    if JOB_WORKERS > 0:
+        job_workers.start()
+
+@app.on_event("shutdown")
+async def shutdown_generation_executor():
+    await job_workers.stop()
+    generation_executor.shutdown(wait=False)
+    await async_engine.dispose()
+
+async def run_in_generation_pool(func, *args, **kwargs):
+    """
+    Run a blocking function on the generation thread pool and await its result
+    (in the caller's context, so its stages are timed for the request)
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        generation_executor,
+        functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    )
 
 @app.get("/")
 async def root():
@@ -46,114 +132,445 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "generate_quiz": "/api/generate-quiz",
+            "generate_quiz_stream": "/api/generate-quiz/stream",
+            "get_job": "/api/jobs/{id}",
+            "batches": "/api/batches",
             "get_history": "/api/history",
-            "get_quiz_by_id": "/api/quiz/{id}"
+            "get_quiz_by_id": "/api/quiz/{id}",
+            "stats": "/api/stats",
+            "metrics": "/metrics"
         }
     }
 
-@app.post("/api/generate-quiz", response_model=QuizResponse)
-async def generate_quiz(request: QuizRequest, db: Session = Depends(get_db)):
+def cache_scrape_result(key: str, scraped_data: Dict):
+    scrape_cache.put(key, scraped_data)
+    # Also cache under the redirect target's key
+    resolved_key = canonical_article_key(scraped_data["canonical_url"])
+    if resolved_key and resolved_key != key:
+        scrape_cache.put(resolved_key, scraped_data)
+
+def scrape_article(key: str, url: str, refresh: bool = False):
     """
-    Generate a quiz from a Wikipedia article URL
+    Scrape an article through the scrape cache (runs on the generation pool)
+    
+    With refresh (force_regenerate) the cached entry is not trusted: the page
+    is revalidated with a conditional GET (see http_client.ValidatorCache), so
+    an edit made since it was cached is seen and an unchanged page costs a 304
     """
-    try:
-        # Check if URL already exists in database (caching)
-        existing_quiz = db.query(QuizRecord).filter(
-            QuizRecord.url == request.url
-        ).first()
+    scraped_data = None if refresh else scrape_cache.get(key)
+    record_outcome("scrape_cache", "refresh" if refresh else "hit" if scraped_data is not None else "miss")
+    if scraped_data is None:
+        scraped_data = scrape_wikipedia(url)
+        if scraped_data:
+            cache_scrape_result(key, scraped_data)
+    return scraped_data
+
+def scrape_articles(targets: List, refresh: bool = False) -> Dict[str, Optional[Dict]]:
+    """
+    Scrape several articles through the scrape cache (runs on the generation
+    pool); with SCRAPER_BACKEND=api the misses are fetched in one API query
+    (one request per article, see wiki_api)
+    
+    Args:
+        targets: (canonical key, URL) pairs
+        refresh: Fetch every article again instead of using the cache (see
+            scrape_article)
         
-        if existing_quiz and not request.force_regenerate:
-            # Return cached quiz
-            return QuizResponse(
-                id=existing_quiz.id,
-                url=existing_quiz.url,
-                title=existing_quiz.title,
-                summary=existing_quiz.summary,
-                key_entities=existing_quiz.key_entities,
-                sections=existing_quiz.sections,
-                quiz=existing_quiz.quiz,
-                related_topics=existing_quiz.related_topics,
-                created_at=existing_quiz.created_at
-            )
+    Returns:
+        Dictionary mapping each key to its scraped data (None if failed)
+    """
+    if SCRAPER_BACKEND != "api":
+        return {key: scrape_article(key, url, refresh) for key, url in targets}
+    
+    results = {}
+    misses = []
+    for key, url in targets:
+        results[key] = None if refresh else scrape_cache.get(key)
+        if results[key] is None:
+            misses.append((key, url))
+    if misses:
+        scraped = scrape_wikipedia_batch([url for _, url in misses])
+        for key, url in misses:
+            results[key] = scraped.get(url)
+            if results[key]:
+                cache_scrape_result(key, results[key])
+    return results
+
+# Scrape -> select -> generate -> validate -> persist, shared with the
+# serverless app; scrapes go through the scrape cache, blocking work through
+# the generation pool
+pipeline = QuizPipeline(quiz_store, scrape=scrape_article, run_blocking=run_in_generation_pool)
+
+def flight_key(request: QuizRequest, key: str) -> str:
+    """
+    Single-flight key of a generation: a forced or raw-HTML request never
+    joins a plain generation of the same article, which would not honour it
+    """
+    return f"{key}|force={int(request.force_regenerate)}|raw_html={int(request.store_raw_html)}"
+
+async def produce_quiz(request: QuizRequest, key: str,
+                       emit: Optional[Callable[[str, Dict], None]] = None) -> QuizResponse:
+    """
+    Run the quiz pipeline for an article (single-flight leader)
+    
+    Args:
+        request: Generation request
+        key: Canonical article key
+        emit: Progress callback (event name, data) for streaming clients;
+            questions are reported as the LLM produces them
         
-        # Scrape Wikipedia article
-        scraped_data = scrape_wikipedia(request.url)
+    Returns:
+        The stored quiz
         
-        if not scraped_data:
-            raise HTTPException(
-                status_code=400,
-                detail="Failed to scrape Wikipedia article. Please check the URL."
+    Raises:
+        RegenerationFailed: A forced regeneration fell back; interactive
+            callers return the stored quiz, jobs retry
+    """
+    # Another worker may have produced the quiz while we waited for the lock,
+    # so the pipeline checks the store again first
+    async with generation_lock.hold(key):
+        try:
+            quiz_record = await pipeline.run(
+                request.url, key,
+                force_regenerate=request.force_regenerate,
+                store_raw_html=request.store_raw_html,
+                emit=emit
             )
+        except ArticleUnavailable as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Generate quiz using LLM
-        quiz_data = generate_quiz_from_content(
-            title=scraped_data["title"],
-            content=scraped_data["content"],
-            sections=scraped_data["sections"]
+        return quiz_record_to_response(quiz_record)
+
+@app.post("/api/generate-quiz", response_model=QuizResponse)
+async def generate_quiz(request: QuizRequest):
+    """
+    Generate a quiz from a Wikipedia article URL
+    """
+    key = canonical_article_key(request.url)
+    if not key:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid URL. Please provide a Wikipedia article URL."
         )
+    
+    try:
+        if request.preview:
+            # Local questions only: answered without waiting for the LLM
+            try:
+                quiz_record = await pipeline.preview(request.url, key, request.store_raw_html)
+            except ArticleUnavailable as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            return quiz_record_to_response(quiz_record)
         
-        # Prepare data for storage
-        quiz_record_data = {
-            "url": request.url,
-            "title": scraped_data["title"],
-            "summary": quiz_data.get("summary", scraped_data.get("summary", "")),
-            "key_entities": quiz_data.get("key_entities", {}),
-            "sections": scraped_data["sections"],
-            "quiz": quiz_data["quiz"],
-            "related_topics": quiz_data.get("related_topics", []),
-            "raw_html": scraped_data.get("raw_html", "") if request.store_raw_html else None
-        }
+        # Check if the article already exists in the store (caching)
+        existing_quiz = await pipeline.find(key, request.force_regenerate)
         
-        # Save to database
         if existing_quiz:
-            # Update existing record
-            for key, value in quiz_record_data.items():
-                setattr(existing_quiz, key, value)
-            db.commit()
-            db.refresh(existing_quiz)
-            quiz_record = existing_quiz
-        else:
-            # Create new record
-            quiz_record = QuizRecord(**quiz_record_data)
-            db.add(quiz_record)
-            db.commit()
-            db.refresh(quiz_record)
+            # Return cached quiz
+            return quiz_record_to_response(existing_quiz)
         
-        return QuizResponse(
-            id=quiz_record.id,
-            url=quiz_record.url,
-            title=quiz_record.title,
-            summary=quiz_record.summary,
-            key_entities=quiz_record.key_entities,
-            sections=quiz_record.sections,
-            quiz=quiz_record.quiz,
-            related_topics=quiz_record.related_topics,
-            created_at=quiz_record.created_at
-        )
+        if request.async_job:
+            job = await job_queue.enqueue(
+                key, request.url, request.force_regenerate, request.store_raw_html
+            )
+            return JSONResponse(
+                status_code=202,
+                content=JobResponse.model_validate(job).model_dump(mode="json"),
+                headers={"Location": f"/api/jobs/{job.id}"}
+            )
+        
+        # Concurrent requests for the same article share one generation
+        try:
+            return await generation_flight.do(
+                flight_key(request, key),
+                lambda: produce_quiz(request, key)
+            )
+        except RegenerationFailed as e:
+            # The user still gets the stored quiz
+            return quiz_record_to_response(e.stored_quiz)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error generating quiz: {str(e)}"
         )
 
+async def run_generation_job(job: GenerationJob) -> int:
+    """
+    Job handler for the background workers
+    
+    Returns:
+        Id of the stored quiz
+    """
+    request = QuizRequest(
+        url=job.url,
+        force_regenerate=job.force_regenerate,
+        store_raw_html=job.store_raw_html
+    )
+    try:
+        response = await generation_flight.do(
+            flight_key(request, job.canonical_key),
+            lambda: produce_quiz(request, job.canonical_key)
+        )
+    except HTTPException as e:
+        # Client errors (e.g. article not found) won't succeed on retry
+        if e.status_code < 500:
+            raise PermanentJobError(e.detail)
+        raise
+    except RegenerationFailed:
+        # Nothing was regenerated; retry with backoff
+        raise RuntimeError("LLM generation failed, the stored quiz was kept")
+    if response.is_fallback:
+        # Stored as a placeholder; retry with backoff for the real quiz
+        raise RuntimeError("LLM generation failed, only a fallback quiz was produced")
+    return response.id
+
+job_workers = JobWorkerPool(job_queue, run_generation_job)
+
+async def scrape_batch_chunk(targets, refresh: bool = False):
+    return await run_in_generation_pool(scrape_articles, targets, refresh)
+
+async def generate_batch_quiz(scraped_data: Dict, force_regenerate: bool) -> Dict:
+    # Stored quizzes are refreshed incrementally (see pipeline.refresh)
+    previous = None
+    if force_regenerate:
+        resolved_key = canonical_article_key(scraped_data["canonical_url"])
+        previous = await quiz_store.find_by_key(resolved_key) if resolved_key else None
+    return await pipeline.generate(scraped_data, use_cache=not force_regenerate, previous=previous)
+
+# Bulk generation (POST /api/batches and python batch.py)
+batch_runner = BatchRunner(
+    AsyncSessionLocal, QuizBatch, QuizBatchItem, QuizRecord,
+    scrape_many=scrape_batch_chunk,
+    generate=generate_batch_quiz,
+    record_fields=quiz_record_fields,
+    scrape_chunk_size=API_BATCH_SIZE if SCRAPER_BACKEND == "api" else 1
+)
+
+def format_sse(event: str, data) -> str:
+    """
+    Encode one Server-Sent Events message
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def quiz_event_stream(request: QuizRequest, key: str):
+    """
+    Server-Sent Events for a quiz generation.
+    
+    Emits "status" events (scraping, generating), a "question" event per quiz
+    question as soon as it has been generated, then a final "quiz" event with
+    the stored record, which is authoritative. Failures end the stream with an
+    "error" event. The generation is not cancelled if the client disconnects,
+    so the quiz is still stored.
+    """
+    existing_quiz = await pipeline.find(key, request.force_regenerate)
+    if existing_quiz:
+        response = quiz_record_to_response(existing_quiz)
+        for index, question in enumerate(response.quiz):
+            yield format_sse("question", {"index": index, "question": question})
+        yield format_sse("quiz", response.model_dump(mode="json"))
+        return
+    
+    events: asyncio.Queue = asyncio.Queue()
+    
+    def emit(event: str, data: Dict):
+        events.put_nowait((event, data))
+    
+    # Followers of an in-flight generation only receive the final quiz
+    generation = asyncio.ensure_future(generation_flight.do(
+        flight_key(request, key),
+        lambda: produce_quiz(request, key, emit)
+    ))
+    generation.add_done_callback(lambda _: events.put_nowait(None))
+    
+    while True:
+        message = await events.get()
+        if message is None:
+            break
+        yield format_sse(*message)
+    
+    try:
+        response = generation.result()
+    except RegenerationFailed as e:
+        # The stored quiz is still sent as the final event
+        yield format_sse("quiz", quiz_record_to_response(e.stored_quiz).model_dump(mode="json"))
+    except HTTPException as e:
+        yield format_sse("error", {"status_code": e.status_code, "detail": e.detail})
+    except Exception as e:
+        yield format_sse("error", {
+            "status_code": 500,
+            "detail": f"Error generating quiz: {str(e)}"
+        })
+    else:
+        yield format_sse("quiz", response.model_dump(mode="json"))
+
+@app.post("/api/generate-quiz/stream")
+async def generate_quiz_stream(request: QuizRequest):
+    """
+    Generate a quiz, streaming progress and questions as Server-Sent Events
+    """
+    key = canonical_article_key(request.url)
+    if not key:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid URL. Please provide a Wikipedia article URL."
+        )
+    
+    return StreamingResponse(
+        quiz_event_stream(request, key),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/stats")
+async def get_stats():
+    """
+    Generation deduplication, Wikipedia fetch and cache counters
+    """
+    return {
+        "single_flight": generation_flight.stats(),
+        "generation_lock": generation_lock.stats(),
+        "wikipedia_validators": article_validators.stats(),
+        "scrape_cache": scrape_cache.stats(),
+        "llm_cache": llm_cache.stats(),
+        "llm_limiter": llm_limiter.stats(),
+        "quiz_store": quiz_store.stats(),
+        "jobs": {**await job_queue.stats(), **job_workers.stats()}
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Stage latency, size and outcome metrics in the Prometheus text format
+    """
+    return Response(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+async def batch_response(batch_id: int) -> BatchResponse:
+    found = await batch_runner.get(batch_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    batch, items, counts = found
+    return BatchResponse(
+        id=batch.id,
+        status=batch.status,
+        total=batch.total,
+        counts=counts,
+        items=items,
+        created_at=batch.created_at,
+        updated_at=batch.updated_at,
+        finished_at=batch.finished_at
+    )
+
+@app.post("/api/batches", response_model=BatchResponse, status_code=202)
+async def create_batch(request: BatchRequest):
+    """
+    Generate quizzes for a list of article URLs or titles in the background
+    """
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch can contain at most {BATCH_MAX_ITEMS} articles."
+        )
+    batch = await batch_runner.create(request.items, request.force_regenerate)
+    batch_runner.start(batch.id)
+    return await batch_response(batch.id)
+
+@app.get("/api/batches/{batch_id}", response_model=BatchResponse)
+async def get_batch(batch_id: int):
+    """
+    Batch progress with the status of every article
+    """
+    return await batch_response(batch_id)
+
+@app.post("/api/batches/{batch_id}/resume", response_model=BatchResponse, status_code=202)
+async def resume_batch(batch_id: int):
+    """
+    Continue an interrupted batch with its pending articles
+    """
+    response = await batch_response(batch_id)
+    batch_runner.start(batch_id)
+    return response
+
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: int):
+    """
+    Status of a queued generation; quiz_id is set once it has succeeded
+    """
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+async def job_event_stream(job_id: int):
+    """
+    Server-Sent Events: a "job" event whenever the job's status changes,
+    ending once it has succeeded or failed
+    """
+    last_seen = None
+    while True:
+        job = await job_queue.get(job_id)
+        if job is None:
+            yield format_sse("error", {"status_code": 404, "detail": "Job not found"})
+            return
+        state = (job.status, job.attempts, job.updated_at)
+        if state != last_seen:
+            last_seen = state
+            yield format_sse("job", JobResponse.model_validate(job).model_dump(mode="json"))
+        if job.status in FINISHED_STATUSES:
+            return
+        await job_queue.wait_for_update(job_workers.poll_interval)
+
+@app.get("/api/jobs/{job_id}/events")
+async def subscribe_job(job_id: int):
+    """
+    Follow a queued generation as Server-Sent Events
+    """
+    return StreamingResponse(
+        job_event_stream(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/api/history", response_model=List[QuizHistoryResponse])
-async def get_history(db: Session = Depends(get_db)):
+async def get_history(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200, description="Page size"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page")
+):
     """
-    Get all quiz history
+    Get quiz history, newest first, one page at a time
+    
+    The cursor for the next page is returned in the X-Next-Cursor header
+    (absent on the last page).
     """
     try:
-        quizzes = db.query(QuizRecord).order_by(QuizRecord.created_at.desc()).all()
+        before = None
+        if cursor:
+            try:
+                before = decode_history_cursor(cursor)
+            except (ValueError, UnicodeDecodeError, binascii.Error):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        
+        rows = await quiz_store.history(limit + 1, before)
+        
+        if len(rows) > limit:
+            rows = rows[:limit]
+            response.headers["X-Next-Cursor"] = encode_history_cursor(rows[-1].created_at, rows[-1].id)
+        
         return [
             QuizHistoryResponse(
-                id=quiz.id,
-                url=quiz.url,
-                title=quiz.title,
-                created_at=quiz.created_at,
-                quiz_count=len(quiz.quiz) if quiz.quiz else 0
+                id=row.id,
+                url=row.url,
+                title=row.title,
+                created_at=row.created_at,
+                quiz_count=row.quiz_count or 0
             )
-            for quiz in quizzes
+            for row in rows
         ]
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -161,12 +578,12 @@ async def get_history(db: Session = Depends(get_db)):
         )
 
 @app.get("/api/quiz/{quiz_id}", response_model=QuizResponse)
-async def get_quiz_by_id(quiz_id: int, db: Session = Depends(get_db)):
+async def get_quiz_by_id(quiz_id: int):
     """
     Get a specific quiz by ID
     """
     try:
-        quiz = db.query(QuizRecord).filter(QuizRecord.id == quiz_id).first()
+        quiz = await quiz_store.get(quiz_id)
         
         if not quiz:
             raise HTTPException(
@@ -174,17 +591,7 @@ async def get_quiz_by_id(quiz_id: int, db: Session = Depends(get_db)):
                 detail="Quiz not found"
             )
         
-        return QuizResponse(
-            id=quiz.id,
-            url=quiz.url,
-            title=quiz.title,
-            summary=quiz.summary,
-            key_entities=quiz.key_entities,
-            sections=quiz.sections,
-            quiz=quiz.quiz,
-            related_topics=quiz.related_topics,
-            created_at=quiz.created_at
-        )
+        return quiz_record_to_response(quiz)
     except HTTPException:
         raise
     except Exception as e:
@@ -194,22 +601,17 @@ async def get_quiz_by_id(quiz_id: int, db: Session = Depends(get_db)):
         )
 
 @app.delete("/api/quiz/{quiz_id}")
-async def delete_quiz(quiz_id: int, db: Session = Depends(get_db)):
+async def delete_quiz(quiz_id: int):
     """
     Delete a quiz by ID
     """
     try:
-        quiz = db.query(QuizRecord).filter(QuizRecord.id == quiz_id).first()
-        
-        if not quiz:
+        if not await quiz_store.delete(quiz_id):
             raise HTTPException(
                 status_code=404,
                 detail="Quiz not found"
             )
         
-        db.delete(quiz)
-        db.commit()
-        
         return {"message": "Quiz deleted successfully"}
     except HTTPException:
         raise
@@ -0,0 +1,204 @@
+"""
+Per-stage instrumentation of quiz generation.
+
+The hot path is timed stage by stage (fetch, parse, select, llm, parse_json,
+persist, ...) with stage(); sizes (bytes fetched, content characters,
+prompt and response tokens) and outcomes (cache hit, fallback used, parse
+failure, ...) are recorded next to them. Everything lands in process-wide
+histograms and counters, served in the Prometheus text format on /metrics,
+and the stage timings of the current HTTP request are collected for its
+Server-Timing header.
+
+Recording costs a perf_counter() call and a few additions under a lock, so
+it stays on in production; no client library is needed.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from a cache lookup to a slow LLM call
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Bytes, characters or tokens
+SIZE_BUCKETS = (100, 300, 1000, 3000, 10000, 30000, 100000, 300000, 1000000, 3000000)
+
+
+def _label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_label_value(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """
+    Cumulative histogram per combination of label values
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...], buckets: Tuple):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # Label values -> [count per bucket (last: above every bound), sum]
+        self._series: Dict[Tuple, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                bucket_labels = _labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    """
+    Monotonic counter per combination of label values
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+stage_seconds = Histogram(
+    "wiki_quiz_stage_seconds", "Time spent in each stage of quiz generation",
+    ("stage",), LATENCY_BUCKETS
+)
+stage_size = Histogram(
+    "wiki_quiz_stage_size", "Size handled by each stage (bytes fetched, content characters, tokens)",
+    ("stage", "unit"), SIZE_BUCKETS
+)
+stage_outcomes = Counter(
+    "wiki_quiz_stage_outcomes_total", "Outcomes of each stage (cache hit, fallback, parse failure, ...)",
+    ("stage", "outcome")
+)
+REGISTRY = [stage_seconds, stage_size, stage_outcomes]
+
+# Stage timings of the HTTP request being served. Tasks and threads started
+# for the request must inherit its context (asyncio.to_thread does; executors
+# need contextvars.copy_context()).
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time a block as one stage, also when it raises
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stage_seconds.observe(elapsed, name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+def record_size(stage_name: str, unit: str, value: float):
+    stage_size.observe(value, stage_name, unit)
+
+
+def record_outcome(stage_name: str, outcome: str):
+    stage_outcomes.inc(stage_name, outcome)
+
+
+def render_metrics() -> str:
+    """
+    Every metric in the Prometheus text exposition format
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def server_timing(timings: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    """
+    Server-Timing header value: time per stage in milliseconds, in the order
+    the stages first ran. Repeated stages (e.g. the parallel LLM calls of a
+    chunked generation) are added up, with the number of runs as description.
+    """
+    durations: Dict[str, List] = {}
+    for name, elapsed in list(timings):
+        entry = durations.setdefault(name, [0.0, 0])
+        entry[0] += elapsed
+        entry[1] += 1
+    metrics = [
+        f'{name};dur={elapsed * 1000:.1f}' + (f';desc="{runs}x"' if runs > 1 else "")
+        for name, (elapsed, runs) in durations.items()
+    ]
+    if total is not None:
+        metrics.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(metrics)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware collecting the stage timings of each HTTP request into
+    its Server-Timing response header. Streaming responses report the stages
+    that ran before their headers were sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: List[Tuple[str, float]] = []
+        _request_timings.set(timings)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                header = server_timing(timings, time.perf_counter() - started)
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"server-timing", header.encode("latin-1"))]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
@@ -0,0 +1,114 @@
+"""
+Lightweight schema migrations for existing databases.
+
+Base.metadata.create_all only creates missing tables, so columns added to
+existing tables are applied here. Every step is idempotent and safe to run
+on each startup, on both SQLite and PostgreSQL.
+
+The app runs them at startup unless AUTO_MIGRATE=false; then run them as a
+deploy step with: python migrations.py
+"""
+import json
+
+from sqlalchemy import inspect, text
+
+from scraper import canonical_article_key
+
+
+def add_column_if_missing(conn, table: str, column: str, ddl_type: str) -> bool:
+    """
+    Add a column to an existing table
+
+    Returns:
+        True if the column was added
+    """
+    columns = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column in columns:
+        return False
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+    return True
+
+
+def backfill_canonical_keys(conn):
+    """
+    Fill quiz_records.canonical_key for rows created before it existed.
+
+    When several old rows normalize to the same article, the newest keeps the
+    key; older duplicates stay reachable by id but are no longer cache hits.
+    """
+    rows = conn.execute(text(
+        "SELECT id, url FROM quiz_records WHERE canonical_key IS NULL "
+        "ORDER BY created_at DESC, id DESC"
+    )).fetchall()
+    taken = {
+        row[0] for row in conn.execute(text(
+            "SELECT canonical_key FROM quiz_records WHERE canonical_key IS NOT NULL"
+        ))
+    }
+    for quiz_id, url in rows:
+        key = canonical_article_key(url)
+        if key and key not in taken:
+            conn.execute(
+                text("UPDATE quiz_records SET canonical_key = :key WHERE id = :id"),
+                {"key": key, "id": quiz_id}
+            )
+            taken.add(key)
+
+
+def backfill_quiz_counts(conn):
+    """
+    Fill quiz_records.quiz_count from the stored quiz JSON
+    """
+    rows = conn.execute(text("SELECT id, quiz FROM quiz_records")).fetchall()
+    for quiz_id, quiz in rows:
+        if isinstance(quiz, str):
+            quiz = json.loads(quiz)
+        if quiz:
+            conn.execute(
+                text("UPDATE quiz_records SET quiz_count = :count WHERE id = :id"),
+                {"count": len(quiz), "id": quiz_id}
+            )
+
+
+def run_migrations(engine):
+    """
+    Bring an existing database up to the current models
+    """
+    with engine.begin() as conn:
+        add_column_if_missing(conn, "quiz_records", "canonical_key", "VARCHAR")
+        backfill_canonical_keys(conn)
+        conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_quiz_records_canonical_key "
+            "ON quiz_records (canonical_key)"
+        ))
+        
+        if add_column_if_missing(conn, "quiz_records", "quiz_count", "INTEGER NOT NULL DEFAULT 0"):
+            backfill_quiz_counts(conn)
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_quiz_records_created_at_id "
+            "ON quiz_records (created_at, id)"
+        ))
+        
+        add_column_if_missing(conn, "quiz_records", "is_fallback", "BOOLEAN NOT NULL DEFAULT FALSE")
+        
+        # Quizzes stored before these are regenerated in full on their next refresh
+        add_column_if_missing(conn, "quiz_records", "revision_id", "INTEGER")
+        add_column_if_missing(conn, "quiz_records", "section_hashes", "JSON")
+
+
+
+def migrate_database(engine, metadata):
+    """
+    Create missing tables, then bring existing ones up to the current models
+    """
+    metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    from models import engine, Base
+    migrate_database(engine, Base.metadata)
+    print("Database is up to date")
@@ -0,0 +1,350 @@
+"""
+The quiz pipeline shared by the FastAPI app (main.py) and the serverless
+function (api/index.py): scrape -> select -> generate -> validate -> persist.
+
+Each stage is a method of QuizPipeline, so callers that need only part of it
+(bulk generation stores quizzes itself) use the stages directly. Deployment
+specifics are injected: how an article is scraped (main adds its scrape
+cache), where blocking work runs (main's generation pool) and the quiz store.
+Concurrency control (single flight, generation locks) stays with the caller.
+
+Regenerating a stored quiz is incremental (see revisions.py): questions about
+sections that did not change are kept, and an unchanged revision costs no
+LLM call at all.
+"""
+import asyncio
+import itertools
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from content_selection import split_into_passages
+from entities import extract_entities
+from local_questions import generate_local_quiz
+from metrics import stage, record_outcome
+from quiz_generator import (
+    LOCAL_ENTITIES, MAX_QUIZ_QUESTIONS, create_fallback_quiz, generate_quiz_from_content, generate_section_questions,
+    unique_strings, valid_questions
+)
+from quiz_store import QuizStore, quiz_record_fields
+from revisions import attribute_questions, order_by_section, plan_refresh, section_hashes, section_key
+from schemas import QuizResponse
+from scraper import canonical_article_key, canonicalize_wikipedia_url, scrape_wikipedia
+
+# Regenerating a stored quiz replaces only the questions about changed
+# sections (false: every regeneration starts from scratch)
+INCREMENTAL_REFRESH = os.getenv("INCREMENTAL_REFRESH", "true").lower() == "true"
+
+
+class ArticleUnavailable(Exception):
+    """
+    The article could not be fetched or has no content
+    """
+
+
+class RegenerationFailed(Exception):
+    """
+    A forced regeneration produced only a fallback quiz; the stored final
+    quiz (stored_quiz) was kept
+    """
+
+    def __init__(self, stored_quiz):
+        super().__init__("Regeneration failed, the stored quiz was kept")
+        self.stored_quiz = stored_quiz
+
+
+def is_reusable(quiz_record, force_regenerate: bool = False) -> bool:
+    """
+    Whether a stored quiz can be returned instead of generating again
+    (fallback quizzes stored while the LLM was unavailable are not final)
+    """
+    return bool(quiz_record) and not force_regenerate and not quiz_record.is_fallback
+
+
+def quiz_record_to_response(quiz_record) -> QuizResponse:
+    """
+    Build the API response for a stored quiz record
+    """
+    return QuizResponse(
+        id=quiz_record.id,
+        url=quiz_record.url,
+        title=quiz_record.title,
+        summary=quiz_record.summary or "",
+        key_entities=quiz_record.key_entities or {},
+        sections=quiz_record.sections or [],
+        quiz=quiz_record.quiz,
+        related_topics=quiz_record.related_topics or [],
+        is_fallback=quiz_record.is_fallback,
+        created_at=quiz_record.created_at
+    )
+
+
+def validate_quiz(quiz_data: Dict, title: str, sections: List[str],
+                  passages: Optional[List[Dict]] = None) -> Dict:
+    """
+    Validate stage: keep the questions that pass validate_quiz_question
+    (answer among the options, known difficulty). A quiz left without
+    questions is replaced by the fallback quiz, so it is regenerated later.
+    """
+    questions = valid_questions(quiz_data.get("quiz", []))
+    if not questions:
+        return create_fallback_quiz(title, "", sections, passages)
+    return dict(quiz_data, quiz=questions)
+
+
+async def run_in_thread(func: Callable, *args, **kwargs):
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+
+class QuizPipeline:
+    """
+    Produces and stores the quiz for an article.
+
+    Args:
+        store: Where quizzes are kept
+        scrape: Blocking (canonical key, URL, refresh) -> scraped article or
+            None; refresh is set for force_regenerate, when a cached copy of
+            the article must not be trusted
+        run_blocking: Awaits a blocking call, e.g. on a thread pool
+    """
+
+    def __init__(self, store: QuizStore,
+                 scrape: Callable[[str, str], Optional[Dict]] = None,
+                 run_blocking: Callable[..., Awaitable[Any]] = run_in_thread):
+        self.store = store
+        self.scrape_article = scrape or (lambda key, url, refresh=False: scrape_wikipedia(url))
+        self.run_blocking = run_blocking
+
+    async def find(self, key: str, force_regenerate: bool = False):
+        """
+        The stored quiz for an article key, if it can be returned as is
+        """
+        quiz_record = await self.store.find_by_key(key)
+        return quiz_record if is_reusable(quiz_record, force_regenerate) else None
+
+    async def scrape(self, key: str, url: str, refresh: bool = False) -> Dict:
+        """
+        Scrape stage; raises ArticleUnavailable
+
+        Args:
+            refresh: Revalidate the article rather than reuse a cached copy
+                (a regeneration must see the current revision)
+        """
+        with stage("scrape"):
+            scraped_data = await self.run_blocking(
+                self.scrape_article, key, canonicalize_wikipedia_url(url), refresh
+            )
+        if not scraped_data:
+            raise ArticleUnavailable("Failed to scrape Wikipedia article. Please check the URL.")
+        return scraped_data
+
+    async def generate(self, scraped_data: Dict, use_cache: bool = True,
+                       on_question: Optional[Callable[[Dict], None]] = None,
+                       previous=None) -> Dict:
+        """
+        Select, generate and validate stages for a scraped article
+
+        Args:
+            scraped_data: Scrape stage result
+            use_cache: Reuse a cached LLM response for the same prompt
+            on_question: Called on the blocking worker with each question as
+                soon as the LLM has produced it
+            previous: Stored quiz of the article being regenerated; only the
+                questions about changed sections are replaced (see refresh)
+        """
+        passages = scraped_data.get("passages") or split_into_passages(scraped_data["content"])
+        if previous is not None and INCREMENTAL_REFRESH and not previous.is_fallback:
+            with stage("refresh"):
+                quiz_data = await self.refresh(previous, scraped_data, passages)
+            if quiz_data is not None:
+                if on_question:
+                    for question in quiz_data["quiz"]:
+                        on_question(question)
+                return quiz_data
+
+        with stage("generate"):
+            quiz_data = await self.run_blocking(
+                generate_quiz_from_content,
+                title=scraped_data["title"],
+                content=scraped_data["content"],
+                sections=scraped_data["sections"],
+                use_cache=use_cache,
+                on_question=on_question,
+                passages=scraped_data.get("passages"),
+                links=scraped_data.get("links")
+            )
+        if quiz_data.get("is_fallback"):
+            return quiz_data
+        with stage("validate"):
+            quiz_data = validate_quiz(quiz_data, scraped_data["title"], scraped_data["sections"], passages)
+        if quiz_data.get("is_fallback"):
+            record_outcome("validate", "no_valid_question")
+        else:
+            quiz_data["quiz"] = attribute_questions(quiz_data["quiz"], passages)
+            quiz_data["section_hashes"] = section_hashes(passages)
+        return quiz_data
+
+    async def refresh(self, previous, scraped_data: Dict, passages: List[Dict]) -> Optional[Dict]:
+        """
+        Incremental regeneration: keep the stored questions about unchanged
+        sections and generate replacements for the others from the changed
+        sections only. Nothing is generated if the revision is unchanged.
+
+        Returns:
+            The refreshed quiz, or None if it has to be regenerated in full
+            (no section hashes stored, no question left, or the LLM call
+            failed)
+        """
+        hashes = section_hashes(passages)
+        plan = plan_refresh(
+            previous.quiz or [], previous.revision_id, previous.section_hashes,
+            scraped_data.get("revision_id"), hashes, passages
+        )
+        if plan is None:
+            record_outcome("refresh", "full")
+            return None
+        kept, changed = plan
+        if changed and not kept:
+            # Every question is stale: the full prompt costs no more
+            record_outcome("refresh", "full")
+            return None
+
+        quiz = kept
+        key_entities = previous.key_entities or {}
+        changed_passages = [passage for passage in passages if section_key(passage["section"]) in changed]
+        # Generate only if questions were dropped (their sections changed)
+        if changed_passages and len(kept) < len(previous.quiz or []):
+            result = await self.run_blocking(
+                generate_section_questions, scraped_data["title"], changed_passages, kept,
+                len(previous.quiz)
+            )
+            if result is None:
+                record_outcome("refresh", "failed")
+                return None
+            quiz = order_by_section(kept + attribute_questions(result["quiz"], changed_passages), passages)
+            if LOCAL_ENTITIES:
+                key_entities = extract_entities(scraped_data["title"], passages, scraped_data.get("links"))
+            else:
+                key_entities = {
+                    kind: unique_strings(key_entities.get(kind, []) + result["key_entities"].get(kind, []))
+                    for kind in ("people", "organizations", "locations")
+                }
+        record_outcome("refresh", "incremental" if changed else "unchanged")
+        return {
+            # The summary and related topics are about the whole article
+            "summary": previous.summary,
+            "key_entities": key_entities,
+            "quiz": quiz,
+            "related_topics": previous.related_topics or [],
+            "section_hashes": hashes
+        }
+
+    async def preview(self, url: str, key: str, store_raw_html: bool = False):
+        """
+        Instant quiz made locally from the article (see local_questions),
+        without the LLM. It is stored as a fallback quiz, so the next regular
+        request generates the real one; a stored final quiz is returned as is
+        and never replaced by a preview.
+
+        Returns:
+            The stored quiz record
+        """
+        stored_quiz = await self.store.find_by_key(key)
+        if is_reusable(stored_quiz):
+            return stored_quiz
+        scraped_data = await self.scrape(key, url)
+        resolved_key = canonical_article_key(scraped_data["canonical_url"]) or key
+        if resolved_key != key:
+            stored_quiz = await self.store.find_by_key(resolved_key)
+            if is_reusable(stored_quiz):
+                return stored_quiz
+
+        with stage("local_generate"):
+            quiz_data = generate_local_quiz(
+                scraped_data["title"], scraped_data["content"], scraped_data["sections"],
+                scraped_data.get("passages"), MAX_QUIZ_QUESTIONS, scraped_data.get("links")
+            )
+        if not quiz_data["quiz"]:
+            record_outcome("local_generate", "no_questions")
+            quiz_data = create_fallback_quiz(scraped_data["title"], "", scraped_data["sections"])
+        else:
+            record_outcome("local_generate", "ok")
+        # A final quiz may have been stored while the article was scraped
+        stored_quiz = await self.store.find_by_key(resolved_key)
+        if is_reusable(stored_quiz):
+            return stored_quiz
+        return await self.persist(scraped_data, dict(quiz_data, is_fallback=True), resolved_key, store_raw_html)
+
+    async def persist(self, scraped_data: Dict, quiz_data: Dict, key: str,
+                      store_raw_html: bool = False):
+        """
+        Persist stage: replaces the stored quiz of the article, if any
+        """
+        with stage("persist"):
+            return await self.store.save(quiz_record_fields(scraped_data, quiz_data, key, store_raw_html))
+
+    async def run(self, url: str, key: str, force_regenerate: bool = False,
+                  store_raw_html: bool = False,
+                  emit: Optional[Callable[[str, Dict], None]] = None):
+        """
+        All stages for one article, returning early with a reusable stored quiz
+
+        Args:
+            url: Article URL as requested
+            key: Canonical article key
+            force_regenerate: Regenerate even if a quiz is stored: only the
+                questions about sections changed since it was generated are
+                replaced (the LLM cache is bypassed)
+            store_raw_html: Store the article HTML with the quiz
+            emit: Progress callback (event name, data) on the event loop:
+                "status" at each stage, "question" for each question as the
+                LLM produces it
+
+        Returns:
+            The stored quiz record
+
+        Raises:
+            ArticleUnavailable: The article could not be scraped
+            RegenerationFailed: force_regenerate was set and only a fallback
+                quiz could be generated (the stored final quiz is kept)
+        """
+        stored_quiz = await self.store.find_by_key(key)
+        if is_reusable(stored_quiz, force_regenerate):
+            return stored_quiz
+
+        if emit:
+            emit("status", {"stage": "scraping"})
+        scraped_data = await self.scrape(key, url, refresh=force_regenerate)
+
+        # Redirects (e.g. Turing -> Alan_Turing) only resolve once fetched
+        resolved_key = canonical_article_key(scraped_data["canonical_url"]) or key
+        if resolved_key != key:
+            stored_quiz = await self.store.find_by_key(resolved_key)
+            if is_reusable(stored_quiz, force_regenerate):
+                return stored_quiz
+
+        on_question = None
+        if emit:
+            emit("status", {
+                "stage": "generating",
+                "title": scraped_data["title"],
+                "sections": scraped_data["sections"]
+            })
+            loop = asyncio.get_running_loop()
+            question_index = itertools.count()
+
+            def on_question(question):
+                # Called on the blocking worker
+                loop.call_soon_threadsafe(
+                    emit, "question", {"index": next(question_index), "question": question}
+                )
+
+        # A stored quiz being regenerated is refreshed incrementally
+        quiz_data = await self.generate(scraped_data, use_cache=not force_regenerate,
+                                        on_question=on_question, previous=stored_quiz)
+        if quiz_data.get("is_fallback") and is_reusable(stored_quiz):
+            # A failed regeneration never replaces a final quiz
+            record_outcome("refresh", "failed")
+            if force_regenerate:
+                raise RegenerationFailed(stored_quiz)
+            return stored_quiz
+        return await self.persist(scraped_data, quiz_data, resolved_key, store_raw_html)
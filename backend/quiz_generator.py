@@ -1,62 +1,221 @@
 import os
 import json
-from typing import Dict, List
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Initialize Gemini LLM - Using gemini-1.5-flash (current free tier model)
-llm = ChatGoogleGenerativeAI(
-    model="gemini-1.5-flash",
-    google_api_key=os.getenv("GOOGLE_API_KEY"),
-    temperature=0.7,
-    convert_system_message_to_human=True
-)
+import math
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
 
-# Quiz Generation Prompt Template
-QUIZ_GENERATION_PROMPT = """You are an expert quiz creator. Based on the following Wikipedia article, create a comprehensive quiz.
+from content_selection import chunk_passages, select_content, split_into_passages, tokenize
+from json_stream import JSONArrayItemStream, repair_json
+from llm_cache import create_llm_cache, llm_cache_key
+from llm_limiter import LLMRateLimiter, estimate_tokens
+from entities import local_article_fields
+from local_questions import generate_local_quiz
+from metrics import stage, record_size, record_outcome
 
-Article Title: {title}
+GEMINI_MODEL = "gemini-1.5-flash"
+LLM_TEMPERATURE = 0.7
 
-Article Content:
-{content}
+# Bump whenever a quiz prompt changes so cached responses are not reused
+PROMPT_VERSION = "3"
 
-Article Sections: {sections}
+MAX_QUIZ_QUESTIONS = 10
+# The prompt asks for 8-10 questions; a quiz left with fewer valid ones (a
+# truncated or partly invalid response) is topped up with a call for the
+# missing questions only
+MIN_QUIZ_QUESTIONS = 8
 
-Generate a JSON response with the following structure:
-{{
-    "summary": "A concise 2-3 sentence summary of the article",
-    "key_entities": {{
-        "people": ["list of important people mentioned"],
-        "organizations": ["list of organizations mentioned"],
-        "locations": ["list of locations mentioned"]
-    }},
-    "quiz": [
-        {{
-            "question": "Clear, specific question based on article content",
+# Expected size of a quiz response, charged against the tokens-per-minute budget
+EXPECTED_OUTPUT_TOKENS = 2000
+# Share of it taken by the summary, key entities and related topics
+ARTICLE_FIELDS_OUTPUT_TOKENS = 400
+QUESTION_KEYS = ["question", "options", "answer", "difficulty", "explanation"]
+
+# Ask the model for bare JSON matching the response schema, where the chat
+# model supports it (newer langchain-google-genai releases)
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "true").lower() == "true"
+
+NAMES_SCHEMA = {"type": "array", "items": {"type": "string"}}
+QUESTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "question": {"type": "string"},
+        "options": {"type": "array", "items": {"type": "string"}, "minItems": 4, "maxItems": 4},
+        "answer": {"type": "string"},
+        "difficulty": {"type": "string", "enum": ["easy", "medium", "hard"]},
+        "explanation": {"type": "string"}
+    },
+    "required": QUESTION_KEYS
+}
+# Schema of each field of a quiz response, in prompt order
+RESPONSE_FIELD_SCHEMAS = {
+    "summary": {"type": "string"},
+    "key_entities": {
+        "type": "object",
+        "properties": {kind: NAMES_SCHEMA for kind in ("people", "organizations", "locations")},
+        "required": ["people", "organizations", "locations"]
+    },
+    "quiz": {"type": "array", "items": QUESTION_SCHEMA},
+    "related_topics": NAMES_SCHEMA
+}
+
+# Chunked generation: each part is asked for this many times its share of
+# MAX_QUIZ_QUESTIONS so the reduce step has candidates to choose from
+CHUNK_OVERSAMPLE = 1.5
+
+# Questions of the final quiz per difficulty: (minimum, maximum)
+DIFFICULTY_TARGETS = {"easy": (3, 4), "medium": (3, 4), "hard": (2, 3)}
+
+# Share of content words two questions need in common to count as duplicates
+DUPLICATE_SIMILARITY = 0.6
+
+# Summary, key entities and related topics are made locally (see entities.py)
+# while the LLM writes the questions, and the prompts ask for questions only
+LOCAL_ENTITIES = os.getenv("LOCAL_ENTITIES", "true").lower() == "true"
+
+# Separates chunk contents in the cache key of a chunked generation
+CHUNK_SEPARATOR = "\n\n<<<chunk>>>\n\n"
+
+# Gemini LLM, built by get_llm on first use: LangChain and the Gemini client
+# take over a second to import, which cold starts should not pay for requests
+# that never generate. Tests and benchmarks may assign a chat model here.
+llm = None
+_llm_lock = threading.Lock()
+
+# Request/token budgets and adaptive concurrency shared by all LLM calls
+llm_limiter = LLMRateLimiter()
+
+# Generated quizzes keyed by a hash of the prompt inputs
+llm_cache = create_llm_cache()
+
+# Local article fields, made while the generating thread waits for the LLM
+article_fields_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="article-fields")
+
+# Prompts are built by quiz_prompt from shared fragments. Each exists in two
+# variants: with the summary, key entities and related topics fields, and
+# questions only (LOCAL_ENTITIES makes those fields locally).
+ARTICLE_FIELDS = ("summary", "key_entities", "related_topics")
+
+QUESTION_FORMAT = """        {{
+            "question": "Clear, specific question based on <subject>",
             "options": ["Option A", "Option B", "Option C", "Option D"],
             "answer": "The correct option text",
             "difficulty": "easy/medium/hard",
             "explanation": "Brief explanation referencing the article section or content"
-        }}
-    ],
-    "related_topics": ["list of 5-7 related Wikipedia topics for further reading"]
-}}
+        }}"""
+
+KEY_ENTITIES_FORMAT = """    "key_entities": {{
+        "people": ["list of important people mentioned<scope>"],
+        "organizations": ["list of organizations mentioned<scope>"],
+        "locations": ["list of locations mentioned<scope>"]
+    }},"""
+
+# Requirements added when the response has the field
+FIELD_REQUIREMENTS = {
+    "related_topics": "Related topics should be actual Wikipedia topics related to the article",
+    "key_entities": "Key entities should be extracted from the actual article content"
+}
 
-IMPORTANT REQUIREMENTS:
-1. Generate exactly 8-10 quiz questions
-2. Ensure questions have varying difficulty: 3-4 easy, 3-4 medium, 2-3 hard
-3. All questions MUST be directly answerable from the article content - no hallucinations
-4. Each explanation should reference specific sections or facts from the article
-5. Options should be plausible but clearly distinguishable
-6. Related topics should be actual Wikipedia topics related to the article
-7. Key entities should be extracted from the actual article content
-8. Return ONLY valid JSON, no additional text
+def quiz_prompt(task: str, article: str, subject: str, requirements: List[str],
+                fields=(), scope: str = "", topics: str = "5-7") -> str:
+    """
+    Quiz prompt template (PromptTemplate syntax) from its parts
+    
+    Args:
+        task: What is asked, after the role
+        article: Article block (title, content, sections)
+        subject: What the questions are based on, e.g. "these sections"
+        requirements: Numbered requirements, before the field and JSON ones
+        fields: Response fields besides the quiz (of ARTICLE_FIELDS)
+        scope: Where key entities come from, e.g. " in this part"
+        topics: How many related topics are asked for
+    """
+    structure = []
+    if "summary" in fields:
+        structure.append('    "summary": "A concise 2-3 sentence summary of the article",')
+    if "key_entities" in fields:
+        structure.append(KEY_ENTITIES_FORMAT.replace("<scope>", scope))
+    structure.append('    "quiz": [\n' + QUESTION_FORMAT.replace("<subject>", subject) + '\n    ]'
+                     + (',' if "related_topics" in fields else ''))
+    if "related_topics" in fields:
+        structure.append(f'    "related_topics": ["list of {topics} related Wikipedia topics for further reading"]')
+    requirements = (list(requirements)
+                    + [FIELD_REQUIREMENTS[field] for field in FIELD_REQUIREMENTS if field in fields]
+                    + ["Return ONLY valid JSON, no additional text"])
+    return (
+        f"You are an expert quiz creator. {task}\n\n{article}\n\n"
+        "Generate a JSON response with the following structure:\n{{\n" + "\n".join(structure) + "\n}}\n\n"
+        "IMPORTANT REQUIREMENTS:\n"
+        + "\n".join(f"{number}. {requirement}" for number, requirement in enumerate(requirements, 1))
+        + "\n\nGenerate the quiz now:"
+    )
+
+# Whole article
+QUIZ_PROMPT_PARTS = {
+    "task": "Based on the following Wikipedia article, create a comprehensive quiz.",
+    "article": "Article Title: {title}\n\nArticle Content:\n{content}\n\nArticle Sections: {sections}",
+    "subject": "article content",
+    "requirements": [
+        "Generate exactly 8-10 quiz questions",
+        "Ensure questions have varying difficulty: 3-4 easy, 3-4 medium, 2-3 hard",
+        "All questions MUST be directly answerable from the article content - no hallucinations",
+        "Each explanation should reference specific sections or facts from the article",
+        "Options should be plausible but clearly distinguishable"
+    ]
+}
+QUIZ_GENERATION_PROMPT = quiz_prompt(**QUIZ_PROMPT_PARTS, fields=ARTICLE_FIELDS)
+QUIZ_QUESTIONS_PROMPT = quiz_prompt(**QUIZ_PROMPT_PARTS)
 
-Generate the quiz now:"""
+# One part of a long article (chunked generation)
+CHUNK_PROMPT_PARTS = {
+    "task": "The following is part {part} of {parts} of a long Wikipedia article. "
+            "Create quiz questions about this part.",
+    "article": "Article Title: {title}\n\nArticle Content (part {part} of {parts}):\n{content}\n\n"
+               "Article Sections: {sections}",
+    "subject": "this part of the article",
+    "requirements": [
+        "Generate exactly {question_count} quiz questions",
+        "Mix difficulties: about 40% easy, 40% medium, 20% hard",
+        "All questions MUST be directly answerable from this part of the article - no hallucinations",
+        "Spread the questions over the sections in this part",
+        "Options should be plausible but clearly distinguishable"
+    ]
+}
+CHUNK_QUIZ_PROMPT = quiz_prompt(**CHUNK_PROMPT_PARTS, fields=ARTICLE_FIELDS, scope=" in this part", topics="3-5")
+CHUNK_QUESTIONS_PROMPT = quiz_prompt(**CHUNK_PROMPT_PARTS)
+
+# The changed sections of an article whose quiz is refreshed
+SECTION_PROMPT_PARTS = {
+    "task": "The following sections of a Wikipedia article have changed since its quiz was written. "
+            "Create quiz questions about these sections.",
+    "article": "Article Title: {title}\n\nChanged Sections:\n{content}",
+    "subject": "these sections",
+    "requirements": [
+        "Generate exactly {question_count} quiz questions",
+        "Mix difficulties: about 40% easy, 40% medium, 20% hard",
+        "All questions MUST be directly answerable from these sections - no hallucinations",
+        "Spread the questions over the sections",
+        "Options should be plausible but clearly distinguishable"
+    ]
+}
+SECTION_QUIZ_PROMPT = quiz_prompt(**SECTION_PROMPT_PARTS, fields=("key_entities",), scope=" in these sections")
+SECTION_QUESTIONS_PROMPT = quiz_prompt(**SECTION_PROMPT_PARTS)
+
+# The questions missing from a short quiz (questions only)
+TOP_UP_QUESTIONS_PROMPT = quiz_prompt(
+    task="A quiz about the following Wikipedia article needs more questions.",
+    article="Article Title: {title}\n\nArticle Content:\n{content}\n\n"
+            "Questions already in the quiz (do not repeat or rephrase them):\n{existing}",
+    subject="article content",
+    requirements=[
+        "Generate exactly {question_count} quiz questions",
+        "Mix difficulties: about 40% easy, 40% medium, 20% hard",
+        "All questions MUST be directly answerable from the article content - no hallucinations",
+        "Ask about facts the existing questions do not cover",
+        "Options should be plausible but clearly distinguishable"
+    ]
+)
 
 # Entity Extraction Prompt (Fallback)
 ENTITY_EXTRACTION_PROMPT = """Extract key entities from this Wikipedia article content.
@@ -85,10 +244,13 @@ Return ONLY valid JSON array:"""
 def extract_json_from_response(response_text: str) -> dict:
     """
     Extract JSON from LLM response, handling potential markdown formatting
+    
+    A bare array of questions is returned as {"quiz": [...]}; any other
+    document that is not an object is rejected (None).
     """
     try:
         # Try direct JSON parse
-        return json.loads(response_text)
+        return quiz_document(json.loads(response_text))
     except json.JSONDecodeError:
         # Try to extract JSON from markdown code blocks
         if "```json" in response_text:
@@ -99,48 +261,249 @@ def extract_json_from_response(response_text: str) -> dict:
             json_str = response_text.strip()
         
         try:
-            return json.loads(json_str)
+            return quiz_document(json.loads(json_str))
         except json.JSONDecodeError as e:
+            # Trailing commas, a truncated end: keep every complete value
+            repaired = quiz_document(repair_json(response_text))
+            record_outcome("json_repair", "ok" if repaired is not None else "failed")
+            if repaired is not None:
+                return repaired
             print(f"Failed to parse JSON: {e}")
             print(f"Response text: {response_text[:500]}")
             return None
 
-def generate_quiz_from_content(title: str, content: str, sections: List[str]) -> Dict:
+def quiz_document(document) -> Optional[dict]:
+    """
+    The parsed response as a quiz object: an array of questions is wrapped
+    as {"quiz": [...]}, anything else that is not an object is None
+    """
+    if isinstance(document, dict):
+        return document
+    if isinstance(document, list) and document and all(isinstance(item, dict) for item in document):
+        return {"quiz": document}
+    if document is not None:
+        print(f"Unexpected JSON response: {type(document).__name__}")
+    return None
+
+def get_llm():
+    """
+    The chat model, creating the Gemini client on first use
+    """
+    global llm
+    if llm is None:
+        with _llm_lock:
+            if llm is None:
+                from langchain_google_genai import ChatGoogleGenerativeAI
+                
+                # Using gemini-1.5-flash (current free tier model)
+                llm = ChatGoogleGenerativeAI(
+                    model=GEMINI_MODEL,
+                    google_api_key=os.getenv("GOOGLE_API_KEY"),
+                    temperature=LLM_TEMPERATURE,
+                    convert_system_message_to_human=True,
+                    # Throttling is retried by llm_limiter, which also slows down other calls
+                    max_retries=1
+                )
+    return llm
+
+def supports_json_mode(model) -> bool:
+    """
+    Whether the chat model takes a response MIME type and schema
+    """
+    fields = getattr(type(model), "model_fields", None) or getattr(type(model), "__fields__", {})
+    return "response_mime_type" in fields and "response_schema" in fields
+
+def response_schema(*fields: str) -> Dict:
+    """
+    JSON schema of a quiz response with the given fields
+    """
+    return {
+        "type": "object",
+        "properties": {field: RESPONSE_FIELD_SCHEMAS[field] for field in fields},
+        "required": list(fields)
+    }
+
+def quiz_response_fields() -> tuple:
+    """
+    Fields the full and chunk prompts ask for
+    """
+    if LOCAL_ENTITIES:
+        return ("quiz",)
+    return ("summary", "key_entities", "quiz", "related_topics")
+
+def stream_quiz_response(chain, inputs: Dict, on_question: Callable[[Dict], None]) -> str:
+    """
+    Run the chain in streaming mode, reporting each quiz question as soon as
+    its JSON object is complete in the token stream
+    
+    Only questions passing validate_quiz_question are reported (with their
+    difficulty normalised), the ones the final quiz keeps.
+    
+    Args:
+        chain: Prompt | LLM | StrOutputParser chain
+        inputs: Prompt variables
+        on_question: Called (on the calling thread) with each complete question
+        
+    Returns:
+        The full response text
+    """
+    parser = JSONArrayItemStream("quiz")
+    reported = 0
+    for chunk in chain.stream(inputs):
+        for question in valid_questions(parser.feed(chunk)):
+            if reported < MAX_QUIZ_QUESTIONS:
+                on_question(question)
+                reported += 1
+    return parser.text
+
+def invoke_quiz_prompt(template: str, inputs: Dict,
+                       on_question: Optional[Callable[[Dict], None]] = None,
+                       expected_output_tokens: int = EXPECTED_OUTPUT_TOKENS,
+                       schema: Optional[Dict] = None) -> Optional[Dict]:
+    """
+    Run a quiz prompt through the rate limiter and parse the JSON response
+    
+    Args:
+        template: Prompt template
+        inputs: Prompt variables
+        on_question: If given, the response is streamed and this is called
+            with each question as soon as it is complete
+        expected_output_tokens: Response size charged against the token budget
+        schema: JSON schema of the response, enforced by the model with
+            LLM_JSON_MODE where it is supported
+        
+    Returns:
+        Parsed response (repaired if it is malformed or truncated), or None
+        if no JSON object can be recovered from it
+    """
+    from langchain_core.prompts import PromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+    
+    model = get_llm()
+    if schema and LLM_JSON_MODE and supports_json_mode(model):
+        model = model.bind(response_mime_type="application/json", response_schema=schema)
+    
+    # Create chain using LCEL (LangChain Expression Language)
+    prompt = PromptTemplate(input_variables=list(inputs), template=template)
+    chain = prompt | model | StrOutputParser()
+    
+    prompt_tokens = estimate_tokens(template + ''.join(str(value) for value in inputs.values()))
+    estimated_tokens = prompt_tokens + expected_output_tokens
+    try:
+        # Includes the wait for a rate limiter slot
+        with stage("llm"):
+            if on_question:
+                response = llm_limiter.call(
+                    lambda: stream_quiz_response(chain, inputs, on_question), estimated_tokens
+                )
+            else:
+                response = llm_limiter.call(lambda: chain.invoke(inputs), estimated_tokens)
+    except Exception:
+        record_outcome("llm", "error")
+        raise
+    record_outcome("llm", "ok")
+    record_size("llm", "prompt_tokens", prompt_tokens)
+    record_size("llm", "response_tokens", estimate_tokens(response))
+    
+    with stage("parse_json"):
+        quiz_data = extract_json_from_response(response)
+    record_outcome("parse_json", "ok" if quiz_data is not None else "parse_failure")
+    return quiz_data
+
+def expected_question_tokens(question_count: int = MAX_QUIZ_QUESTIONS) -> int:
+    """
+    Expected response size of a prompt asking for question_count questions
+    """
+    output_tokens = EXPECTED_OUTPUT_TOKENS - (ARTICLE_FIELDS_OUTPUT_TOKENS if LOCAL_ENTITIES else 0)
+    return output_tokens * question_count // MAX_QUIZ_QUESTIONS
+
+def make_article_fields(title: str, passages: List[Dict], sections: List[str],
+                        links: Optional[List[Dict]]) -> Dict:
+    with stage("entities"):
+        return local_article_fields(title, passages, sections, links)
+
+def generate_quiz_from_content(title: str, content: str, sections: List[str],
+                               use_cache: bool = True,
+                               on_question: Optional[Callable[[Dict], None]] = None,
+                               passages: Optional[List[Dict]] = None,
+                               links: Optional[List[Dict]] = None) -> Dict:
     """
     Generate quiz questions from Wikipedia article content using LLM
     
+    Articles longer than LLM_CHUNKED_MIN_TOKENS are split by section and
+    generated from in parallel calls (see generate_chunked_quiz). With
+    LOCAL_ENTITIES the LLM only writes the questions; the summary, key
+    entities and related topics are made locally during the call.
+    
     Args:
         title: Article title
         content: Article content
         sections: List of section titles
+        use_cache: Return a cached response for identical inputs; when False
+            the LLM is always called (the fresh result is still cached)
+        on_question: If given, the LLM response is streamed and this is
+            called with each question as soon as it has been generated. The
+            returned dictionary remains authoritative (it is the fallback
+            quiz if the full response cannot be parsed). Chunked generations
+            report their questions once the parts have been merged.
+        passages: Section-tagged paragraphs from the scraper; the prompt
+            gets the most salient ones of every section within
+            LLM_CONTENT_TOKEN_BUDGET (content is split up when omitted)
+        links: Article links of the text, for the local key entities and
+            related topics
         
     Returns:
         Dictionary containing quiz data
     """
-    try:
-        # Create prompt
-        prompt = PromptTemplate(
-            input_variables=["title", "content", "sections"],
-            template=QUIZ_GENERATION_PROMPT
+    with stage("select"):
+        passages = passages or split_into_passages(content)
+        # Each prompt's content fits the token budget
+        prompt_contents = [select_content(title, content, chunk) for chunk in chunk_passages(passages)]
+    record_size("select", "tokens", sum(estimate_tokens(prompt_content) for prompt_content in prompt_contents))
+    prompt_sections = sections[:10]  # Limit sections in prompt
+    cache_key = llm_cache_key(
+        f"{PROMPT_VERSION}-questions" if LOCAL_ENTITIES else PROMPT_VERSION, GEMINI_MODEL, LLM_TEMPERATURE, title,
+        CHUNK_SEPARATOR.join(prompt_contents), prompt_sections
+    )
+    if use_cache:
+        cached = llm_cache.get(cache_key)
+        record_outcome("llm_cache", "hit" if cached is not None else "miss")
+        if cached is not None:
+            if on_question:
+                for question in cached["quiz"]:
+                    on_question(question)
+            return cached
+    
+    article_fields = None
+    if LOCAL_ENTITIES:
+        # In a copy of the context, so its stage counts toward the request
+        article_fields = article_fields_pool.submit(
+            contextvars.copy_context().run, make_article_fields, title, passages, sections, links
         )
-        
-        # Create chain using LCEL (LangChain Expression Language)
-        chain = prompt | llm | StrOutputParser()
-        
+    
+    try:
         # Generate quiz
-        sections_str = ", ".join(sections[:10])  # Limit sections in prompt
-        response = chain.invoke({
-            "title": title,
-            "content": content[:10000],  # Limit content for token constraints
-            "sections": sections_str
-        })
-        
-        # Parse response
-        quiz_data = extract_json_from_response(response)
+        sections_str = ", ".join(prompt_sections)
+        if len(prompt_contents) > 1:
+            quiz_data = generate_chunked_quiz(title, prompt_contents, sections_str)
+            if quiz_data and on_question:
+                for question in quiz_data["quiz"]:
+                    on_question(question)
+        else:
+            quiz_data = invoke_quiz_prompt(QUIZ_QUESTIONS_PROMPT if LOCAL_ENTITIES else QUIZ_GENERATION_PROMPT, {
+                "title": title,
+                "content": prompt_contents[0],
+                "sections": sections_str
+            }, on_question, expected_output_tokens=expected_question_tokens(),
+                schema=response_schema(*quiz_response_fields()))
         
         if not quiz_data:
-            # Fallback: Create basic quiz structure
-            quiz_data = create_fallback_quiz(title, content, sections)
+            # Fallback: Create basic quiz structure (never cached)
+            record_outcome("generate", "fallback")
+            return create_fallback_quiz(title, content, sections, passages, links)
+        
+        if article_fields:
+            quiz_data.update(article_fields.result())
         
         # Validate and ensure required fields
         quiz_data.setdefault("summary", f"An article about {title}")
@@ -149,26 +512,269 @@ def generate_quiz_from_content(title: str, content: str, sections: List[str]) ->
         quiz_data.setdefault("related_topics", [])
         
         # Validate quiz questions
-        validated_quiz = []
-        for q in quiz_data.get("quiz", []):
-            if all(key in q for key in ["question", "options", "answer", "difficulty", "explanation"]):
-                if len(q["options"]) == 4:
-                    validated_quiz.append(q)
+        quiz_data["quiz"] = valid_questions(quiz_data["quiz"])[:MAX_QUIZ_QUESTIONS]
+        
+        if 0 < len(quiz_data["quiz"]) < MIN_QUIZ_QUESTIONS:
+            # Ask for the missing questions rather than regenerating the quiz
+            top_up_content = prompt_contents[0] if len(prompt_contents) == 1 else select_content(
+                title, content, passages
+            )
+            added = top_up_questions(title, top_up_content, quiz_data["quiz"])
+            if on_question:
+                for question in added:
+                    on_question(question)
+            quiz_data["quiz"] = quiz_data["quiz"] + added
         
-        quiz_data["quiz"] = validated_quiz[:10]  # Limit to 10 questions
+        if quiz_data["quiz"]:
+            llm_cache.put(cache_key, quiz_data)
         
+        record_outcome("generate", "ok" if quiz_data["quiz"] else "no_questions")
         return quiz_data
         
     except Exception as e:
         print(f"Error generating quiz: {e}")
         # Return fallback quiz
-        return create_fallback_quiz(title, content, sections)
+        record_outcome("generate", "fallback")
+        return create_fallback_quiz(title, content, sections, passages, links)
+
+def generate_chunked_quiz(title: str, contents: List[str], sections_str: str) -> Optional[Dict]:
+    """
+    Map-reduce generation for long articles: one LLM call per part of the
+    article, run in parallel, then a local merge of the results
+    
+    Wall-clock time follows the slowest part rather than the whole article.
+    Parts whose call fails are left out; the merged quiz is None only if
+    every part failed.
+    
+    Args:
+        title: Article title
+        contents: Prompt content of each part, in article order
+        sections_str: Section titles for the prompt
+        
+    Returns:
+        Merged quiz data, or None
+    """
+    question_count = max(3, math.ceil(MAX_QUIZ_QUESTIONS * CHUNK_OVERSAMPLE / len(contents)))
+    
+    def generate_part(part):
+        index, content = part
+        try:
+            return invoke_quiz_prompt(CHUNK_QUESTIONS_PROMPT if LOCAL_ENTITIES else CHUNK_QUIZ_PROMPT, {
+                "title": title,
+                "content": content,
+                "sections": sections_str,
+                "part": index + 1,
+                "parts": len(contents),
+                "question_count": question_count
+            }, expected_output_tokens=expected_question_tokens(question_count),
+                schema=response_schema(*quiz_response_fields()))
+        except Exception as e:
+            print(f"Error generating quiz for part {index + 1} of {title}: {e}")
+            return None
+    
+    # Calls still queue on llm_limiter's concurrency limit. Each part runs in
+    # a copy of the caller's context, so its stages count toward the request.
+    with ThreadPoolExecutor(max_workers=len(contents)) as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, generate_part, part)
+            for part in enumerate(contents)
+        ]
+        # Parts that failed or parsed to nothing are dropped
+        results = [result for result in (future.result() for future in futures) if result]
+    if not results:
+        return None
+    
+    key_entities = {}
+    for kind in ("people", "organizations", "locations"):
+        key_entities[kind] = unique_strings(
+            name for result in results for name in (result.get("key_entities") or {}).get(kind, [])
+        )
+    
+    return {
+        # The first part holds the lead, which summarises the whole article
+        "summary": next((result["summary"] for result in results if result.get("summary")),
+                        f"An article about {title}"),
+        "key_entities": key_entities,
+        "quiz": reduce_quiz_candidates([result.get("quiz") or [] for result in results]),
+        "related_topics": unique_strings(
+            topic for result in results for topic in result.get("related_topics", [])
+        )[:7]
+    }
 
-def create_fallback_quiz(title: str, content: str, sections: List[str]) -> Dict:
+def generate_section_questions(title: str, passages: List[Dict], existing: List[Dict],
+                               limit: int = MAX_QUIZ_QUESTIONS) -> Optional[Dict]:
+    """
+    Questions replacing those of changed sections when a quiz is refreshed
+    
+    Only the changed sections go into the prompt, and only as many questions
+    as were dropped are asked for (oversampled by CHUNK_OVERSAMPLE), so the
+    tokens spent follow the size of the change.
+    
+    Args:
+        title: Article title
+        passages: Section-tagged paragraphs of the changed sections
+        existing: Questions kept from the stored quiz
+        limit: Questions of the refreshed quiz
+        
+    Returns:
+        {"quiz": new questions (not duplicating existing ones, balancing
+        difficulties with them), "key_entities": entities of the changed
+        sections, empty with LOCAL_ENTITIES}, or None if the LLM call failed
+    """
+    missing = min(limit, MAX_QUIZ_QUESTIONS) - len(existing)
+    if missing <= 0 or not passages:
+        return {"quiz": [], "key_entities": {}}
+    question_count = max(2, math.ceil(missing * CHUNK_OVERSAMPLE))
+    try:
+        result = invoke_quiz_prompt(SECTION_QUESTIONS_PROMPT if LOCAL_ENTITIES else SECTION_QUIZ_PROMPT, {
+            "title": title,
+            "content": select_content(title, "", passages),
+            "question_count": question_count
+        }, expected_output_tokens=expected_question_tokens(question_count),
+            schema=response_schema("quiz") if LOCAL_ENTITIES else response_schema("key_entities", "quiz"))
+    except Exception as e:
+        print(f"Error generating questions for the changed sections of {title}: {e}")
+        return None
+    if not result:
+        return None
+    return {
+        "quiz": reduce_quiz_candidates([result.get("quiz") or []], min(limit, MAX_QUIZ_QUESTIONS), existing),
+        "key_entities": result.get("key_entities") or {}
+    }
+
+def top_up_questions(title: str, content: str, existing: List[Dict],
+                     limit: int = MAX_QUIZ_QUESTIONS) -> List[Dict]:
+    """
+    Questions completing a quiz that came back short, from one call asking
+    only for the missing ones (oversampled by CHUNK_OVERSAMPLE)
+    
+    Args:
+        title: Article title
+        content: Prompt content of the article
+        existing: Valid questions of the quiz
+        limit: Questions of the completed quiz
+        
+    Returns:
+        New questions (not duplicating existing ones, balancing difficulties
+        with them); none if the call failed
+    """
+    missing = limit - len(existing)
+    if missing <= 0:
+        return []
+    question_count = max(2, math.ceil(missing * CHUNK_OVERSAMPLE))
+    try:
+        with stage("top_up"):
+            result = invoke_quiz_prompt(TOP_UP_QUESTIONS_PROMPT, {
+                "title": title,
+                "content": content,
+                "existing": "\n".join(f"- {question['question']}" for question in existing),
+                "question_count": question_count
+            }, expected_output_tokens=expected_question_tokens(question_count), schema=response_schema("quiz"))
+    except Exception as e:
+        print(f"Error topping up the quiz for {title}: {e}")
+        result = None
+    record_outcome("top_up", "ok" if result else "failed")
+    if not result:
+        return []
+    return reduce_quiz_candidates([result.get("quiz") or []], limit, existing)
+
+def valid_questions(questions) -> List[Dict]:
+    """
+    The questions passing validate_quiz_question, with their difficulty
+    normalised (lowercase, trimmed)
+    """
+    valid = []
+    for question in questions if isinstance(questions, list) else []:
+        if not isinstance(question, dict):
+            continue
+        question = dict(question, difficulty=str(question.get("difficulty", "")).strip().lower())
+        if validate_quiz_question(question):
+            valid.append(question)
+    return valid
+
+def unique_strings(values) -> List[str]:
+    """
+    Strings in first-seen order, without case-insensitive repeats
+    """
+    seen = set()
+    unique = []
+    for value in values:
+        if isinstance(value, str) and value.strip() and value.strip().lower() not in seen:
+            seen.add(value.strip().lower())
+            unique.append(value.strip())
+    return unique
+
+def reduce_quiz_candidates(candidate_lists: List[List[Dict]],
+                           limit: int = MAX_QUIZ_QUESTIONS,
+                           existing: List[Dict] = ()) -> List[Dict]:
+    """
+    Merge candidate questions from the parts of an article into one quiz
+    
+    Invalid questions and near-duplicates (DUPLICATE_SIMILARITY of their
+    content words shared with an earlier question) are dropped. Questions
+    are then taken to meet the DIFFICULTY_TARGETS minimums, then up to the
+    maximums, then any difficulty until the limit, alternating between
+    parts so every part of the article is asked about.
+    
+    Args:
+        candidate_lists: Questions generated for each part, in article order
+        limit: Maximum number of questions
+        existing: Questions already in the quiz; candidates duplicating them
+            are dropped, and they count toward the difficulty targets and
+            the limit
+        
+    Returns:
+        Selected questions (without existing ones), in article order
+    """
+    pools = {difficulty: [] for difficulty in DIFFICULTY_TARGETS}
+    seen_terms = [set(tokenize(question["question"])) for question in existing]
+    for part, questions in enumerate(candidate_lists):
+        for position, question in enumerate(valid_questions(questions)):
+            terms = set(tokenize(question["question"]))
+            if any(
+                len(terms & other) / max(len(terms | other), 1) >= DUPLICATE_SIMILARITY
+                for other in seen_terms
+            ):
+                continue
+            seen_terms.append(terms)
+            pools[question["difficulty"]].append((position, part, question))
+    
+    # Sorting by position within the part alternates between parts
+    for pool in pools.values():
+        pool.sort(key=lambda item: item[:2])
+    
+    selected = []
+    room = max(0, limit - len(existing))
+    counts = {difficulty: 0 for difficulty in DIFFICULTY_TARGETS}
+    for question in existing:
+        if question.get("difficulty") in counts:
+            counts[question["difficulty"]] += 1
+    for bound in (0, 1):
+        for difficulty, targets in DIFFICULTY_TARGETS.items():
+            pool = pools[difficulty]
+            while pool and counts[difficulty] < targets[bound] and len(selected) < room:
+                selected.append(pool.pop(0))
+                counts[difficulty] += 1
+    leftovers = sorted((item for pool in pools.values() for item in pool), key=lambda item: item[:2])
+    selected.extend(leftovers[:room - len(selected)])
+    
+    return [question for _, _, question in sorted(selected, key=lambda item: (item[1], item[0]))]
+
+def create_fallback_quiz(title: str, content: str, sections: List[str],
+                         passages: Optional[List[Dict]] = None,
+                         links: Optional[List[Dict]] = None) -> Dict:
     """
     Create a basic fallback quiz when LLM generation fails
+    
+    The questions are made locally from the article (see local_questions);
+    a single question about the topic is left if it has none to offer.
+    Marked with is_fallback so it is neither cached nor kept as the final quiz
     """
+    local_quiz = generate_local_quiz(title, content, sections, passages, MAX_QUIZ_QUESTIONS, links)
+    if local_quiz["quiz"]:
+        return dict(local_quiz, is_fallback=True)
     return {
+        "is_fallback": True,
         "summary": f"This article discusses {title} and covers various aspects including {', '.join(sections[:3])}.",
         "key_entities": {
             "people": [],
@@ -196,7 +802,7 @@ def validate_quiz_question(question: Dict) -> bool:
     if not all(key in question for key in required_keys):
         return False
     
-    if len(question["options"]) != 4:
+    if not isinstance(question["options"], list) or len(question["options"]) != 4:
         return False
     
     if question["answer"] not in question["options"]:
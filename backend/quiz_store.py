@@ -0,0 +1,424 @@
+import asyncio
+import base64
+import copy
+import itertools
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Where generated quizzes are kept: db (SQLAlchemy, the quiz_records table of
+# DATABASE_URL) | sqlite (one local file, for single containers whose disk
+# outlives a request) | memory (per process). The backend app always uses db;
+# the serverless app defaults to db when DATABASE_URL is set, else sqlite.
+QUIZ_STORE = os.getenv("QUIZ_STORE", "").lower()
+QUIZ_STORE_PATH = os.getenv(
+    "QUIZ_STORE_PATH",
+    os.path.join(tempfile.gettempdir(), "wiki_quiz_store.db")
+)
+QUIZ_STORE_MAX_ENTRIES = int(os.getenv("QUIZ_STORE_MAX_ENTRIES", "500"))
+
+# Stored fields besides id and created_at
+QUIZ_FIELDS = [
+    "url", "canonical_key", "title", "summary", "key_entities", "sections", "quiz",
+    "quiz_count", "related_topics", "raw_html", "is_fallback", "revision_id", "section_hashes"
+]
+JSON_FIELDS = {"key_entities", "sections", "quiz", "related_topics", "section_hashes"}
+
+
+def quiz_record_fields(scraped_data: Dict, quiz_data: Dict, resolved_key: str,
+                       store_raw_html: bool = False) -> Dict:
+    """
+    Stored fields for a generated quiz
+    """
+    return {
+        "url": scraped_data["canonical_url"],
+        "canonical_key": resolved_key,
+        "title": scraped_data["title"],
+        "summary": quiz_data.get("summary", scraped_data.get("summary", "")),
+        "key_entities": quiz_data.get("key_entities", {}),
+        "sections": scraped_data["sections"],
+        "quiz": quiz_data["quiz"],
+        "quiz_count": len(quiz_data["quiz"]),
+        "related_topics": quiz_data.get("related_topics", []),
+        "raw_html": scraped_data.get("raw_html", "") if store_raw_html else None,
+        "is_fallback": bool(quiz_data.get("is_fallback")),
+        "revision_id": scraped_data.get("revision_id"),
+        "section_hashes": quiz_data.get("section_hashes")
+    }
+
+
+def encode_history_cursor(created_at: datetime, quiz_id: int) -> str:
+    """
+    Opaque cursor pointing just past a history row
+    """
+    raw = f"{created_at.isoformat()}|{quiz_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Inverse of encode_history_cursor; raises ValueError on malformed input
+    """
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    created_at, quiz_id = raw.rsplit('|', 1)
+    return datetime.fromisoformat(created_at), int(quiz_id)
+
+
+class StoredQuiz:
+    """
+    Quiz record of the sqlite and memory stores, with the attributes of a
+    QuizRecord row
+    """
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class QuizStore:
+    """
+    Base class: the interface shared by the backends.
+
+    Records (and history rows) expose QuizRecord's attributes. save() is an
+    upsert on canonical_key: regenerating an article replaces its quiz but
+    keeps its id, URL and creation time.
+    """
+
+    backend = "none"
+
+    async def get(self, quiz_id: int):
+        raise NotImplementedError
+
+    async def find_by_key(self, canonical_key: str):
+        raise NotImplementedError
+
+    async def save(self, fields: Dict):
+        raise NotImplementedError
+
+    async def history(self, limit: int, before: Optional[Tuple[datetime, int]] = None) -> List:
+        """
+        Newest records first, with id, url, title, created_at and quiz_count
+
+        Args:
+            limit: Maximum number of rows
+            before: (created_at, id) of the last row of the previous page
+        """
+        raise NotImplementedError
+
+    async def delete(self, quiz_id: int) -> bool:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend}
+
+
+class SQLAlchemyQuizStore(QuizStore):
+    """
+    quiz_records table of the application database, through async sessions
+    (shared by all workers and both deployments with the same DATABASE_URL)
+    """
+
+    backend = "db"
+
+    def __init__(self, session_factory=None, model=None):
+        if session_factory is None or model is None:
+            from models import AsyncSessionLocal, QuizRecord
+            session_factory = session_factory or AsyncSessionLocal
+            model = model or QuizRecord
+        self.session_factory = session_factory
+        self.model = model
+
+    async def get(self, quiz_id):
+        async with self.session_factory() as db:
+            return await db.get(self.model, quiz_id)
+
+    async def find_by_key(self, canonical_key):
+        from sqlalchemy import select
+
+        async with self.session_factory() as db:
+            result = await db.execute(select(self.model).where(self.model.canonical_key == canonical_key))
+            return result.scalars().first()
+
+    async def _find_existing(self, db, fields, match_url: bool = False):
+        from sqlalchemy import select
+
+        record = (await db.execute(select(self.model).where(
+            self.model.canonical_key == fields["canonical_key"]
+        ))).scalars().first()
+        if record is None and match_url:
+            # Rows stored before canonical keys have the same URL and no key
+            record = (await db.execute(select(self.model).where(
+                self.model.url == fields["url"]
+            ))).scalars().first()
+        return record
+
+    @staticmethod
+    def _update(record, fields):
+        # Its URL may be an older spelling
+        for field, value in fields.items():
+            if field != "url":
+                setattr(record, field, value)
+
+    async def save(self, fields):
+        from sqlalchemy.exc import IntegrityError
+
+        async with self.session_factory() as db:
+            record = await self._find_existing(db, fields)
+            if record is not None:
+                self._update(record, fields)
+            else:
+                record = self.model(**fields)
+                db.add(record)
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Inserted by a concurrent request, or a legacy row holds the
+                # URL: update that row instead
+                await db.rollback()
+                record = await self._find_existing(db, fields, match_url=True)
+                if record is None:
+                    raise
+                self._update(record, fields)
+                await db.commit()
+            await db.refresh(record)
+            return record
+
+    async def history(self, limit, before=None):
+        from sqlalchemy import and_, or_, select
+
+        query = select(
+            self.model.id,
+            self.model.url,
+            self.model.title,
+            self.model.created_at,
+            self.model.quiz_count
+        )
+        if before:
+            created_at, quiz_id = before
+            query = query.where(or_(
+                self.model.created_at < created_at,
+                and_(self.model.created_at == created_at, self.model.id < quiz_id)
+            ))
+        async with self.session_factory() as db:
+            result = await db.execute(query.order_by(
+                self.model.created_at.desc(), self.model.id.desc()
+            ).limit(limit))
+            return result.all()
+
+    async def delete(self, quiz_id):
+        async with self.session_factory() as db:
+            record = await db.get(self.model, quiz_id)
+            if record is None:
+                return False
+            await db.delete(record)
+            await db.commit()
+            return True
+
+
+class SQLiteQuizStore(QuizStore):
+    """
+    Single-file SQLite store. Calls run on a worker thread; sqlite3 is
+    blocking.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: str = QUIZ_STORE_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS quiz_records ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, "
+                "canonical_key TEXT UNIQUE, title TEXT NOT NULL, summary TEXT, "
+                "key_entities TEXT, sections TEXT, quiz TEXT NOT NULL, "
+                "quiz_count INTEGER NOT NULL DEFAULT 0, related_topics TEXT, raw_html TEXT, "
+                "is_fallback INTEGER NOT NULL DEFAULT 0, revision_id INTEGER, "
+                "section_hashes TEXT, created_at TEXT NOT NULL)"
+            )
+            # Files created before revision tracking
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(quiz_records)")}
+            for column, ddl_type in (("revision_id", "INTEGER"), ("section_hashes", "TEXT")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE quiz_records ADD COLUMN {column} {ddl_type}")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_quiz_records_created_at_id "
+                "ON quiz_records (created_at, id)"
+            )
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _timestamp(value: datetime) -> str:
+        # Fixed width, so text order is time order
+        return value.isoformat(timespec="microseconds")
+
+    @staticmethod
+    def _record(row) -> Optional[StoredQuiz]:
+        if row is None:
+            return None
+        fields = dict(row)
+        for field in JSON_FIELDS & fields.keys():
+            fields[field] = json.loads(fields[field]) if fields[field] is not None else None
+        if "is_fallback" in fields:
+            fields["is_fallback"] = bool(fields["is_fallback"])
+        fields["created_at"] = datetime.fromisoformat(fields["created_at"])
+        return StoredQuiz(**fields)
+
+    def _query(self, sql: str, parameters=()) -> List:
+        with self._connect() as conn:
+            return conn.execute(sql, parameters).fetchall()
+
+    def _save(self, fields):
+        values = {
+            field: json.dumps(value) if field in JSON_FIELDS else value
+            for field, value in fields.items()
+        }
+        updates = ", ".join(f"{field} = excluded.{field}" for field in values if field != "url")
+        values["created_at"] = self._timestamp(datetime.utcnow())
+        with self._connect() as conn:
+            # One statement, so concurrent saves of an article cannot both insert
+            conn.execute(
+                f"INSERT INTO quiz_records ({', '.join(values)}) "
+                f"VALUES ({', '.join(':' + field for field in values)}) "
+                f"ON CONFLICT(canonical_key) DO UPDATE SET {updates}",
+                values
+            )
+            row = conn.execute(
+                "SELECT * FROM quiz_records WHERE canonical_key = ?", (fields["canonical_key"],)
+            ).fetchone()
+        return self._record(row)
+
+    def _delete(self, quiz_id):
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM quiz_records WHERE id = ?", (quiz_id,)).rowcount > 0
+
+    async def get(self, quiz_id):
+        rows = await asyncio.to_thread(self._query, "SELECT * FROM quiz_records WHERE id = ?", (quiz_id,))
+        return self._record(rows[0] if rows else None)
+
+    async def find_by_key(self, canonical_key):
+        rows = await asyncio.to_thread(
+            self._query, "SELECT * FROM quiz_records WHERE canonical_key = ?", (canonical_key,)
+        )
+        return self._record(rows[0] if rows else None)
+
+    async def save(self, fields):
+        return await asyncio.to_thread(self._save, fields)
+
+    async def history(self, limit, before=None):
+        sql = "SELECT id, url, title, created_at, quiz_count FROM quiz_records"
+        parameters = []
+        if before:
+            created_at, quiz_id = self._timestamp(before[0]), before[1]
+            sql += " WHERE created_at < ? OR (created_at = ? AND id < ?)"
+            parameters = [created_at, created_at, quiz_id]
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        rows = await asyncio.to_thread(self._query, sql, parameters + [limit])
+        return [self._record(row) for row in rows]
+
+    async def delete(self, quiz_id):
+        return await asyncio.to_thread(self._delete, quiz_id)
+
+
+class MemoryQuizStore(QuizStore):
+    """
+    Per-process store; beyond max_entries the oldest quizzes are dropped
+    """
+
+    backend = "memory"
+
+    def __init__(self, max_entries: int = QUIZ_STORE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._records: Dict[int, StoredQuiz] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    async def get(self, quiz_id):
+        with self._lock:
+            record = self._records.get(quiz_id)
+            return copy.deepcopy(record)
+
+    async def find_by_key(self, canonical_key):
+        with self._lock:
+            for record in self._records.values():
+                if record.canonical_key == canonical_key:
+                    return copy.deepcopy(record)
+        return None
+
+    async def save(self, fields):
+        with self._lock:
+            record = next(
+                (record for record in self._records.values()
+                 if record.canonical_key == fields["canonical_key"]),
+                None
+            )
+            if record is not None:
+                for field, value in copy.deepcopy(fields).items():
+                    if field != "url":
+                        setattr(record, field, value)
+            else:
+                record = StoredQuiz(id=next(self._ids), created_at=datetime.utcnow(),
+                                    **copy.deepcopy(fields))
+                self._records[record.id] = record
+                # Ids increase with creation time, so the lowest is the oldest
+                while len(self._records) > self.max_entries:
+                    del self._records[min(self._records)]
+            return copy.deepcopy(record)
+
+    async def history(self, limit, before=None):
+        with self._lock:
+            records = sorted(self._records.values(), key=lambda record: (record.created_at, record.id),
+                             reverse=True)
+        if before:
+            records = [record for record in records if (record.created_at, record.id) < before]
+        return [
+            StoredQuiz(id=record.id, url=record.url, title=record.title,
+                       created_at=record.created_at, quiz_count=record.quiz_count)
+            for record in records[:limit]
+        ]
+
+    async def delete(self, quiz_id):
+        with self._lock:
+            return self._records.pop(quiz_id, None) is not None
+
+
+def create_quiz_store(backend: str = QUIZ_STORE) -> QuizStore:
+    """
+    Build the configured quiz store (db when DATABASE_URL is set, else sqlite,
+    if QUIZ_STORE is not set)
+
+    A store chosen by QUIZ_STORE or DATABASE_URL that cannot be built raises,
+    so a misconfigured deployment fails at startup instead of keeping quizzes
+    in memory; only the default sqlite file falls back to memory.
+
+    Raises:
+        RuntimeError: The store cannot be built
+        ValueError: Unknown backend
+    """
+    explicit = bool(backend or os.getenv("DATABASE_URL"))
+    if not backend:
+        backend = "db" if os.getenv("DATABASE_URL") else "sqlite"
+    if backend == "db":
+        try:
+            return SQLAlchemyQuizStore()
+        except ImportError as e:
+            raise RuntimeError(
+                f"The db quiz store needs sqlalchemy and the database drivers (asyncpg, aiosqlite): {e}"
+            ) from e
+    if backend == "sqlite":
+        try:
+            return SQLiteQuizStore()
+        except (sqlite3.Error, OSError) as e:
+            if explicit:
+                raise RuntimeError(f"Could not open the sqlite quiz store at {QUIZ_STORE_PATH}: {e}") from e
+            print(f"Could not create sqlite quiz store, keeping quizzes in memory: {e}")
+            return MemoryQuizStore()
+    if backend == "memory":
+        return MemoryQuizStore()
+    raise ValueError(f"Unknown QUIZ_STORE {backend!r}: expected db, sqlite or memory")
@@ -0,0 +1,141 @@
+"""
+Revision-aware refresh of stored quizzes.
+
+A quiz is stored with the revision id of the article it was generated from
+and a hash of the text of each section, and every question records the
+section it is about. When the quiz is regenerated, the new scrape is
+compared with what the quiz was made from:
+
+- same revision (or identical section hashes): nothing changed, the quiz is
+  kept as is and the LLM is not called
+- otherwise questions about unchanged sections are kept, and only the
+  questions about changed or removed sections are replaced, from a prompt
+  holding just the changed sections
+
+LLM tokens spent on a refresh follow how much of the article changed.
+"""
+import hashlib
+import math
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+from content_selection import tokenize
+
+# Stored questions point at sections by title; the lead has none
+LEAD_SECTION = ""
+
+
+def section_key(section: Optional[str]) -> str:
+    return section or LEAD_SECTION
+
+
+def section_hashes(passages: List[Dict]) -> Dict[str, str]:
+    """
+    Hash of the text of each section, keyed by section title ("" for the lead)
+    """
+    texts = {}
+    for passage in passages:
+        texts.setdefault(section_key(passage["section"]), []).append(" ".join(passage["text"].split()))
+    return {
+        key: hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+        for key, parts in texts.items()
+    }
+
+
+def match_terms(text: str) -> Set[str]:
+    """
+    Content words and adjacent word pairs of a text
+    """
+    words = tokenize(text)
+    return set(words) | {f"{first} {second}" for first, second in zip(words, words[1:])}
+
+
+def attribute_questions(questions: List[Dict], passages: List[Dict]) -> List[Dict]:
+    """
+    Copies of the questions with a "section" field: the section (None for the
+    lead) whose words and word pairs, weighted by how specific they are to
+    it, best match the question, answer and explanation. Questions matching
+    no section get the lead.
+
+    Args:
+        questions: Quiz questions
+        passages: Section-tagged paragraphs the questions were generated from
+    """
+    section_terms = {}
+    for passage in passages:
+        key = section_key(passage["section"])
+        terms = section_terms.setdefault(key, match_terms(key))
+        terms.update(match_terms(passage["text"]))
+    document_frequency = Counter(term for terms in section_terms.values() for term in terms)
+    idf = {
+        term: math.log(1 + len(section_terms) / count)
+        for term, count in document_frequency.items()
+    }
+
+    attributed = []
+    for question in questions:
+        terms = match_terms(" ".join(
+            str(question.get(field, "")) for field in ("question", "answer", "explanation")
+        ))
+        best_key, best_score = LEAD_SECTION, 0.0
+        for key, candidates in section_terms.items():
+            score = sum(idf[term] for term in terms & candidates)
+            if score > best_score:
+                best_key, best_score = key, score
+        attributed.append(dict(question, section=best_key or None))
+    return attributed
+
+
+def plan_refresh(quiz: List[Dict], previous_revision: Optional[int],
+                 previous_hashes: Optional[Dict[str, str]], revision_id: Optional[int],
+                 hashes: Dict[str, str], passages: List[Dict]):
+    """
+    Work out which questions of a stored quiz survive a new revision
+
+    Args:
+        quiz: Stored questions
+        previous_revision: Revision the quiz was generated from (None if unknown)
+        previous_hashes: Its section hashes (None for quizzes stored before
+            they were recorded)
+        revision_id: Revision just scraped (None if unknown)
+        hashes: section_hashes of the new revision
+        passages: Section-tagged paragraphs of the new revision
+
+    Returns:
+        (questions to keep, keys of the sections to generate questions for),
+        or None if the quiz must be regenerated in full
+    """
+    # Questions stored without a section are attributed against the new text
+    quiz = with_sections(quiz, passages)
+    unchanged_revision = revision_id is not None and revision_id == previous_revision
+    if unchanged_revision or previous_hashes == hashes:
+        return quiz, set()
+    if not previous_hashes:
+        return None
+
+    changed: Set[str] = {key for key, digest in hashes.items() if previous_hashes.get(key) != digest}
+    kept = [
+        question for question in quiz
+        if section_key(question["section"]) in hashes and section_key(question["section"]) not in changed
+    ]
+    return kept, changed
+
+
+def with_sections(questions: List[Dict], passages: List[Dict]) -> List[Dict]:
+    """
+    The questions, those without a "section" field attributed to one
+    """
+    unattributed = iter(attribute_questions(
+        [question for question in questions if "section" not in question], passages
+    ))
+    return [question if "section" in question else next(unattributed) for question in questions]
+
+
+def order_by_section(questions: List[Dict], passages: List[Dict]) -> List[Dict]:
+    """
+    Questions in the order of their sections in the article (stable)
+    """
+    order = {}
+    for passage in passages:
+        order.setdefault(section_key(passage["section"]), len(order))
+    return sorted(questions, key=lambda question: order.get(section_key(question.get("section")), len(order)))
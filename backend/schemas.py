@@ -7,6 +7,8 @@ class QuizRequest(BaseModel):
     url: str = Field(..., description="Wikipedia article URL")
     force_regenerate: bool = Field(False, description="Force regenerate even if cached")
     store_raw_html: bool = Field(False, description="Store raw HTML in database")
+    async_job: bool = Field(False, description="Queue the generation and return a job id immediately")
+    preview: bool = Field(False, description="Return a quiz made locally without the LLM, at once")
 
 class QuizQuestion(BaseModel):
     """Model for a single quiz question"""
@@ -32,6 +34,7 @@ class QuizResponse(BaseModel):
     sections: List[str]
     quiz: List[Dict[str, Any]]
     related_topics: List[str]
+    is_fallback: bool = False
     created_at: datetime
     
     class Config:
@@ -47,3 +50,47 @@ class QuizHistoryResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+class JobResponse(BaseModel):
+    """Response model for a queued generation job"""
+    id: int
+    status: str
+    url: str
+    attempts: int
+    max_attempts: int
+    error: Optional[str] = None
+    quiz_id: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class BatchRequest(BaseModel):
+    """Request model for bulk quiz generation"""
+    items: List[str] = Field(..., min_length=1, description="Wikipedia article URLs or titles")
+    force_regenerate: bool = Field(False, description="Regenerate quizzes that are already stored")
+
+class BatchItemResponse(BaseModel):
+    """Status of one article in a batch"""
+    position: int
+    input: str
+    url: Optional[str] = None
+    status: str
+    quiz_id: Optional[int] = None
+    error: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+class BatchResponse(BaseModel):
+    """Response model for a bulk generation batch"""
+    id: int
+    status: str
+    total: int
+    counts: Dict[str, int]
+    items: List[BatchItemResponse]
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,186 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+# Scrape results are cached separately from quizzes so a forced regeneration
+# reruns only the LLM. Memory tier is bounded by size; the persistent tier
+# (scrape_cache table) expires entries after SCRAPE_CACHE_TTL seconds.
+SCRAPE_CACHE_MEMORY_BYTES = int(os.getenv("SCRAPE_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+SCRAPE_CACHE_TTL = int(os.getenv("SCRAPE_CACHE_TTL", str(6 * 60 * 60)))
+
+
+def payload_size(payload: Dict[str, Any]) -> int:
+    """
+    Approximate in-memory size of a scrape result: the length of its JSON
+    form, so nested values (passages, links) are counted too. Measured once,
+    when the entry is inserted.
+    """
+    return len(json.dumps(payload, ensure_ascii=False, default=str))
+
+
+class MemoryScrapeTier:
+    """
+    LRU of scrape results evicted by total payload size
+    """
+
+    def __init__(self, max_bytes: int = SCRAPE_CACHE_MEMORY_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, payload: Dict, fetched_at: datetime):
+        size = payload_size(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous:
+                self.current_bytes -= previous["size"]
+            self._entries[key] = {"payload": payload, "fetched_at": fetched_at, "size": size}
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted["size"]
+                self.evictions += 1
+
+    def discard(self, key: str):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry:
+                self.current_bytes -= entry["size"]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DatabaseScrapeTier:
+    """
+    Scrape results stored in the scrape_cache table, one row per revision
+    """
+
+    def __init__(self, session_factory, model):
+        self.session_factory = session_factory
+        self.model = model
+
+    def get(self, key: str) -> Optional[Dict]:
+        db = self.session_factory()
+        try:
+            entry = db.query(self.model).filter(
+                self.model.canonical_key == key
+            ).order_by(self.model.fetched_at.desc()).first()
+            if entry is None:
+                return None
+            return {"payload": entry.payload, "fetched_at": entry.fetched_at}
+        finally:
+            db.close()
+
+    def put(self, key: str, payload: Dict, fetched_at: datetime, ttl: int):
+        db = self.session_factory()
+        try:
+            db.merge(self.model(
+                canonical_key=key,
+                revision_id=payload.get("revision_id") or 0,
+                payload=payload,
+                fetched_at=fetched_at
+            ))
+            # Older revisions of this article past the TTL are no longer useful
+            db.query(self.model).filter(
+                self.model.canonical_key == key,
+                self.model.fetched_at < fetched_at - timedelta(seconds=ttl)
+            ).delete()
+            db.commit()
+        finally:
+            db.close()
+
+
+class ScrapeCache:
+    """
+    Two-tier cache of scrape_wikipedia results keyed by canonical article.
+
+    Reads check memory, then the persistent tier (promoting hits to memory);
+    entries older than the TTL count as misses. Blocking — call it from the
+    generation thread pool.
+    """
+
+    def __init__(self, memory: MemoryScrapeTier, persistent: Optional[DatabaseScrapeTier] = None,
+                 ttl: int = SCRAPE_CACHE_TTL):
+        self.memory = memory
+        self.persistent = persistent
+        self.ttl = ttl
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def _fresh(self, entry: Dict) -> bool:
+        return datetime.utcnow() - entry["fetched_at"] < timedelta(seconds=self.ttl)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Cached scrape result for an article, or None
+
+        Args:
+            key: Canonical article key
+
+        Returns:
+            The scrape_wikipedia result if cached and not expired
+        """
+        entry = self.memory.get(key)
+        if entry is not None:
+            if self._fresh(entry):
+                self.memory_hits += 1
+                return entry["payload"]
+            self.memory.discard(key)
+            self.expired += 1
+
+        if self.persistent is not None:
+            try:
+                entry = self.persistent.get(key)
+            except Exception as e:
+                print(f"Error reading scrape cache: {e}")
+                entry = None
+            if entry is not None:
+                if self._fresh(entry):
+                    self.persistent_hits += 1
+                    self.memory.put(key, entry["payload"], entry["fetched_at"])
+                    return entry["payload"]
+                self.expired += 1
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, payload: Dict):
+        """
+        Store a scrape result in both tiers
+        """
+        fetched_at = datetime.utcnow()
+        self.memory.put(key, payload, fetched_at)
+        if self.persistent is not None:
+            try:
+                self.persistent.put(key, payload, fetched_at, self.ttl)
+            except Exception as e:
+                print(f"Error writing scrape cache: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.memory.evictions,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.current_bytes
+        }
@@ -1,8 +1,27 @@
+import os
 import requests
-from bs4 import BeautifulSoup
 from typing import Dict, List, Optional
+from urllib.parse import urlsplit, unquote, quote, parse_qs
 import re
 
+from extractors import get_extractor
+from http_client import get_session, article_validators, WIKI_HTTP_TIMEOUT
+from metrics import stage, record_size, record_outcome
+from wiki_api import fetch_articles_via_api
+
+# Wikipedia host, optionally the mobile site (en.m.wikipedia.org)
+WIKIPEDIA_HOST_PATTERN = re.compile(r'^([a-z]{2,3})(?:\.m)?\.wikipedia\.org$')
+# Characters Wikipedia leaves unencoded in article paths
+TITLE_SAFE_CHARS = "_()',:;!*-./@$&+="
+
+REVISION_ID_PATTERN = re.compile(r'"wgRevisionId":\s*(\d+)')
+
+# Trailing sections with no article prose
+METADATA_SECTIONS = ['References', 'External links', 'See also', 'Notes', 'Bibliography']
+
+# Where article content comes from: html (rendered page) | api (MediaWiki API extracts)
+SCRAPER_BACKEND = os.getenv("SCRAPER_BACKEND", "html").lower()
+
 def scrape_wikipedia(url: str) -> Optional[Dict]:
     """
     Scrape content from a Wikipedia article
@@ -18,67 +37,166 @@ def scrape_wikipedia(url: str) -> Optional[Dict]:
         if not url.startswith("https://en.wikipedia.org/wiki/"):
             return None
         
-        # Send request
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
+        if SCRAPER_BACKEND == "api":
+            return scrape_wikipedia_batch([url])[url]
         
-        # Parse HTML
-        soup = BeautifulSoup(response.content, 'html.parser')
+        # Send request over the shared keep-alive session; known articles are
+        # revalidated so an unchanged page costs a 304 instead of a re-parse
+        key = canonical_article_key(url) or url
+        with stage("fetch"):
+            response = get_session().get(
+                url,
+                headers=article_validators.conditional_headers(key),
+                timeout=WIKI_HTTP_TIMEOUT
+            )
+            if response.status_code == 304:
+                cached = article_validators.get(key)
+                if cached:
+                    article_validators.record_not_modified()
+                    record_outcome("fetch", "not_modified")
+                    return cached["result"]
+                # Validators were evicted in the meantime; fetch the full page
+                response = get_session().get(url, timeout=WIKI_HTTP_TIMEOUT)
+            response.raise_for_status()
+        record_outcome("fetch", "ok")
+        record_size("fetch", "bytes", len(response.content))
         
-        # Extract title
-        title_element = soup.find('h1', {'id': 'firstHeading'})
-        title = title_element.text.strip() if title_element else "Unknown Title"
-        
-        # Extract main content
-        content_div = soup.find('div', {'id': 'mw-content-text'})
-        if not content_div:
+        # Parse HTML
+        with stage("parse"):
+            result = parse_article_html(response.text, response.url or url)
+        if not result:
+            record_outcome("parse", "empty")
             return None
+        record_outcome("parse", "ok")
+        record_size("parse", "chars", len(result["content"]))
         
-        # Remove unwanted elements
-        for element in content_div.find_all(['table', 'sup', 'span', 'div'], 
-                                           class_=['infobox', 'reference', 'reflist', 'navbox']):
-            element.decompose()
-        
-        # Extract paragraphs
-        paragraphs = content_div.find_all('p')
-        content_text = '\n\n'.join([p.get_text().strip() for p in paragraphs if p.get_text().strip()])
-        
-        # Extract sections
-        sections = []
-        for heading in soup.find_all(['h2', 'h3']):
-            headline = heading.find('span', {'class': 'mw-headline'})
-            if headline:
-                section_title = headline.get_text().strip()
-                # Skip common metadata sections
-                if section_title not in ['References', 'External links', 'See also', 'Notes', 'Bibliography']:
-                    sections.append(section_title)
-        
-        # Extract first few paragraphs as summary
-        summary_paragraphs = [p.get_text().strip() for p in paragraphs[:3] if p.get_text().strip()]
-        summary = ' '.join(summary_paragraphs)[:500] + '...' if summary_paragraphs else ""
-        
-        # Clean content
-        content_text = re.sub(r'\[\d+\]', '', content_text)  # Remove citation numbers
-        content_text = re.sub(r'\s+', ' ', content_text)  # Normalize whitespace
-        
-        return {
-            "title": title,
-            "content": content_text[:15000],  # Limit content length for LLM
-            "sections": sections[:15],  # Limit sections
-            "summary": summary,
-            "raw_html": str(soup)[:50000]  # Store limited raw HTML
-        }
+        article_validators.store(key, response, result)
+        return result
         
     except requests.RequestException as e:
+        record_outcome("fetch", "error")
         print(f"Error fetching URL: {e}")
         return None
     except Exception as e:
         print(f"Error scraping Wikipedia: {e}")
         return None
 
+def scrape_wikipedia_batch(urls: List[str]) -> Dict[str, Optional[Dict]]:
+    """
+    Scrape several articles
+    
+    With SCRAPER_BACKEND=api the titles go to the MediaWiki API in one query
+    (still one request per article, see wiki_api); the html backend fetches
+    the pages one by one.
+    
+    Args:
+        urls: Wikipedia article URLs
+        
+    Returns:
+        Dictionary mapping each URL to its scraped data (None if failed)
+    """
+    if SCRAPER_BACKEND != "api":
+        return {url: scrape_wikipedia(url) for url in urls}
+    
+    results: Dict[str, Optional[Dict]] = {url: None for url in urls}
+    valid_urls = [url for url in urls if url.startswith("https://en.wikipedia.org/wiki/")]
+    titles = [extract_article_title_from_url(url) for url in valid_urls]
+    try:
+        articles = fetch_articles_via_api(titles, lang="en")
+    except requests.RequestException as e:
+        record_outcome("fetch", "error")
+        print(f"Error fetching from the Wikipedia API: {e}")
+        return results
+    except Exception as e:
+        print(f"Error reading the Wikipedia API response: {e}")
+        return results
+    
+    for url, article in zip(valid_urls, articles):
+        if article:
+            with stage("parse"):
+                results[url] = build_scrape_result(article, url)
+            record_size("parse", "chars", len(results[url]["content"]))
+    return results
+
+def parse_article_html(html: str, url: str, engine: str = None) -> Optional[Dict]:
+    """
+    Turn an article page into the scrape_wikipedia result
+    
+    Args:
+        html: Article page HTML
+        url: URL the page was fetched from
+        engine: Extraction engine name (defaults to SCRAPER_ENGINE)
+        
+    Returns:
+        Dictionary containing scraped data or None if the page has no body
+    """
+    extracted = get_extractor(engine)(html)
+    if not extracted:
+        return None
+    
+    # Revision id from the page's JS config ("wgRevisionId":123456)
+    revision_match = REVISION_ID_PATTERN.search(html)
+    extracted["revision_id"] = int(revision_match.group(1)) if revision_match else None
+    
+    return build_scrape_result(extracted, url)
+
+def clean_text(text: str) -> str:
+    """
+    Remove citation markers and normalize whitespace
+    """
+    text = re.sub(r'\[\d+\]', '', text)  # Remove citation numbers
+    return re.sub(r'\s+', ' ', text).strip()  # Normalize whitespace
+
+def build_scrape_result(extracted: Dict, url: str) -> Dict:
+    """
+    Build the scrape_wikipedia result from extracted paragraphs and headings
+    
+    Args:
+        extracted: Output of an extractor or of fetch_articles_via_api
+        url: URL the article was requested with
+        
+    Returns:
+        Dictionary containing scraped data
+    """
+    title = extracted["title"] or "Unknown Title"
+    
+    # Canonical link points at the redirect target (e.g. Turing -> Alan_Turing)
+    canonical_url = canonicalize_wikipedia_url(extracted["canonical_href"] or "")
+    
+    # Extract paragraphs
+    paragraphs = extracted["paragraphs"]
+    content_text = '\n\n'.join([text for text in paragraphs if text])
+    
+    # Extract sections, skipping common metadata sections
+    sections = [
+        heading for heading in extracted["headings"]
+        if heading not in METADATA_SECTIONS
+    ]
+    
+    # Paragraphs tagged with their section, for prompt content selection
+    passages = []
+    paragraph_sections = extracted.get("paragraph_sections") or [None] * len(paragraphs)
+    for text, section in zip(paragraphs, paragraph_sections):
+        text = clean_text(text)
+        if text and section not in METADATA_SECTIONS:
+            passages.append({"section": section, "text": text})
+    
+    # Extract first few paragraphs as summary
+    summary_paragraphs = [text for text in paragraphs[:3] if text]
+    summary = ' '.join(summary_paragraphs)[:500] + '...' if summary_paragraphs else ""
+    
+    return {
+        "title": title,
+        "canonical_url": canonical_url or canonicalize_wikipedia_url(url) or url,
+        "content": clean_text(content_text),  # Selected down to the prompt budget by the generator
+        "passages": passages,
+        "sections": sections[:15],  # Limit sections
+        "summary": summary,
+        "raw_html": extracted["raw_html"],  # Store limited raw HTML
+        "revision_id": extracted.get("revision_id"),
+        "links": extracted.get("links") or []  # Article links in the text, for entity extraction
+    }
+
 def validate_wikipedia_url(url: str) -> bool:
     """
     Validate if the URL is a valid Wikipedia article URL
@@ -106,6 +224,74 @@ def extract_article_title_from_url(url: str) -> str:
         # Extract title from URL
         title = url.split('/wiki/')[-1]
         # Replace underscores with spaces and decode URL encoding
-        title = title.replace('_', ' ')
+        title = unquote(title.split('#')[0].split('?')[0]).replace('_', ' ')
         return title
     return ""
+
+def normalize_article_title(title: str) -> str:
+    """
+    Normalize an article title the way MediaWiki does for page names
+    
+    Args:
+        title: Raw title from a URL path or query (may be percent-encoded)
+        
+    Returns:
+        Title with underscores for spaces and an upper-case first letter
+    """
+    title = unquote(title).strip().replace(' ', '_')
+    title = re.sub(r'_+', '_', title).strip('_')
+    return title[:1].upper() + title[1:]
+
+def canonicalize_wikipedia_url(url: str) -> Optional[str]:
+    """
+    Reduce the many spellings of an article URL to one canonical URL
+    
+    Handles percent-encoding, spaces vs underscores, fragments and query
+    strings, http vs https, the mobile host and /w/index.php?title= links.
+    Redirects can only be resolved from the fetched page (see the
+    canonical_url returned by scrape_wikipedia).
+    
+    Args:
+        url: Wikipedia article URL
+        
+    Returns:
+        https://<lang>.wikipedia.org/wiki/<Title> or None if not an article URL
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return None
+    
+    match = WIKIPEDIA_HOST_PATTERN.match((parts.hostname or "").lower())
+    if parts.scheme not in ("http", "https") or not match:
+        return None
+    
+    if parts.path.startswith('/wiki/'):
+        raw_title = parts.path[len('/wiki/'):]
+    elif parts.path == '/w/index.php':
+        raw_title = parse_qs(parts.query).get('title', [''])[0]
+    else:
+        return None
+    
+    title = normalize_article_title(raw_title)
+    if not title:
+        return None
+    
+    return f"https://{match.group(1)}.wikipedia.org/wiki/{quote(title, safe=TITLE_SAFE_CHARS)}"
+
+def canonical_article_key(url: str) -> Optional[str]:
+    """
+    Cache key for an article: language code and normalized title
+    
+    Args:
+        url: Wikipedia article URL
+        
+    Returns:
+        Key such as "en:Alan_Turing", or None if not an article URL
+    """
+    canonical_url = canonicalize_wikipedia_url(url)
+    if not canonical_url:
+        return None
+    lang = urlsplit(canonical_url).hostname.split('.')[0]
+    title = unquote(canonical_url.split('/wiki/', 1)[1])
+    return f"{lang}:{title}"
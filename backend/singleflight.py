@@ -0,0 +1,159 @@
+import asyncio
+import os
+import socket
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict
+
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into a single execution.
+
+    The first caller for a key (the leader) runs the work; callers that arrive
+    while it is in flight (followers) await the leader's result instead of
+    repeating the scrape and LLM call.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run func for key, or wait for the in-flight run of the same key
+
+        Args:
+            key: Deduplication key (canonical article)
+            func: Coroutine function producing the result
+
+        Returns:
+            The leader's result (exceptions are propagated to every caller)
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.leaders += 1
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark as retrieved so an unobserved failure isn't logged twice
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": self.in_flight()
+        }
+
+
+class NullGenerationLock:
+    """
+    Cross-process lock that never blocks (single-worker deployments)
+    """
+
+    @asynccontextmanager
+    async def hold(self, key: str):
+        yield
+
+    def stats(self) -> Dict[str, int]:
+        return {"backend": "none", "waits": 0, "takeovers": 0, "timeouts": 0}
+
+
+class DatabaseGenerationLock:
+    """
+    Cross-process lock backed by a lock row per article.
+
+    Acquiring inserts a row keyed by the article; the unique primary key makes
+    the insert fail while another worker holds it, in which case we poll until
+    the row disappears. Rows older than stale_after seconds are assumed to
+    belong to a crashed worker and are taken over. Uses an async session
+    factory so waiting never blocks the event loop.
+    """
+
+    def __init__(self, session_factory, model, stale_after: float = 300,
+                 poll_interval: float = 0.5, wait_timeout: float = 120):
+        self.session_factory = session_factory
+        self.model = model
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+        self.wait_timeout = wait_timeout
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.waits = 0
+        self.takeovers = 0
+        self.timeouts = 0
+
+    async def _try_acquire(self, key: str) -> bool:
+        async with self.session_factory() as db:
+            try:
+                db.add(self.model(key=key, owner=self.owner, acquired_at=datetime.utcnow()))
+                await db.commit()
+                return True
+            except IntegrityError:
+                await db.rollback()
+                cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+                result = await db.execute(delete(self.model).where(
+                    self.model.key == key,
+                    self.model.acquired_at < cutoff
+                ))
+                await db.commit()
+                if result.rowcount:
+                    self.takeovers += 1
+                return False
+
+    async def _release(self, key: str):
+        async with self.session_factory() as db:
+            await db.execute(delete(self.model).where(
+                self.model.key == key,
+                self.model.owner == self.owner
+            ))
+            await db.commit()
+
+    @asynccontextmanager
+    async def hold(self, key: str):
+        """
+        Hold the lock for key; gives up waiting after wait_timeout seconds
+        and runs unlocked (counted in timeouts), so another worker may be
+        generating the same article
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_timeout
+        acquired = await self._try_acquire(key)
+        if not acquired:
+            self.waits += 1
+        while not acquired and loop.time() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            acquired = await self._try_acquire(key)
+        if not acquired:
+            self.timeouts += 1
+            print(f"Generation lock for {key} not acquired after {self.wait_timeout}s, continuing without it")
+        try:
+            yield
+        finally:
+            if acquired:
+                await self._release(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "db", "waits": self.waits, "takeovers": self.takeovers, "timeouts": self.timeouts}
@@ -0,0 +1,69 @@
+"""
+Shared setup: the backend modules and the benchmark helpers (fake LLM,
+Wikipedia stand-in server) are imported by name, as the benchmarks do.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'benchmarks'))
+os.environ.setdefault("GOOGLE_API_KEY", "offline-tests")
+# Never the development database (wiki_quiz.db) or one from .env
+TEST_DATABASE_DIR = tempfile.mkdtemp(prefix="wiki-quiz-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DATABASE_DIR, 'test.db')}"
+
+import pytest
+
+import http_client
+import quiz_generator
+import scraper
+from fake_llm import FakeQuizLLM
+from llm_cache import MemoryLLMCache
+from llm_limiter import AdaptiveConcurrencyLimit, LLMRateLimiter
+from wiki_stub_server import WikiStubServer
+
+
+@pytest.fixture
+def wiki_stub(monkeypatch):
+    """
+    Stand-in Wikipedia server behind a fresh shared session and validator cache
+    """
+    validators = http_client.ValidatorCache()
+    monkeypatch.setattr(http_client, "_session", None)
+    monkeypatch.setattr(http_client, "article_validators", validators)
+    monkeypatch.setattr(scraper, "article_validators", validators)
+    with WikiStubServer() as server:
+        server.install(http_client.get_session())
+        yield server
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """
+    FakeQuizLLM in place of Gemini, with no delay, request budget or cached
+    responses
+    """
+    llm = FakeQuizLLM(input_rate=float("inf"), output_rate=float("inf"))
+    monkeypatch.setattr(quiz_generator, "llm", llm)
+    monkeypatch.setattr(quiz_generator, "llm_cache", MemoryLLMCache())
+    monkeypatch.setattr(quiz_generator, "llm_limiter", LLMRateLimiter(
+        rpm=0, tpm=0, concurrency=AdaptiveConcurrencyLimit(minimum=4, maximum=4)
+    ))
+    return llm
+
+
+@pytest.fixture
+def database():
+    """
+    Empty, migrated test database; yields the models module
+    """
+    import models
+    from migrations import migrate_database
+    models.Base.metadata.drop_all(bind=models.engine)
+    migrate_database(models.engine, models.Base.metadata)
+    yield models
+    # Pooled async connections belong to the test's event loop
+    asyncio.run(models.async_engine.dispose(close=False))
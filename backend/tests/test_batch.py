@@ -0,0 +1,141 @@
+"""
+Bulk generation: batches are resumable after an interruption or an LLM outage
+"""
+import asyncio
+
+import pytest
+
+from batch import BATCH_COMPLETED, BATCH_INCOMPLETE, BATCH_RUNNING, BatchRunner
+from pipeline import QuizPipeline
+from quiz_store import MemoryQuizStore, quiz_record_fields
+from scraper import canonical_article_key, parse_article_html
+from wiki_stub_server import build_article_html
+
+TITLES = ["Ada Lovelace", "Alan Turing", "Grace Hopper", "John von Neumann", "Claude Shannon"]
+
+
+class Articles:
+    """
+    Batch stages over generated articles: scrape_many and a generate that
+    wraps the quiz pipeline and can hang or fall back on chosen articles
+    """
+
+    def __init__(self):
+        self.scraped = []
+        self.generated = []
+        self.hang = set()
+        self.fallback = set()
+        self.pipeline = QuizPipeline(MemoryQuizStore())
+
+    async def scrape_many(self, targets, refresh=False):
+        results = {}
+        for key, url in targets:
+            self.scraped.append(key)
+            title = key.split(":", 1)[1].replace("_", " ")
+            results[key] = parse_article_html(build_article_html(title, sections=3), url)
+        return results
+
+    async def generate(self, scraped, force_regenerate):
+        title = scraped["title"]
+        if title in self.hang:
+            # The process dies while this article is generated
+            await asyncio.Event().wait()
+        self.generated.append(title)
+        quiz_data = await self.pipeline.generate(scraped, use_cache=not force_regenerate)
+        if title in self.fallback:
+            return dict(quiz_data, is_fallback=True)
+        return quiz_data
+
+
+@pytest.fixture
+def articles(fake_llm):
+    return Articles()
+
+
+@pytest.fixture
+def runner(database, articles):
+    return BatchRunner(
+        database.AsyncSessionLocal, database.QuizBatch, database.QuizBatchItem, database.QuizRecord,
+        scrape_many=articles.scrape_many,
+        generate=articles.generate,
+        record_fields=quiz_record_fields,
+        scrape_rate=0,
+        llm_concurrency=1,
+        write_size=1
+    )
+
+
+def statuses(runner, batch_id):
+    batch, items, counts = asyncio.run(runner.get(batch_id))
+    return batch.status, {item.input: item.status for item in items}, counts
+
+
+def quiz_rows(database):
+    with database.SessionLocal() as db:
+        return sorted(row.canonical_key for row in db.query(database.QuizRecord).all())
+
+
+def test_resume_after_interruption(runner, articles, database):
+    articles.hang = {"Grace Hopper"}
+
+    async def interrupted():
+        batch = await runner.create(TITLES)
+        task = asyncio.create_task(runner.run(batch.id))
+        # Kill the run once the articles before the hanging one are written
+        while (await runner.get(batch.id))[2]["succeeded"] < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return batch.id
+
+    batch_id = asyncio.run(interrupted())
+    status, items, counts = statuses(runner, batch_id)
+    assert status == BATCH_RUNNING
+    assert items["Ada Lovelace"] == items["Alan Turing"] == "succeeded"
+    assert counts["pending"] == 3
+
+    articles.hang = set()
+    articles.generated = []
+    asyncio.run(runner.run(batch_id))
+    status, items, counts = statuses(runner, batch_id)
+    assert status == BATCH_COMPLETED
+    assert set(items.values()) == {"succeeded"}
+    # Finished articles are not generated again
+    assert articles.generated == ["Grace Hopper", "John von Neumann", "Claude Shannon"]
+    assert quiz_rows(database) == sorted(canonical_article_key(
+        f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}") for title in TITLES)
+
+
+def test_llm_outage_leaves_articles_pending(runner, articles, database):
+    articles.fallback = {"Alan Turing"}
+    batch = asyncio.run(runner.create(TITLES[:3]))
+    asyncio.run(runner.run(batch.id))
+    status, items, _ = statuses(runner, batch.id)
+    assert status == BATCH_INCOMPLETE
+    assert items == {"Ada Lovelace": "succeeded", "Alan Turing": "pending", "Grace Hopper": "succeeded"}
+    assert "en:Alan_Turing" not in quiz_rows(database)
+
+    articles.fallback = set()
+    articles.generated = []
+    asyncio.run(runner.run(batch.id))
+    status, items, _ = statuses(runner, batch.id)
+    assert status == BATCH_COMPLETED
+    assert articles.generated == ["Alan Turing"]
+    assert "en:Alan_Turing" in quiz_rows(database)
+
+
+def test_stored_quizzes_and_duplicates_are_not_regenerated(runner, articles, database):
+    first = asyncio.run(runner.create(["Ada Lovelace"]))
+    asyncio.run(runner.run(first.id))
+    articles.generated = []
+
+    inputs = ["https://en.m.wikipedia.org/wiki/Ada_Lovelace", "Grace Hopper",
+              "https://en.wikipedia.org/wiki/Grace_Hopper#Career", "not a url://"]
+    batch = asyncio.run(runner.create(inputs))
+    asyncio.run(runner.run(batch.id))
+    status, items, _ = statuses(runner, batch.id)
+    assert status == BATCH_COMPLETED
+    assert [items[value] for value in inputs] == ["cached", "succeeded", "succeeded", "failed"]
+    assert articles.generated == ["Grace Hopper"]
+    assert quiz_rows(database) == ["en:Ada_Lovelace", "en:Grace_Hopper"]
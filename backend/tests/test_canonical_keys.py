@@ -0,0 +1,68 @@
+"""
+Every spelling of an article URL must map to one cache key
+"""
+import asyncio
+
+import pytest
+
+from pipeline import QuizPipeline
+from quiz_store import MemoryQuizStore
+from scraper import canonical_article_key, canonicalize_wikipedia_url
+
+CANONICAL_URL = "https://en.wikipedia.org/wiki/Alan_Turing"
+
+
+@pytest.mark.parametrize("url", [
+    "https://en.wikipedia.org/wiki/Alan_Turing",
+    "https://en.m.wikipedia.org/wiki/Alan_Turing",
+    "https://en.wikipedia.org/wiki/Alan%20Turing",
+    "https://en.wikipedia.org/wiki/Alan%5FTuring",
+    "https://en.wikipedia.org/wiki/Alan_Turing#Early_life",
+    "https://en.m.wikipedia.org/wiki/Alan%20Turing#Early_life",
+    "https://en.wikipedia.org/wiki/Alan_Turing?oldformat=true",
+    "http://en.wikipedia.org/wiki/Alan_Turing",
+    "https://en.wikipedia.org/wiki/alan_Turing",
+    "https://en.wikipedia.org/w/index.php?title=Alan_Turing",
+    "  https://EN.wikipedia.org/wiki/Alan__Turing_ ",
+])
+def test_spellings_share_one_key(url):
+    assert canonicalize_wikipedia_url(url) == CANONICAL_URL
+    assert canonical_article_key(url) == "en:Alan_Turing"
+
+
+def test_non_ascii_titles_round_trip():
+    encoded = "https://de.wikipedia.org/wiki/K%C3%B6nigsberg"
+    assert canonicalize_wikipedia_url("https://de.m.wikipedia.org/wiki/Königsberg#Geschichte") == encoded
+    assert canonical_article_key(encoded) == "de:Königsberg"
+
+
+def test_reserved_characters_stay_distinct():
+    # An encoded question mark belongs to the title, a bare one starts the query
+    assert canonical_article_key("https://en.wikipedia.org/wiki/What%3F") == "en:What?"
+    assert canonical_article_key("https://en.wikipedia.org/wiki/What?x=1") == "en:What"
+
+
+@pytest.mark.parametrize("url", [
+    "https://example.com/wiki/Alan_Turing",
+    "https://en.wikipedia.org/w/index.php?search=Turing",
+    "https://en.wikipedia.org/wiki/",
+    "ftp://en.wikipedia.org/wiki/Alan_Turing",
+])
+def test_non_article_urls_have_no_key(url):
+    assert canonical_article_key(url) is None
+
+
+def test_spellings_share_one_stored_quiz(wiki_stub, fake_llm):
+    quiz_pipeline = QuizPipeline(MemoryQuizStore())
+    records = [
+        asyncio.run(quiz_pipeline.run(url, canonical_article_key(url)))
+        for url in (
+            "https://en.m.wikipedia.org/wiki/Alan%20Turing",
+            "https://en.wikipedia.org/wiki/Alan_Turing#Early_life",
+            "http://en.wikipedia.org/wiki/alan_Turing?action=view",
+        )
+    ]
+    assert {record.id for record in records} == {records[0].id}
+    assert records[0].canonical_key == "en:Alan_Turing"
+    assert fake_llm.calls == 1
+    assert wiki_stub.requests == 1
@@ -0,0 +1,121 @@
+"""
+Keyset pagination of the quiz history (GET /api/history)
+"""
+import asyncio
+import base64
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from quiz_store import MemoryQuizStore, SQLiteQuizStore, decode_history_cursor, encode_history_cursor
+
+CREATED_AT = datetime(2024, 5, 1, 12, 0, 0, 123456)
+
+
+def quiz_fields(index):
+    return {
+        "url": f"https://en.wikipedia.org/wiki/Article_{index}",
+        "canonical_key": f"en:Article_{index}",
+        "title": f"Article {index}",
+        "quiz": [{"question": "Q?"}] * index,
+        "quiz_count": index
+    }
+
+
+@pytest.fixture
+def client(database):
+    """
+    API client over quiz records 1-7: 2-6 share one created_at, 1 is older
+    and 7 newer
+    """
+    import main
+    with database.SessionLocal() as db:
+        for index in range(1, 8):
+            created_at = CREATED_AT + timedelta(seconds=(index > 6) - (index < 2))
+            db.add(database.QuizRecord(created_at=created_at, **quiz_fields(index)))
+        db.commit()
+    return TestClient(main.app)
+
+
+def read_all(client, limit):
+    """
+    Follow X-Next-Cursor to the last page
+
+    Returns:
+        (ids in page order, page sizes)
+    """
+    ids, sizes, cursor = [], [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/history", params=params)
+        assert response.status_code == 200
+        ids += [row["id"] for row in response.json()]
+        sizes.append(len(response.json()))
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return ids, sizes
+
+
+def test_cursor_round_trip():
+    cursor = encode_history_cursor(CREATED_AT, 42)
+    assert decode_history_cursor(cursor) == (CREATED_AT, 42)
+    # Safe in a query string
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_=")
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7, 50])
+def test_pages_cover_ties_once(client, limit):
+    ids, sizes = read_all(client, limit)
+    # Newest first, ties on created_at by id
+    assert ids == [7, 6, 5, 4, 3, 2, 1]
+    assert all(size == limit for size in sizes[:-1])
+
+
+def test_no_cursor_on_exactly_full_last_page(client):
+    first = client.get("/api/history", params={"limit": 5})
+    assert first.headers.get("X-Next-Cursor")
+    last = client.get("/api/history", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+    assert [row["id"] for row in last.json()] == [2, 1]
+    assert "X-Next-Cursor" not in last.headers
+
+
+def test_rows_are_a_projection(client):
+    row = client.get("/api/history", params={"limit": 1}).json()[0]
+    assert row == {
+        "id": 7, "url": quiz_fields(7)["url"], "title": "Article 7",
+        "created_at": (CREATED_AT + timedelta(seconds=1)).isoformat(), "quiz_count": 7
+    }
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", base64.urlsafe_b64encode(b"no separator").decode(),
+                                    base64.urlsafe_b64encode(b"yesterday|3").decode()])
+def test_invalid_cursor(client, cursor):
+    response = client.get("/api/history", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_other_stores_break_ties_by_id(backend, tmp_path):
+    store = MemoryQuizStore() if backend == "memory" else SQLiteQuizStore(str(tmp_path / "quiz.db"))
+
+    async def run():
+        for index in range(1, 6):
+            await store.save(quiz_fields(index))
+        # Every record created in the same instant
+        if backend == "memory":
+            for record in store._records.values():
+                record.created_at = CREATED_AT
+        else:
+            with store._connect() as conn:
+                conn.execute("UPDATE quiz_records SET created_at = ?", (store._timestamp(CREATED_AT),))
+        ids, before = [], None
+        while True:
+            rows = await store.history(2, before)
+            if not rows:
+                return ids
+            ids += [row.id for row in rows]
+            before = (rows[-1].created_at, rows[-1].id)
+
+    assert asyncio.run(run()) == [5, 4, 3, 2, 1]
@@ -0,0 +1,49 @@
+"""
+Fetching through the shared session, against the stand-in Wikipedia server
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import http_client
+from http_client import ValidatorCache
+from scraper import scrape_wikipedia, scrape_wikipedia_batch
+
+URL = "https://en.wikipedia.org/wiki/Alan_Turing"
+
+
+def test_scrape_through_stub(wiki_stub):
+    result = scrape_wikipedia(URL)
+    assert result["title"] == "Alan Turing"
+    assert result["canonical_url"] == URL
+    assert result["sections"]
+    assert result["revision_id"]
+
+
+def test_unchanged_article_is_revalidated(wiki_stub):
+    first = scrape_wikipedia(URL)
+    second = scrape_wikipedia(URL)
+    assert wiki_stub.requests == 2
+    assert wiki_stub.not_modified == 1
+    assert http_client.article_validators.stats()["not_modified"] == 1
+    # The 304 has no body; the previous parse is returned
+    assert second is first
+
+
+def test_connection_is_kept_alive(wiki_stub):
+    urls = [f"https://en.wikipedia.org/wiki/Article_{index}" for index in range(5)]
+    results = scrape_wikipedia_batch(urls)
+    assert all(results[url] for url in urls)
+    assert wiki_stub.requests == 5
+    assert wiki_stub.connections == 1
+
+
+def test_non_wikipedia_url_is_not_fetched(wiki_stub):
+    assert scrape_wikipedia("https://example.com/wiki/Alan_Turing") is None
+    assert wiki_stub.requests == 0
+
+
+def test_not_modified_count_is_thread_safe():
+    validators = ValidatorCache()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for _ in range(8):
+            pool.submit(lambda: [validators.record_not_modified() for _ in range(10000)])
+    assert validators.stats()["not_modified"] == 80000
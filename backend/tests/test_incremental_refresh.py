@@ -0,0 +1,137 @@
+"""
+Regenerating a stored quiz after an article edit (force_regenerate)
+"""
+import asyncio
+
+import pytest
+
+import pipeline
+import quiz_generator
+from bench_incremental_refresh import edit_article
+from fake_llm import FakeQuizLLM
+from quiz_store import MemoryQuizStore
+from scraper import canonical_article_key, parse_article_html
+from wiki_stub_server import build_article_html
+
+URL = "https://en.wikipedia.org/wiki/Refresh_article"
+KEY = canonical_article_key(URL)
+
+
+class FailingQuizLLM(FakeQuizLLM):
+    """
+    FakeQuizLLM whose every call fails, as when the provider is down
+    """
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        raise RuntimeError("503 Service Unavailable")
+
+
+class Article:
+    """
+    Scrape callable serving the current revision of one article
+    """
+
+    def __init__(self, scraped):
+        self.scraped = scraped
+        self.refreshes = []
+
+    def __call__(self, key, url, refresh=False):
+        self.refreshes.append(refresh)
+        return self.scraped
+
+
+@pytest.fixture
+def article():
+    return Article(parse_article_html(build_article_html("Refresh article", sections=6), URL))
+
+
+@pytest.fixture
+def stored(fake_llm, article):
+    """
+    Pipeline with a final quiz stored for the article
+    """
+    quiz_pipeline = pipeline.QuizPipeline(MemoryQuizStore(), scrape=article)
+    record = asyncio.run(quiz_pipeline.run(URL, KEY))
+    assert not record.is_fallback
+    return quiz_pipeline, record
+
+
+def use_llm(monkeypatch, llm):
+    monkeypatch.setattr(quiz_generator, "llm", llm)
+    return llm
+
+
+def questions(record):
+    return [question["question"] for question in record.quiz]
+
+
+def test_stored_quiz_is_reused_without_scraping(stored, article, fake_llm):
+    quiz_pipeline, record = stored
+    again = asyncio.run(quiz_pipeline.run(URL, KEY))
+    assert again.id == record.id
+    assert article.refreshes == [False]
+    assert fake_llm.calls == 1
+
+
+def test_regeneration_revalidates_the_article(stored, article):
+    quiz_pipeline, _ = stored
+    asyncio.run(quiz_pipeline.run(URL, KEY, force_regenerate=True))
+    assert article.refreshes == [False, True]
+
+
+def test_unchanged_revision_makes_no_llm_call(stored, monkeypatch):
+    quiz_pipeline, record = stored
+    llm = use_llm(monkeypatch, FakeQuizLLM(input_rate=float("inf"), output_rate=float("inf")))
+    refreshed = asyncio.run(quiz_pipeline.run(URL, KEY, force_regenerate=True))
+    assert llm.calls == 0
+    assert questions(refreshed) == questions(record)
+
+
+def test_changed_section_regenerates_only_its_questions(stored, article, fake_llm, monkeypatch):
+    quiz_pipeline, record = stored
+    article.scraped, changed, _ = edit_article(article.scraped, "one")
+    assert changed == 1
+    edited_section = next(
+        passage["section"] for passage in article.scraped["passages"] if passage["text"].startswith("Revised ")
+    )
+    stale = [question["question"] for question in record.quiz if question["section"] == edited_section]
+    assert stale
+
+    llm = use_llm(monkeypatch, FakeQuizLLM(input_rate=float("inf"), output_rate=float("inf")))
+    refreshed = asyncio.run(quiz_pipeline.run(URL, KEY, force_regenerate=True))
+    assert llm.calls == 1
+    assert refreshed.revision_id == article.scraped["revision_id"]
+    assert len(refreshed.quiz) == len(record.quiz)
+    kept = set(questions(record)) - set(stale)
+    assert kept <= set(questions(refreshed))
+    assert not set(stale) & set(questions(refreshed))
+    # Only the edited section was sent to the LLM
+    assert llm.prompt_tokens < fake_llm.prompt_tokens / 2
+    assert {question["section"] for question in refreshed.quiz if question["question"] not in kept} \
+        == {edited_section}
+
+
+def test_llm_failure_keeps_the_stored_quiz(stored, article, monkeypatch):
+    quiz_pipeline, record = stored
+    article.scraped, _, _ = edit_article(article.scraped, "one")
+    llm = use_llm(monkeypatch, FailingQuizLLM())
+    with pytest.raises(pipeline.RegenerationFailed) as failure:
+        asyncio.run(quiz_pipeline.run(URL, KEY, force_regenerate=True))
+    # Both the section call and the full-article retry failed
+    assert llm.calls == 2
+    assert failure.value.stored_quiz.id == record.id
+    stored_record = asyncio.run(quiz_pipeline.store.find_by_key(KEY))
+    assert not stored_record.is_fallback
+    assert questions(stored_record) == questions(record)
+
+
+def test_full_regeneration_when_disabled(stored, article, monkeypatch):
+    quiz_pipeline, _ = stored
+    monkeypatch.setattr(pipeline, "INCREMENTAL_REFRESH", False)
+    article.scraped, _, _ = edit_article(article.scraped, "one")
+    llm = use_llm(monkeypatch, FakeQuizLLM(input_rate=float("inf"), output_rate=float("inf")))
+    refreshed = asyncio.run(quiz_pipeline.run(URL, KEY, force_regenerate=True))
+    assert llm.calls >= 1
+    assert not refreshed.is_fallback
+    assert "Revised" in " ".join(question["explanation"] for question in refreshed.quiz)
@@ -0,0 +1,148 @@
+"""
+Queued generation: retries with backoff, permanent failures and the job
+handler of the app
+"""
+import asyncio
+import random
+from datetime import datetime, timedelta
+from functools import partial
+
+import pytest
+
+import jobs
+import quiz_generator
+from fake_llm import FakeQuizLLM
+from jobs import FAILED, FINISHED_STATUSES, QUEUED, SUCCEEDED, JobQueue, JobWorkerPool, PermanentJobError
+from wiki_stub_server import build_article_html
+
+
+class FailingQuizLLM(FakeQuizLLM):
+    """
+    FakeQuizLLM whose every call fails, as when the provider is down
+    """
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise RuntimeError("503 Service Unavailable")
+
+
+@pytest.fixture
+def queue(database, monkeypatch):
+    # Retries are due at once
+    monkeypatch.setattr(jobs, "retry_delay", lambda attempts: 0.0)
+    return JobQueue(database.AsyncSessionLocal, database.GenerationJob, max_attempts=3)
+
+
+async def run_job(queue, handler, job_id):
+    """
+    Run workers until the job has finished
+
+    Returns:
+        The finished job row
+    """
+    pool = JobWorkerPool(queue, handler, concurrency=1, poll_interval=0.01)
+    pool.start()
+    try:
+        while (await queue.get(job_id)).status not in FINISHED_STATUSES:
+            await asyncio.sleep(0.01)
+    finally:
+        await pool.stop()
+    return await queue.get(job_id)
+
+
+def enqueue_and_run(queue, handler, title="Alan Turing", **options):
+    async def run():
+        url = f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}"
+        job = await queue.enqueue(f"en:{title.replace(' ', '_')}", url, **options)
+        return await asyncio.wait_for(run_job(queue, handler, job.id), 30)
+    return asyncio.run(run())
+
+
+def test_retry_delay_backs_off_with_jitter():
+    random.seed(0)
+    for attempts, ceiling in ((1, 5), (2, 10), (3, 20), (10, 300)):
+        delays = [jobs.retry_delay(attempts, base=5, cap=300) for _ in range(100)]
+        assert all(ceiling / 2 <= delay <= ceiling for delay in delays)
+        assert len(set(delays)) > 1
+
+
+def test_failed_job_waits_for_its_backoff(database):
+    queue = JobQueue(database.AsyncSessionLocal, database.GenerationJob)
+
+    async def run():
+        job = await queue.enqueue("en:A", "https://en.wikipedia.org/wiki/A")
+        claimed = await queue.claim()
+        await queue.fail(claimed, "timeout")
+        return await queue.get(job.id), await queue.claim()
+
+    job, claimed_again = asyncio.run(run())
+    assert job.status == QUEUED
+    assert job.error == "timeout"
+    assert job.run_after > datetime.utcnow() + timedelta(seconds=jobs.JOB_RETRY_BACKOFF * 0.4)
+    assert claimed_again is None
+
+
+def test_failing_handler_is_retried(queue):
+    attempts = []
+
+    async def handler(job):
+        attempts.append(job.attempts)
+        if len(attempts) < 3:
+            raise RuntimeError(f"attempt {len(attempts)} failed")
+        return 42
+
+    job = enqueue_and_run(queue, handler)
+    assert attempts == [1, 2, 3]
+    assert (job.status, job.attempts, job.quiz_id, job.error) == (SUCCEEDED, 3, 42, None)
+    assert queue.retried == 2
+
+
+def test_job_fails_after_max_attempts(queue):
+    async def handler(job):
+        raise RuntimeError("still down")
+
+    job = enqueue_and_run(queue, handler)
+    assert (job.status, job.attempts, job.error) == (FAILED, 3, "still down")
+    assert job.finished_at is not None
+
+
+def test_permanent_error_is_not_retried(queue):
+    async def handler(job):
+        raise PermanentJobError("Article not found")
+
+    job = enqueue_and_run(queue, handler)
+    assert (job.status, job.attempts, job.error) == (FAILED, 1, "Article not found")
+    assert queue.retried == 0
+
+
+def test_missing_article_fails_the_job_at_once(queue, wiki_stub, fake_llm):
+    import main
+    wiki_stub.routes["/wiki/Missing_article"] = lambda query: (404, "text/html", b"Not found")
+    job = enqueue_and_run(queue, main.run_generation_job, "Missing article")
+    assert (job.status, job.attempts) == (FAILED, 1)
+    assert "Failed to scrape" in job.error
+    assert fake_llm.calls == 0
+
+
+def test_job_stores_the_quiz(queue, wiki_stub, fake_llm):
+    import main
+    job = enqueue_and_run(queue, main.run_generation_job, "Job article")
+    assert (job.status, job.attempts) == (SUCCEEDED, 1)
+    stored = asyncio.run(main.quiz_store.get(job.quiz_id))
+    assert stored.canonical_key == "en:Job_article"
+    assert not stored.is_fallback
+
+
+def test_failed_regeneration_is_retried_then_failed(queue, wiki_stub, fake_llm, monkeypatch):
+    import main
+    first = enqueue_and_run(queue, main.run_generation_job, "Edited article")
+    assert first.status == SUCCEEDED
+
+    # A new revision, and the LLM is down
+    wiki_stub.page_builder = partial(build_article_html, seed=1)
+    monkeypatch.setattr(quiz_generator, "llm", FailingQuizLLM())
+    job = enqueue_and_run(queue, main.run_generation_job, "Edited article", force_regenerate=True)
+    assert (job.status, job.attempts) == (FAILED, 3)
+    assert job.quiz_id is None
+    assert "stored quiz was kept" in job.error
+    stored = asyncio.run(main.quiz_store.get(first.quiz_id))
+    assert not stored.is_fallback
@@ -0,0 +1,119 @@
+"""
+Parsing malformed and streamed LLM responses
+"""
+import json
+
+import pytest
+
+from fake_llm import FakeQuizLLM
+from json_stream import JSONArrayItemStream, repair_json
+from langchain_core.messages import HumanMessage
+from quiz_generator import extract_json_from_response
+
+QUESTION = {"question": "What {is} [it]?", "options": ['A "}"', "B"], "answer": "A", "difficulty": "easy"}
+
+
+def fake_response(defect="", fenced=False, count=4):
+    prompt = f"Generate exactly {count} questions.\n\n" + "\n".join(
+        f"Paragraph {index} tells the story of the machine built in {1930 + index} by the team." for index in range(8)
+    )
+    llm = FakeQuizLLM(input_rate=float("inf"), output_rate=float("inf"), defect=defect, fenced=fenced)
+    return llm.invoke([HumanMessage(content=prompt)]).content
+
+
+def feed_in_chunks(stream, text, size=7):
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(stream.feed(text[start:start + size]))
+    return items
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"quiz": [{"a": 1},], "topics": ["x", "y",],}', {"quiz": [{"a": 1}], "topics": ["x", "y"]}),
+    ('{"quiz": [{"a": 1} {"a": 2}], "topics": ["x" "y"]}', {"quiz": [{"a": 1}, {"a": 2}], "topics": ["x", "y"]}),
+    ('{"a": "x" "b": 1}', {"a": "x", "b": 1}),
+    ('{"a": 1 "b": true "c": {"d": null} "e": []}', {"a": 1, "b": True, "c": {"d": None}, "e": []}),
+    ('```json\n{"quiz": [{"a": 1},]}\n```', {"quiz": [{"a": 1}]}),
+    ('Here it is: {"a": "}]{[,"} and more text', {"a": "}]{[,"}),
+    ('See [1]. {"quiz": []}', {"quiz": []}),
+    ('[{"question": "q"}]', [{"question": "q"}]),
+    ('```json\n[{"question": "q"}, {"question": "r"},]\n```', [{"question": "q"}, {"question": "r"}]),
+])
+def test_repair(text, expected):
+    assert repair_json(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"quiz": [{"a": 1}, {"a": 2}, {"a": "thr', {"quiz": [{"a": 1}, {"a": 2}, {}]}),
+    ('{"quiz": [{"a": 1}, {"a": 2}], "related_topics": ["x", "y', {"quiz": [{"a": 1}, {"a": 2}], "related_topics": ["x"]}),
+    ('[{"question": "q"}, {"question": "r", "options": ["', [{"question": "q"}, {"question": "r", "options": []}]),
+    ('{"a": "}"', {}),
+])
+def test_repair_truncated(text, expected):
+    assert repair_json(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", "no json here", "[1, 2]", "[]", '{"a": 1]'])
+def test_repair_gives_up(text):
+    assert repair_json(text) is None
+
+
+@pytest.mark.parametrize("defect", ["", "trailing_commas", "truncated"])
+def test_repair_fake_llm_responses(defect):
+    response = fake_response(defect, fenced=True, count=6)
+    repaired = repair_json(response)
+    complete = json.loads(fake_response(count=6))
+    if defect == "truncated":
+        kept = [question for question in repaired["quiz"] if "explanation" in question]
+        assert 0 < len(kept) < 6
+        assert kept == complete["quiz"][:len(kept)]
+    else:
+        assert repaired == complete
+
+
+def test_top_level_array_is_the_quiz():
+    assert extract_json_from_response('[{"question": "q"}]') == {"quiz": [{"question": "q"}]}
+    assert extract_json_from_response('```json\n[{"question": "q"},]\n```') == {"quiz": [{"question": "q"}]}
+
+
+@pytest.mark.parametrize("text", ['"quiz"', "42", '["a", "b"]', "null"])
+def test_other_documents_are_rejected(text):
+    assert extract_json_from_response(text) is None
+
+
+@pytest.mark.parametrize("size", [1, 7, 1000])
+def test_stream_yields_items_as_they_complete(size):
+    response = fake_response(fenced=True)
+    stream = JSONArrayItemStream("quiz")
+    assert feed_in_chunks(stream, response, size) == json.loads(fake_response())["quiz"]
+    assert stream.text == response
+
+
+def test_stream_yields_each_item_once_closed():
+    stream = JSONArrayItemStream("quiz")
+    assert stream.feed('{"summary": "{not [an item]}", "quiz": [{"question": "a", "options": ["x"') == []
+    assert stream.feed(']}, {"question": "b"') == [{"question": "a", "options": ["x"]}]
+    assert stream.feed('}], "other": [{"question": "c"}]}') == [{"question": "b"}]
+
+
+def test_stream_ignores_brackets_in_strings():
+    text = json.dumps({"summary": "[{", "quiz": [QUESTION, QUESTION]})
+    assert feed_in_chunks(JSONArrayItemStream("quiz"), text, 3) == [QUESTION, QUESTION]
+
+
+def test_stream_repairs_trailing_commas():
+    response = fake_response("trailing_commas")
+    assert feed_in_chunks(JSONArrayItemStream("quiz"), response) == json.loads(fake_response())["quiz"]
+
+
+def test_stream_drops_truncated_tail():
+    response = fake_response("truncated")
+    items = feed_in_chunks(JSONArrayItemStream("quiz"), response)
+    complete = json.loads(fake_response())["quiz"]
+    assert 0 < len(items) < len(complete)
+    assert items == complete[:len(items)]
+
+
+def test_stream_top_level_array():
+    text = '```json\n[' + ", ".join(json.dumps(QUESTION) for _ in range(3)) + ']\n```'
+    assert feed_in_chunks(JSONArrayItemStream("quiz"), text, 5) == [QUESTION] * 3
@@ -0,0 +1,155 @@
+"""
+Client-side LLM limits: budgets, backoff on 429s and adaptive concurrency
+"""
+import random
+
+import pytest
+
+import quiz_generator
+from bench_rate_limit import ResourceExhausted
+from fake_llm import FakeQuizLLM
+from llm_limiter import AdaptiveConcurrencyLimit, LLMRateLimiter, TokenBucket, is_rate_limit_error
+from scraper import parse_article_html
+from wiki_stub_server import build_article_html
+
+
+class ThrottledQuizLLM(FakeQuizLLM):
+    """
+    FakeQuizLLM whose first throttled_calls calls are rejected with a 429
+    """
+
+    throttled_calls: int = 0
+    rejected: int = 0
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.rejected < self.throttled_calls:
+            self.rejected += 1
+            raise ResourceExhausted("429 Resource has been exhausted (e.g. check quota).")
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+
+def make_limiter(sleeps, **kwargs):
+    return LLMRateLimiter(
+        rpm=0, tpm=0, concurrency=AdaptiveConcurrencyLimit(minimum=1, maximum=4),
+        sleep=sleeps.append, **kwargs
+    )
+
+
+def flaky(failures, error):
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error
+        return "ok"
+    return call, calls
+
+
+@pytest.mark.parametrize("error, expected", [
+    (ResourceExhausted("quota"), True),
+    (RuntimeError("429 Too Many Requests"), True),
+    (RuntimeError("Rate limit reached"), True),
+    (RuntimeError("500 Internal error"), False),
+    (ValueError("bad response"), False),
+])
+def test_rate_limit_errors(error, expected):
+    assert is_rate_limit_error(error) is expected
+
+
+def test_retry_delay_grows_and_is_capped():
+    random.seed(0)
+    limiter = make_limiter([], retry_base=2, retry_max=10)
+    for attempt in range(8):
+        ceiling = min(10, 2 * 2 ** attempt)
+        delays = [limiter.retry_delay(attempt) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+        # Full jitter spreads the delays over the whole window
+        assert max(delays) > ceiling * 0.8
+
+
+def test_throttled_call_is_retried_with_backoff():
+    sleeps = []
+    limiter = make_limiter(sleeps, retry_base=1, retry_max=60)
+    call, calls = flaky(2, ResourceExhausted("quota"))
+    assert limiter.call(call) == "ok"
+    assert len(calls) == 3
+    assert len(sleeps) == 2
+    assert sleeps[0] <= 1 and sleeps[1] <= 2
+    stats = limiter.stats()
+    assert (stats["throttled"], stats["retries"], stats["gave_up"]) == (2, 2, 0)
+    # Halved twice (4 -> 2 -> 1), then +1 for the successful call
+    assert stats["concurrency_decreases"] == 2
+    assert stats["concurrency_limit"] == 2
+    assert stats["in_flight"] == 0
+
+
+def test_gives_up_after_max_retries():
+    sleeps = []
+    limiter = make_limiter(sleeps, max_retries=2)
+    call, calls = flaky(10, ResourceExhausted("quota"))
+    with pytest.raises(ResourceExhausted):
+        limiter.call(call)
+    assert len(calls) == 3
+    assert len(sleeps) == 2
+    assert limiter.stats()["gave_up"] == 1
+
+
+def test_other_errors_are_not_retried():
+    sleeps = []
+    limiter = make_limiter(sleeps)
+    call, calls = flaky(1, ValueError("bad response"))
+    with pytest.raises(ValueError):
+        limiter.call(call)
+    assert len(calls) == 1
+    assert not sleeps
+    assert limiter.concurrency.decreases == 0
+
+
+def test_concurrency_recovers_after_fast_calls():
+    limit = AdaptiveConcurrencyLimit(minimum=1, maximum=4, latency_target=1.0)
+    limit.acquire()
+    limit.release(throttled=True)
+    assert limit.limit == 2
+    for _ in range(10):
+        limit.acquire()
+        limit.release(latency=0.1)
+    assert limit.limit == 4
+    limit.acquire()
+    limit.release(latency=5.0)
+    assert limit.limit == 2
+
+
+def test_token_bucket_waits_for_refill():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    bucket = TokenBucket(60, clock=lambda: now[0], sleep=sleep)
+    assert bucket.acquire(60) == 0
+    # One token per second
+    assert bucket.acquire(3) == pytest.approx(3)
+    bucket.drain()
+    assert bucket.acquire(1) == pytest.approx(1)
+
+
+def test_generation_survives_throttling(fake_llm, monkeypatch):
+    sleeps = []
+    llm = ThrottledQuizLLM(input_rate=float("inf"), output_rate=float("inf"), throttled_calls=2)
+    monkeypatch.setattr(quiz_generator, "llm", llm)
+    monkeypatch.setattr(quiz_generator, "llm_limiter", make_limiter(sleeps))
+    scraped = parse_article_html(
+        build_article_html("Throttled article", sections=4),
+        "https://en.wikipedia.org/wiki/Throttled_article"
+    )
+    quiz = quiz_generator.generate_quiz_from_content(
+        scraped["title"], scraped["content"], scraped["sections"], use_cache=False,
+        passages=scraped["passages"], links=scraped["links"]
+    )
+    assert not quiz.get("is_fallback")
+    assert quiz["quiz"]
+    assert llm.rejected == 2
+    assert len(sleeps) == 2
@@ -0,0 +1,104 @@
+"""
+Quiz store saves: upsert by canonical key, concurrent inserts and rows stored
+before canonical keys
+"""
+import asyncio
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from quiz_store import MemoryQuizStore, SQLAlchemyQuizStore, SQLiteQuizStore
+
+URL = "https://en.wikipedia.org/wiki/Alan_Turing"
+
+
+def quiz_fields(title="Alan Turing", **fields):
+    return {
+        "url": URL, "canonical_key": "en:Alan_Turing", "title": title,
+        "quiz": [{"question": f"About {title}?"}], "quiz_count": 1, "is_fallback": False,
+        **fields
+    }
+
+
+class RacingStore(SQLAlchemyQuizStore):
+    """
+    Store whose first lookup misses, as when another request inserts the
+    article between this save's lookup and its commit
+    """
+
+    missed = False
+
+    async def _find_existing(self, db, fields, match_url=False):
+        if not self.missed:
+            self.missed = True
+            return None
+        return await super()._find_existing(db, fields, match_url)
+
+
+@pytest.fixture
+def store(database):
+    return SQLAlchemyQuizStore(database.AsyncSessionLocal, database.QuizRecord)
+
+
+def rows(database):
+    with database.SessionLocal() as db:
+        return [(row.id, row.url, row.canonical_key, row.title)
+                for row in db.query(database.QuizRecord).order_by(database.QuizRecord.id)]
+
+
+def test_save_replaces_the_quiz_of_an_article(store, database):
+    first = asyncio.run(store.save(quiz_fields()))
+    second = asyncio.run(store.save(quiz_fields("Alan Turing (revised)", url=URL + "_(mobile)")))
+    assert second.id == first.id
+    assert second.created_at == first.created_at
+    # The first URL is kept
+    assert rows(database) == [(first.id, URL, "en:Alan_Turing", "Alan Turing (revised)")]
+
+
+def test_insert_race_updates_the_winner(store, database):
+    winner = asyncio.run(store.save(quiz_fields()))
+    racing = RacingStore(database.AsyncSessionLocal, database.QuizRecord)
+    record = asyncio.run(racing.save(quiz_fields("Second writer")))
+    assert record.id == winner.id
+    assert rows(database) == [(winner.id, URL, "en:Alan_Turing", "Second writer")]
+
+
+def test_concurrent_saves_store_one_row(store, database):
+    async def run():
+        return await asyncio.gather(*(store.save(quiz_fields(f"Writer {index}")) for index in range(5)))
+
+    records = asyncio.run(run())
+    assert len({record.id for record in records}) == 1
+    assert len(rows(database)) == 1
+
+
+def test_legacy_row_is_merged_by_url(store, database):
+    with database.SessionLocal() as db:
+        db.add(database.QuizRecord(url=URL, canonical_key=None, title="Legacy", quiz=[], quiz_count=0))
+        db.commit()
+    legacy_id = rows(database)[0][0]
+    record = asyncio.run(store.save(quiz_fields()))
+    assert record.id == legacy_id
+    assert rows(database) == [(legacy_id, URL, "en:Alan_Turing", "Alan Turing")]
+    assert asyncio.run(store.find_by_key("en:Alan_Turing")).id == legacy_id
+
+
+def test_other_integrity_errors_are_raised(store, database):
+    with pytest.raises(IntegrityError):
+        asyncio.run(store.save(quiz_fields(title=None)))
+    assert rows(database) == []
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_other_stores_upsert_by_key(backend, tmp_path):
+    store = MemoryQuizStore() if backend == "memory" else SQLiteQuizStore(str(tmp_path / "quiz.db"))
+
+    async def run():
+        first = await store.save(quiz_fields())
+        await asyncio.gather(*(store.save(quiz_fields(f"Writer {index}", url=URL + "_")) for index in range(5)))
+        return first, await store.find_by_key("en:Alan_Turing"), await store.history(10)
+
+    first, stored, history = asyncio.run(run())
+    assert len(history) == 1
+    assert (stored.id, stored.url, stored.created_at) == (first.id, URL, first.created_at)
+    assert stored.title.startswith("Writer ")
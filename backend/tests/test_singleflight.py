@@ -0,0 +1,70 @@
+"""
+Deduplication of concurrent generations: in-process single flight and the
+cross-process lock
+"""
+import asyncio
+
+from schemas import QuizRequest
+from singleflight import DatabaseGenerationLock, SingleFlight
+
+URL = "https://en.wikipedia.org/wiki/Alan_Turing"
+
+
+async def slow(result, started=None):
+    if started is not None:
+        started.set()
+    await asyncio.sleep(0.05)
+    return result
+
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight()
+
+    async def run():
+        return await asyncio.gather(*(flight.do("en:A", lambda: slow(object())) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len({id(result) for result in results}) == 1
+    assert flight.stats() == {"leaders": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_forced_request_does_not_join_a_plain_generation(database):
+    import main
+    plain = QuizRequest(url=URL)
+    forced = QuizRequest(url=URL, force_regenerate=True)
+    raw_html = QuizRequest(url=URL, store_raw_html=True)
+    keys = {main.flight_key(request, "en:Alan_Turing") for request in (plain, forced, raw_html)}
+    assert len(keys) == 3
+    assert main.flight_key(QuizRequest(url=URL + "#History"), "en:Alan_Turing") == \
+        main.flight_key(plain, "en:Alan_Turing")
+
+    flight = SingleFlight()
+
+    async def run():
+        started = asyncio.Event()
+        leader = asyncio.ensure_future(flight.do(main.flight_key(plain, "en:Alan_Turing"),
+                                                 lambda: slow("plain", started)))
+        await started.wait()
+        follower = flight.do(main.flight_key(forced, "en:Alan_Turing"), lambda: slow("forced"))
+        return await asyncio.gather(leader, follower)
+
+    assert asyncio.run(run()) == ["plain", "forced"]
+    assert flight.leaders == 2
+
+
+def test_lock_timeout_is_counted(database):
+    holder = DatabaseGenerationLock(database.AsyncSessionLocal, database.GenerationLock)
+    waiter = DatabaseGenerationLock(database.AsyncSessionLocal, database.GenerationLock,
+                                    poll_interval=0.01, wait_timeout=0.05)
+    waiter.owner = "other-worker"
+
+    async def run():
+        async with holder.hold("en:A"):
+            async with waiter.hold("en:A"):
+                pass
+        # Free again: no wait
+        async with waiter.hold("en:A"):
+            pass
+
+    asyncio.run(run())
+    assert waiter.stats() == {"backend": "db", "waits": 1, "takeovers": 0, "timeouts": 1}
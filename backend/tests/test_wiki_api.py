@@ -0,0 +1,61 @@
+"""
+The MediaWiki API backend, against recorded responses served by the
+stand-in server
+"""
+import pytest
+
+import scraper
+from scraper import scrape_wikipedia, scrape_wikipedia_batch
+from wiki_api import parse_extract
+
+TURING_URL = "https://en.wikipedia.org/wiki/Alan_Turing"
+
+
+@pytest.fixture
+def api_backend(wiki_stub, monkeypatch):
+    monkeypatch.setattr(scraper, "SCRAPER_BACKEND", "api")
+    return wiki_stub
+
+
+def test_recorded_article(api_backend):
+    result = scrape_wikipedia(TURING_URL)
+    assert result["title"] == "Alan Turing"
+    assert result["canonical_url"] == TURING_URL
+    assert result["revision_id"] == 1251203004
+    assert "Death" in result["sections"]
+    assert "References" not in result["sections"]
+    assert not any("Hodges" in passage["text"] for passage in result["passages"])
+    assert result["passages"][0]["section"] is None
+
+
+def test_redirect_and_normalized_titles(api_backend):
+    urls = [TURING_URL, "https://en.wikipedia.org/wiki/Turing", "https://en.wikipedia.org/wiki/alan_Turing"]
+    results = scrape_wikipedia_batch(urls)
+    assert {results[url]["canonical_url"] for url in urls} == {TURING_URL}
+    assert {results[url]["revision_id"] for url in urls} == {1251203004}
+
+
+def test_batch_follows_continuations(api_backend):
+    urls = [TURING_URL] + [f"https://en.wikipedia.org/wiki/Article_{index}" for index in range(3)]
+    results = scrape_wikipedia_batch(urls)
+    assert all(results[url]["content"] for url in urls)
+    # One extract per response, as TextExtracts returns them
+    assert api_backend.requests == len(urls)
+    assert api_backend.connections == 1
+
+
+def test_same_article_as_html_backend(api_backend, monkeypatch):
+    url = "https://en.wikipedia.org/wiki/Synthetic_article"
+    from_api = scrape_wikipedia(url)
+    monkeypatch.setattr(scraper, "SCRAPER_BACKEND", "html")
+    from_html = scrape_wikipedia(url)
+    assert from_api["title"] == from_html["title"]
+    assert from_api["sections"] == from_html["sections"]
+    assert from_api["passages"] == from_html["passages"]
+
+
+def test_parse_extract_skips_metadata_sections():
+    extracted = parse_extract("Lead.\n\n== History ==\nBody.\n=== Detail ===\nMore.\n\n== Notes ==\nNote.")
+    assert extracted["paragraphs"] == ["Lead.", "Body.", "More."]
+    assert extracted["paragraph_sections"] == [None, "History", "Detail"]
+    assert extracted["headings"] == ["History", "Detail", "Notes"]
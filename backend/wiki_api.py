@@ -0,0 +1,140 @@
+import os
+import re
+from typing import Dict, List, Optional
+
+from http_client import get_session, WIKI_HTTP_TIMEOUT
+from metrics import stage, record_size, record_outcome
+
+# MediaWiki Action API endpoint per language edition
+WIKI_API_URL = os.getenv("WIKI_API_URL", "https://{lang}.wikipedia.org/w/api.php")
+
+# Titles per query (the API limit). Redirects, revision ids and URLs of the
+# whole batch come in the first response, but full extracts still come one
+# per response, so each article costs one request either way.
+API_BATCH_SIZE = 50
+
+# "== Heading ==" lines in plain-text extracts (exsectionformat=wiki)
+HEADING_PATTERN = re.compile(r'^(={2,6})\s*(.*?)\s*\1$')
+
+# Sections whose text is bibliography / navigation rather than article prose
+METADATA_SECTIONS = {'References', 'External links', 'See also', 'Notes', 'Bibliography', 'Further reading'}
+
+
+def parse_extract(extract: str) -> Dict[str, List[str]]:
+    """
+    Split a plain-text extract into paragraphs and h2/h3 headings
+
+    Args:
+        extract: Page text from prop=extracts with explaintext
+
+    Returns:
+        Dictionary with paragraphs, paragraph_sections and headings, shaped
+        like extractor output
+    """
+    paragraphs = []
+    paragraph_sections = []
+    headings = []
+    in_metadata = False
+    for line in extract.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        match = HEADING_PATTERN.match(line)
+        if match:
+            level = len(match.group(1))
+            heading = match.group(2)
+            if level <= 3:
+                headings.append(heading)
+            if level == 2:
+                in_metadata = heading in METADATA_SECTIONS
+            continue
+        if not in_metadata:
+            paragraphs.append(line)
+            paragraph_sections.append(headings[-1] if headings else None)
+    return {"paragraphs": paragraphs, "paragraph_sections": paragraph_sections, "headings": headings}
+
+
+def _query(lang: str, titles: List[str]) -> List[Dict]:
+    """
+    Run one extracts query for a batch of titles, following continuations
+
+    TextExtracts returns one full extract per response (exlimit cannot be
+    raised for whole pages), so every title after the first costs an
+    excontinue request on the same keep-alive connection.
+    """
+    params = {
+        "action": "query",
+        "format": "json",
+        "formatversion": "2",
+        "prop": "extracts|revisions|info",
+        "explaintext": "1",
+        "exsectionformat": "wiki",
+        "rvprop": "ids",
+        "inprop": "url",
+        "redirects": "1",
+        "titles": "|".join(titles)
+    }
+    pages: Dict[str, Dict] = {}
+    normalized: Dict[str, str] = {}
+    continuation: Dict[str, str] = {}
+    while True:
+        with stage("fetch"):
+            response = get_session().get(
+                WIKI_API_URL.format(lang=lang),
+                params={**params, **continuation},
+                timeout=WIKI_HTTP_TIMEOUT
+            )
+            response.raise_for_status()
+        record_outcome("fetch", "ok")
+        record_size("fetch", "bytes", len(response.content))
+        data = response.json()
+        query = data.get("query", {})
+        for mapping in query.get("normalized", []) + query.get("redirects", []):
+            normalized[mapping["from"]] = mapping["to"]
+        for page in query.get("pages", []):
+            merged = pages.setdefault(page["title"], {})
+            merged.update({k: v for k, v in page.items() if v is not None})
+        if "continue" not in data:
+            break
+        continuation = data["continue"]
+
+    results = []
+    for title in titles:
+        resolved = title
+        # Follow normalization then redirect (at most two hops)
+        for _ in range(2):
+            resolved = normalized.get(resolved, resolved)
+        results.append(pages.get(resolved))
+    return results
+
+
+def fetch_articles_via_api(titles: List[str], lang: str = "en") -> List[Optional[Dict]]:
+    """
+    Fetch plain-text articles from the MediaWiki Action API
+
+    Args:
+        titles: Article titles (any spelling; redirects are followed)
+        lang: Wikipedia language code
+
+    Returns:
+        One entry per title, in order: a dictionary with title,
+        canonical_href, paragraphs, paragraph_sections, headings, raw_html
+        (empty) and
+        revision_id, or None for missing pages
+    """
+    results: List[Optional[Dict]] = []
+    for start in range(0, len(titles), API_BATCH_SIZE):
+        batch = titles[start:start + API_BATCH_SIZE]
+        for page in _query(lang, batch):
+            if not page or page.get("missing") or page.get("invalid") or "extract" not in page:
+                results.append(None)
+                continue
+            revisions = page.get("revisions") or [{}]
+            results.append({
+                "title": page["title"],
+                "canonical_href": page.get("canonicalurl") or page.get("fullurl"),
+                **parse_extract(page["extract"]),
+                "raw_html": "",
+                "revision_id": revisions[0].get("revid") or page.get("lastrevid")
+            })
+    return results
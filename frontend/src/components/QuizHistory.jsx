@@ -8,6 +8,8 @@ function QuizHistory() {
   const [error, setError] = useState('');
   const [selectedQuiz, setSelectedQuiz] = useState(null);
   const [showModal, setShowModal] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchHistory();
@@ -17,7 +19,8 @@ function QuizHistory() {
     try {
       setLoading(true);
       const data = await getQuizHistory();
-      setHistory(data);
+      setHistory(data.items);
+      setNextCursor(data.nextCursor);
       setError('');
     } catch (err) {
       setError('Failed to load quiz history');
@@ -27,6 +30,20 @@ function QuizHistory() {
     }
   };
 
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const data = await getQuizHistory(nextCursor);
+      setHistory([...history, ...data.items]);
+      setNextCursor(data.nextCursor);
+    } catch (err) {
+      setError('Failed to load quiz history');
+      console.error('Error fetching history:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleViewDetails = async (quizId) => {
     try {
       const quiz = await getQuizById(quizId);
@@ -167,6 +184,18 @@ function QuizHistory() {
             </tbody>
           </table>
         </div>
+
+        {nextCursor && (
+          <div style={{ textAlign: 'center', marginTop: '1.5rem' }}>
+            <button
+              onClick={loadMore}
+              className="btn btn-secondary"
+              disabled={loadingMore}
+            >
+              {loadingMore ? 'Loading...' : 'Load More'}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Modal for Quiz Details */}
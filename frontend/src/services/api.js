@@ -19,9 +19,16 @@ export const generateQuiz = async (url, forceRegenerate = false, storeRawHtml =
   return response.data;
 };
 
-export const getQuizHistory = async () => {
-  const response = await api.get('/api/history');
-  return response.data;
+export const getQuizHistory = async (cursor = null, limit = 50) => {
+  const params = { limit };
+  if (cursor) {
+    params.cursor = cursor;
+  }
+  const response = await api.get('/api/history', { params });
+  return {
+    items: response.data,
+    nextCursor: response.headers['x-next-cursor'] || null,
+  };
 };
 
 export const getQuizById = async (id) => {